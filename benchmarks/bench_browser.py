@@ -0,0 +1,78 @@
+"""
+Times the card browser's table on a large deck: opening it, reading the
+page of rows on screen, sorting by each column and finding a card.
+
+Usage:
+    python benchmarks/bench_browser.py [--cards 1000000] [--flipwise]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+from flipwise import writer
+from flipwise.browser import COLUMNS, CardTable
+from flipwise.deckdb import SqliteCardStore
+from flipwise.engine import Deck
+
+# Rows on screen in a maximized browser window
+PAGE_SIZE = 40
+
+
+def time_pages(table, count, rng):
+    """
+    Returns the mean time to read a page of rows at random scroll positions.
+    """
+    total = len(table)
+    start = time.perf_counter()
+    for _number in range(count):
+        table.rows(rng.randrange(max(1, total - PAGE_SIZE)), PAGE_SIZE)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type = int, default = 1_000_000)
+    parser.add_argument("--flipwise", action = "store_true", help = "use a .flipwise deck instead of JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        if args.flipwise:
+            deck_path = os.path.join(folder, "deck.flipwise")
+            store = SqliteCardStore(deck_path, create = True)
+            store.extend(generate_cards(args.cards))
+            store.close()
+        else:
+            deck_path = os.path.join(folder, "deck.json")
+            writer.write_deck(deck_path, generate_cards(args.cards))
+        deck = Deck.load(deck_path)
+
+        start = time.perf_counter()
+        table = CardTable(deck)
+        table.rows(0, PAGE_SIZE)
+        print(f"{len(table)} cards: opened in {(time.perf_counter() - start) * 1000:.2f} ms")
+        print(f"  {'deck order':<10} page {time_pages(table, 200, rng) * 1000:>7.2f} ms")
+
+        for column in COLUMNS:
+            start = time.perf_counter()
+            table.sort(column)
+            elapsed = time.perf_counter() - start
+            page = time_pages(table, 200, rng)
+            card_id = table.cards()[rng.randrange(len(table))]
+            start = time.perf_counter()
+            table.position(card_id)
+            find = time.perf_counter() - start
+            print(f"  {column:<10} sort {elapsed:>6.2f} s  page {page * 1000:>7.2f} ms  find {find * 1000:>7.2f} ms")
+
+        deck.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Times loading a folder of decks with an increasing number of worker processes.
+
+The folder holds synthetic JSON and CSV decks. Each run loads it with
+Deck.load_folder; the first line is the same work done in this process
+without a pool, for reference.
+
+Usage:
+    python benchmarks/bench_folder.py [--files 200] [--cards 5000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+from flipwise import writer
+from flipwise.engine import Deck
+from flipwise.folder import deck_files, parse_deck
+from flipwise.store import CardStore
+
+
+def default_workers():
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type = int, default = 200)
+    parser.add_argument("--cards", type = int, default = 5000, help = "cards per file")
+    parser.add_argument("--workers", type = int, nargs = "+", default = default_workers())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        for number in range(args.files):
+            kind = "json" if number % 2 else "csv"
+            writer.write_deck(os.path.join(folder, f"deck-{number:04}.{kind}"), generate_cards(args.cards, seed = number))
+        total = args.files * args.cards
+        print(f"{args.files} files, {total} cards, {os.cpu_count()} cores")
+
+        start = time.perf_counter()
+        store = CardStore()
+        for file_path in deck_files(folder):
+            store.append_store(parse_deck(file_path))
+        Deck(store).close()
+        baseline = time.perf_counter() - start
+        print(f"  {'in process':<12} {baseline:>8.2f} s {total / baseline:>12.0f} cards/s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            deck, result = Deck.load_folder(folder, workers)
+            seconds = time.perf_counter() - start
+            assert len(deck.flashcards) == total and not result.errors
+            print(f"  {workers:>3} workers  {seconds:>8.2f} s {total / seconds:>12.0f} cards/s  x{baseline / seconds:.2f}")
+            deck.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Times the review history log as it grows to tens of millions of events.
+
+Events with random cards, categories, types and response times are
+appended through ReviewLog.record in rounds. After each round the script
+reports the cost per recorded event, the time to open the log again and
+to compute the per-category statistics, and the file size. Reading the
+raw columns back is timed once at the end. Batches are added up with
+numpy when it is installed.
+
+Usage:
+    python benchmarks/bench_history.py [--events 10000000] [--rounds 5] [--categories 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flipwise import history
+from flipwise.history import GRADED, ReviewLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type = int, default = 10_000_000)
+    parser.add_argument("--rounds", type = int, default = 5)
+    parser.add_argument("--categories", type = int, default = 50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    categories = [f"Category {number}" for number in range(args.categories)]
+    kinds = list(range(GRADED + 4))
+    per_round = args.events // args.rounds
+    print(f"{args.events} events in {args.rounds} rounds, {args.categories} categories, numpy: {history._numpy() is not None}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "deck.json.history")
+        log = ReviewLog(path)
+        now = time.time()
+        for _ in range(args.rounds):
+            events = [(rng.getrandbits(64), rng.choice(kinds), rng.random() * 10, rng.choice(categories)) for _ in range(per_round)]
+            start = time.perf_counter()
+            for key, kind, response, category in events:
+                log.record(key, kind, response, category, now)
+            log.flush()
+            record_us = (time.perf_counter() - start) / per_round * 1e6
+
+            start = time.perf_counter()
+            reopened = ReviewLog(path)
+            open_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            stats = reopened.stats()
+            stats_ms = (time.perf_counter() - start) * 1000
+            assert sum(row.reviews + row.flips for row in stats.values()) == len(log)
+            print(f"  {len(log):>11} events  record {record_us:>5.2f} us/event  open {open_ms:>7.1f} ms  "
+                  f"stats {stats_ms:>6.2f} ms  file {os.path.getsize(path) / 2**20:>8.1f} MB")
+
+        start = time.perf_counter()
+        columns = log.columns()
+        print(f"  columns read back in {time.perf_counter() - start:.2f} s ({len(columns['key'])} events)")
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
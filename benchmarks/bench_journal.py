@@ -0,0 +1,76 @@
+"""
+Compares edits per second with the journal against rewriting the whole deck file.
+
+Usage:
+    python benchmarks/bench_journal.py [--cards 100000] [--format json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flipwise import writer
+from flipwise.journal import Journal
+from flipwise.store import CardStore
+
+
+def make_store(size):
+    store = CardStore()
+    for i in range(size):
+        store.add(f"What is the answer to question number {i}?", f"The answer is {i * 7}", f"Category {i % 50}")
+    return store
+
+
+def edits_per_second(edit, seconds):
+    """
+    Runs edit(i) repeatedly for about the given time.
+    """
+    count = 0
+    start = time.perf_counter()
+    while True:
+        edit(count)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type = int, default = 100_000)
+    parser.add_argument("--format", choices = ["json", "csv"], default = "json")
+    parser.add_argument("--seconds", type = float, default = 3.0)
+    args = parser.parse_args()
+
+    store = make_store(args.cards)
+
+    with tempfile.TemporaryDirectory() as directory:
+        deck_path = os.path.join(directory, "deck." + args.format)
+
+        def rewrite(i):
+            card_id = i % args.cards
+            store.update(card_id, f"Edited question {i}", store.back(card_id), store.category(card_id))
+            writer.write_deck(deck_path, store.cards())
+
+        journal = Journal(deck_path)
+        journal.checkpoint(store)
+
+        def append(i):
+            card_id = i % args.cards
+            store.update(card_id, f"Edited question {i}", store.back(card_id), store.category(card_id))
+            journal.edit(card_id, f"Edited question {i}", store.back(card_id), store.category(card_id))
+
+        full = edits_per_second(rewrite, args.seconds)
+        journaled = edits_per_second(append, args.seconds)
+        journal.close()
+
+    print(f"deck of {args.cards} cards ({args.format})")
+    print(f"  full rewrite: {full:>12.1f} edits/s")
+    print(f"  journal:      {journaled:>12.1f} edits/s  ({journaled / full:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the memory used by the old list-of-dicts deck with CardStore.
+
+Usage:
+    python benchmarks/bench_memory.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flipwise.store import CardStore
+
+CATEGORIES = 50
+
+
+def make_card(i):
+    """
+    Builds a card the way the JSON and CSV parsers do: every string is a new object.
+    """
+    return {
+        "front": f"What is the answer to question number {i}?",
+        "back": f"The answer is {i * 7}",
+        "category": f"Category {i % CATEGORIES}",
+        }
+
+
+def measure(build):
+    """
+    Returns (result, bytes allocated) for a deck built by build().
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def build_dicts(size):
+    return [make_card(i) for i in range(size)]
+
+
+def build_store(size):
+    store = CardStore()
+    add = store.add
+    for i in range(size):
+        card = make_card(i)
+        add(card["front"], card["back"], card["category"])
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'cards':>10} {'list of dicts':>15} {'CardStore':>12} {'ratio':>7}")
+    for size in args.sizes:
+        dicts, dict_bytes = measure(lambda: build_dicts(size))
+        del dicts
+        store, store_bytes = measure(lambda: build_store(size))
+        del store
+        print(f"{size:>10} {dict_bytes / 2**20:>12.1f} MB {store_bytes / 2**20:>9.1f} MB {dict_bytes / store_bytes:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
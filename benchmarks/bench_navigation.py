@@ -0,0 +1,101 @@
+"""
+Drives the window through scripted navigation and counts the frames drawn.
+
+A held arrow key is simulated by calling next_card at the key-repeat rate.
+For each run the script reports how many times the card was redrawn, the
+time spent in the key handler, and the latency from the last key press to
+the frame showing the final card. The run is repeated with key-repeat
+throttling disabled for comparison. Needs a display.
+
+Usage:
+    python benchmarks/bench_navigation.py [--cards 100000] [--presses 200] [--interval-ms 33]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+import main as app_module
+from flipwise.engine import Deck
+from flipwise.store import CardStore
+
+# Time left after the last press for the final frame to arrive
+SETTLE_MS = 500
+
+
+def run(root, app, presses, interval_ms):
+    """
+    Presses "next" presses times and returns the measurements.
+    """
+    frames = []
+    handler_times = []
+    last_press = [0.0]
+    render = app.update_card_display
+
+    def counted_render():
+        render()
+        frames.append(time.perf_counter())
+
+    def press(remaining):
+        start = time.perf_counter()
+        app.next_card()
+        handler_times.append(time.perf_counter() - start)
+        last_press[0] = start
+        if remaining > 1:
+            root.after(interval_ms, press, remaining - 1)
+        else:
+            root.after(SETTLE_MS, root.quit)
+
+    app.update_card_display = counted_render
+    app.deck.current_index = 0
+    root.after(interval_ms, press, presses)
+    root.mainloop()
+    app.update_card_display = render
+
+    deck = app.deck
+    expected = deck.flashcards.front(deck.current_card())
+    return {
+        "frames": len(frames),
+        "handler_us": statistics.mean(handler_times) * 1e6,
+        "latency_ms": (frames[-1] - last_press[0]) * 1000 if frames else float("nan"),
+        "final_card": app.card_label.cget("text").startswith(expected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type = int, default = 100_000)
+    parser.add_argument("--presses", type = int, default = 200)
+    parser.add_argument("--interval-ms", type = int, default = 33, help = "key-repeat interval")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"this benchmark needs a display: {e}")
+        return 1
+    app = app_module.FlipWiseApp(root)
+    store = CardStore()
+    store.extend(generate_cards(args.cards))
+    app.deck = Deck(store)
+    app.refresh_categories()
+    root.update()
+
+    print(f"{args.presses} presses every {args.interval_ms} ms on {args.cards} cards")
+    for label, key_repeat_ms in (("throttled", app_module.KEY_REPEAT_MS), ("every press", 0)):
+        app_module.KEY_REPEAT_MS = key_repeat_ms
+        result = run(root, app, args.presses, args.interval_ms)
+        print(f"  {label:<12} {result['frames']:>5} frames  handler {result['handler_us']:>8.1f} us  "
+              f"last press -> frame {result['latency_ms']:>7.1f} ms  final card shown: {result['final_card']}")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
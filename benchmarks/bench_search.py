@@ -0,0 +1,54 @@
+"""
+Times building the search index and running queries against it.
+
+Usage:
+    python benchmarks/bench_search.py [--cards 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flipwise.index import CategoryIndex
+from flipwise.search import SearchIndex
+from flipwise.store import CardStore
+
+QUERIES = ["w123", "w12", "question w77", "answer", "w1 ques", "w4999 w12"]
+
+
+def make_store(size, vocabulary):
+    rng = random.Random(1)
+    words = [f"w{i}" for i in range(vocabulary)]
+    store = CardStore()
+    for i in range(size):
+        store.add(" ".join(rng.choices(words, k = 6)) + " question", "answer " + " ".join(rng.choices(words, k = 3)), f"Category {i % 50}")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type = int, default = 1_000_000)
+    parser.add_argument("--vocabulary", type = int, default = 50_000)
+    args = parser.parse_args()
+
+    store = make_store(args.cards, args.vocabulary)
+    index = CategoryIndex.build(store)
+
+    start = time.perf_counter()
+    search = SearchIndex.build(store.texts())
+    print(f"index of {args.cards} cards, {len(search)} words: built in {time.perf_counter() - start:.1f} s")
+
+    for category in ("All", "Category 3"):
+        within = None if category == "All" else index.cards(category)
+        for query in QUERIES:
+            start = time.perf_counter()
+            results = search.search(query, within)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"  {category:<10} {query!r:<16} {len(results):>8} cards {elapsed:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
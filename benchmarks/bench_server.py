@@ -0,0 +1,155 @@
+"""
+Load-tests the HTTP/JSON deck server with many concurrent study sessions.
+
+Starts `python -m flipwise serve` on a synthetic JSON deck (or uses a
+running server given with --url), opens one session per client and keeps
+every client busy for --seconds over a keep-alive connection: mostly next,
+previous and card reads, with --writes percent edits and adds. Reports
+requests per second and latency percentiles, overall and per request type.
+
+Usage:
+    python benchmarks/bench_server.py [--cards 100000] [--clients 50] [--seconds 10] [--writes 5] [--url URL]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+from flipwise import writer
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+class Client:
+    """
+    One keep-alive HTTP/1.1 connection.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload = None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+        data = json.loads(await self.reader.readexactly(length))
+        if status != 200:
+            raise RuntimeError(f"{method} {path}: {status} {data}")
+        return data
+
+    def close(self):
+        self.writer.close()
+
+
+async def study(host, port, deadline, write_percent, seed, latencies):
+    rng = random.Random(seed)
+    client = Client(host, port)
+    await client.connect()
+    try:
+        session = await client.request("POST", "/sessions", {"shuffle": seed})
+        path = f"/sessions/{session['session']}"
+        while time.perf_counter() < deadline:
+            roll = rng.random() * 100
+            card = session["card"]
+            if roll < write_percent / 2 and card is not None:
+                kind, request = "edit", ("PUT", f"/cards/{card['id']}", {"back": f"edited {rng.random()}"})
+            elif roll < write_percent:
+                kind, request = "add", ("POST", "/cards", {"front": f"q{rng.random()}", "back": "a", "category": "Load test"})
+            elif roll < 50 and card is not None:
+                kind, request = "get card", ("GET", f"/cards/{card['id']}", None)
+            elif roll < 60:
+                kind, request = "previous", ("POST", path + "/previous", None)
+            else:
+                kind, request = "next", ("POST", path + "/next", None)
+            start = time.perf_counter()
+            result = await client.request(*request)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            if kind in ("next", "previous"):
+                session = result
+    finally:
+        client.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(kind, values, seconds):
+    values.sort()
+    print(f"  {kind:<10} {len(values):>9} {len(values) / seconds:>10.0f}/s  p50 {percentile(values, 0.5) * 1000:>7.2f} ms"
+          f"  p99 {percentile(values, 0.99) * 1000:>7.2f} ms  max {values[-1] * 1000:>7.2f} ms")
+
+
+async def run(host, port, args):
+    latencies = {}
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(*(study(host, port, deadline, args.writes, seed, latencies) for seed in range(args.clients)))
+    seconds = time.perf_counter() - start
+
+    print(f"{args.clients} clients, {args.seconds} s, {args.writes}% writes")
+    everything = [value for values in latencies.values() for value in values]
+    report("all", everything, seconds)
+    for kind, values in sorted(latencies.items()):
+        report(kind, values, seconds)
+
+
+def start_server(deck_path):
+    """
+    Starts the server on a free port and returns (process, host, port).
+    """
+    process = subprocess.Popen([sys.executable, "-m", "flipwise", "serve", "--port", "0", deck_path],
+                               cwd = SRC, stdout = subprocess.PIPE, text = True)
+    line = process.stdout.readline()
+    match = re.search(r"http://([^:]+):(\d+)", line)
+    if match is None:
+        process.kill()
+        raise RuntimeError(f"server did not start: {line!r}")
+    return process, match.group(1), int(match.group(2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type = int, default = 100_000)
+    parser.add_argument("--clients", type = int, default = 50)
+    parser.add_argument("--seconds", type = float, default = 10.0)
+    parser.add_argument("--writes", type = float, default = 5.0, help = "percent of requests that edit or add a card")
+    parser.add_argument("--url", help = "a running server, e.g. http://127.0.0.1:8765")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        asyncio.run(run(url.hostname, url.port, args))
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        deck_path = os.path.join(folder, "deck.json")
+        writer.write_deck(deck_path, generate_cards(args.cards))
+        process, host, port = start_server(deck_path)
+        try:
+            asyncio.run(run(host, port, args))
+        finally:
+            process.send_signal(signal.SIGINT)
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Measures the cold start of the command line tools against their budget.
+
+Each command runs in a fresh interpreter, as it would in a batch job. The
+script also checks that no command imports tkinter, and exits with status 1
+if a command is over budget or does.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 15] [--budget-ms 100]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SAMPLE = os.path.join(ROOT, "flashcards.json")
+
+# Median wall time allowed per command on a small deck, interpreter start included
+STARTUP_BUDGET_MS = 100
+
+
+def run(arguments, env):
+    return subprocess.run([sys.executable, "-X", "importtime", "-m", "flipwise"] + arguments,
+                          env = env, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, text = True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type = int, default = 15)
+    parser.add_argument("--budget-ms", type = float, default = STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH = os.path.join(ROOT, "src"))
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        commands = [
+            ["--help"],
+            ["validate", SAMPLE],
+            ["stats", SAMPLE],
+            ["convert", SAMPLE, os.path.join(directory, "deck.csv")],
+        ]
+        for arguments in commands:
+            if "tkinter" in run(arguments, env).stderr:
+                print(f"{' '.join(arguments)}: imports tkinter")
+                failed = True
+
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-m", "flipwise"] + arguments, env = env, stdout = subprocess.DEVNULL)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            verdict = "ok" if median <= args.budget_ms else "OVER BUDGET"
+            failed = failed or median > args.budget_ms
+            name = " ".join(arguments[:1])
+            print(f"  {name:<10} median {median:6.1f} ms  (budget {args.budget_ms:.0f} ms)  {verdict}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Times the hot paths of a deck on synthetic decks and writes the results as JSON.
+
+Everything runs on flipwise.engine.Deck, without a window. Results of two
+runs, e.g. from two commits, can be compared with --compare.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000 10000 100000] [--output results.json]
+    python benchmarks/bench_suite.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+from flipwise import writer
+from flipwise.engine import Deck
+
+# Operations timed per size for the cheap, repeated benchmarks
+NAVIGATION_STEPS = 100_000
+CATEGORY_SWITCHES = 200
+SHUFFLE_TOGGLES = 20
+DELETES = 1000
+
+
+class Suite:
+    """
+    Collects timings as {"name", "cards", "ops", "seconds", "per_op_us"} records.
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def record(self, name, cards, ops, seconds):
+        self.results.append({"name": name, "cards": cards, "ops": ops, "seconds": seconds, "per_op_us": seconds / ops * 1e6})
+        print(f"  {name:<22} {cards:>10} cards {ops:>8} ops {seconds:>10.4f} s {seconds / ops * 1e6:>12.2f} us/op")
+
+    def time(self, name, cards, ops, function):
+        """
+        Runs function() once and records it as ops operations.
+        """
+        start = time.perf_counter()
+        function()
+        self.record(name, cards, ops, time.perf_counter() - start)
+
+
+def bench_size(suite, size, categories, text_length, seed, directory):
+    paths = {kind: os.path.join(directory, f"deck-{size}.{kind}") for kind in ("json", "csv")}
+    for path in paths.values():
+        writer.write_deck(path, generate_cards(size, categories, text_length, seed))
+
+    decks = {}
+    for kind, path in paths.items():
+        suite.time(f"load_{kind}", size, size, lambda: decks.setdefault(kind, Deck.load(path)))
+        saved = os.path.join(directory, f"saved.{kind}")
+        suite.time(f"save_{kind}", size, size, lambda: decks[kind].export(saved))
+        os.remove(saved)
+    decks["csv"].close()
+
+    # The view benchmarks run on the deck loaded from JSON
+    deck = decks["json"]
+
+    names = deck.category_index.categories()
+    rng = random.Random(seed)
+
+    def switch_category():
+        for i in range(CATEGORY_SWITCHES):
+            deck.switch_category(names[i % len(names)] if i % 2 else "All")
+
+    def refresh_categories():
+        for _ in range(CATEGORY_SWITCHES):
+            ["All"] + deck.category_index.categories()
+
+    def toggle_shuffle_mode():
+        for _ in range(SHUFFLE_TOGGLES):
+            deck.toggle_shuffle_mode()
+
+    def navigate(step):
+        def run():
+            for _ in range(NAVIGATION_STEPS):
+                step()
+                deck.flashcards.front(deck.current_card())
+        return run
+
+    # Leave cards for the shuffled deletes
+    deletes = min(DELETES, size // 4) or 1
+
+    def delete():
+        for _ in range(deletes):
+            deck.current_index = rng.randrange(len(deck.filtered_cards))
+            deck.delete(deck.current_card())
+
+    suite.time("switch_category", size, CATEGORY_SWITCHES, switch_category)
+    suite.time("refresh_categories", size, CATEGORY_SWITCHES, refresh_categories)
+    deck.switch_category("All")
+    suite.time("toggle_shuffle_mode", size, SHUFFLE_TOGGLES, toggle_shuffle_mode)
+    suite.time("next_card", size, NAVIGATION_STEPS, navigate(deck.next_card))
+    suite.time("previous_card", size, NAVIGATION_STEPS, navigate(deck.previous_card))
+    suite.time("delete", size, deletes, delete)
+    deck.toggle_shuffle_mode()
+    suite.time("delete_shuffled", size, deletes, delete)
+    deck.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old_path, new_path):
+    """
+    Prints the change of every benchmark between two result files.
+    """
+    with open(old_path, encoding = "utf-8") as file:
+        old = {(r["name"], r["cards"]): r for r in json.load(file)["results"]}
+    with open(new_path, encoding = "utf-8") as file:
+        new = json.load(file)["results"]
+    for result in new:
+        before = old.get((result["name"], result["cards"]))
+        if before is None:
+            continue
+        ratio = result["per_op_us"] / before["per_op_us"] if before["per_op_us"] else float("inf")
+        flag = "  SLOWER" if ratio > 1.2 else ""
+        print(f"  {result['name']:<22} {result['cards']:>10} cards {before['per_op_us']:>12.2f} -> {result['per_op_us']:>12.2f} us/op  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10_000, 100_000])
+    parser.add_argument("--categories", type = int, default = 50)
+    parser.add_argument("--text-length", type = int, default = 40)
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--output", default = "benchmark-results.json")
+    parser.add_argument("--compare", nargs = 2, metavar = ("OLD", "NEW"), help = "compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    suite = Suite()
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            print(f"{size} cards")
+            bench_size(suite, size, args.categories, args.text_length, args.seed, directory)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"categories": args.categories, "text_length": args.text_length, "seed": args.seed},
+        "results": suite.results,
+    }
+    with open(args.output, "w", encoding = "utf-8") as file:
+        json.dump(report, file, indent = 2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
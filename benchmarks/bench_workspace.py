@@ -0,0 +1,79 @@
+"""
+Times switching between the decks of a workspace.
+
+Synthetic decks are written to a temporary folder and visited in a loop
+the way the window does it: take() the next deck, then prefetch_next().
+For each switch the script reports whether the deck came from the cache,
+from a finished prefetch, or had to be read on the spot, and how long the
+switch took. Cold Deck.load is timed first, for reference.
+
+Usage:
+    python benchmarks/bench_workspace.py [--decks 4] [--cards 100000] [--rounds 3] [--budget-mb 512] [--think-ms 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from synthetic import generate_cards
+
+from flipwise import writer
+from flipwise.engine import Deck
+from flipwise.workspace import Workspace
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("--decks", type = int, default = 4)
+    parser.add_argument("--cards", type = int, default = 100_000, help = "cards per deck")
+    parser.add_argument("--rounds", type = int, default = 3, help = "times every deck is visited")
+    parser.add_argument("--budget-mb", type = int, default = 512)
+    parser.add_argument("--think-ms", type = int, default = 500, help = "time spent on a deck before switching")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for number in range(args.decks):
+            file_path = os.path.join(folder, f"deck-{number}.json")
+            writer.write_deck(file_path, generate_cards(args.cards, seed = number))
+            paths.append(file_path)
+
+        start = time.perf_counter()
+        Deck.load(paths[0]).close()
+        print(f"{args.decks} decks of {args.cards} cards; cold load {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        workspace = Workspace(args.budget_mb * 2**20)
+        for file_path in paths:
+            workspace.add(file_path)
+        times = {"cached": [], "prefetched": [], "read": []}
+        for visit in range(args.decks * args.rounds):
+            file_path = workspace.paths[visit % args.decks]
+            cached = workspace.is_cached(file_path)
+            start = time.perf_counter()
+            deck = workspace.take(file_path)
+            if deck is None:
+                prefetched = workspace.is_loading(file_path)
+                workspace.prefetch(file_path)
+                while workspace.is_loading(file_path):
+                    time.sleep(0.001)
+                deck = workspace.take(file_path)
+            else:
+                prefetched = not cached
+            seconds = time.perf_counter() - start
+            kind = "cached" if cached else "prefetched" if prefetched else "read"
+            times[kind].append(seconds)
+            workspace.prefetch_next()
+            time.sleep(args.think_ms / 1000)
+        workspace.close()
+
+        for kind, samples in times.items():
+            if samples:
+                print(f"  {kind:<11} {len(samples):>4} switches  median {statistics.median(samples) * 1000:>9.2f} ms  max {max(samples) * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
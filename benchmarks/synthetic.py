@@ -0,0 +1,89 @@
+"""
+Generates seeded synthetic decks for the benchmarks.
+
+The same seed, size and settings always produce the same cards, so timings
+from different commits are measured on identical input.
+
+Usage:
+    python benchmarks/synthetic.py deck.json [--cards 1000000] [--categories 50] [--text-length 40] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flipwise import writer
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "qua", "ben", "dor", "fel", "gri", "hux", "jo"]
+
+# Distinct words the card text is drawn from
+VOCABULARY = 20000
+
+
+def make_vocabulary(rng, size = VOCABULARY):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k = rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_text(rng, words, length):
+    """
+    Returns words joined by spaces, about length characters long.
+    """
+    text = []
+    size = 0
+    while size < length:
+        word = rng.choice(words)
+        text.append(word)
+        size += len(word) + 1
+    return " ".join(text)
+
+
+def generate_cards(count, categories = 50, text_length = 40, seed = 1):
+    """
+    Yields count flashcard dicts.
+
+    Args:
+        count (int): Number of cards.
+        categories (int): Number of distinct categories, used round-robin
+            with some random skew.
+        text_length (int): Approximate length of the front in characters;
+            backs are half as long.
+        seed (int): Random seed.
+    """
+    rng = random.Random(seed)
+    words = make_vocabulary(rng)
+    names = [f"Category {i}" for i in range(categories)]
+    for i in range(count):
+        category = names[i % categories] if rng.random() < 0.8 else rng.choice(names)
+        yield {"front": make_text(rng, words, text_length) + "?", "back": make_text(rng, words, text_length // 2), "category": category}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument("path", help = "deck file to write (.json, .csv or .flipwise)")
+    parser.add_argument("--cards", type = int, default = 100_000)
+    parser.add_argument("--categories", type = int, default = 50)
+    parser.add_argument("--text-length", type = int, default = 40)
+    parser.add_argument("--seed", type = int, default = 1)
+    args = parser.parse_args()
+
+    cards = generate_cards(args.cards, args.categories, args.text_length, args.seed)
+    if args.path.endswith(".flipwise"):
+        from flipwise.deckdb import SqliteCardStore
+
+        if os.path.exists(args.path):
+            os.remove(args.path)
+        store = SqliteCardStore(args.path, create = True)
+        store.extend(cards)
+        store.close()
+    else:
+        writer.write_deck(args.path, cards)
+    print(f"wrote {args.cards} cards to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
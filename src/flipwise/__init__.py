@@ -0,0 +1,3 @@
+"""
+FlipWise deck handling that does not depend on the Tkinter window.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from flipwise.cli import main
+
+sys.exit(main())
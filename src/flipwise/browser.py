@@ -0,0 +1,180 @@
+from array import array
+import bisect
+
+from flipwise.deckdb import SqliteCardStore
+
+# Columns of the card browser, in display order
+COLUMNS = ("front", "back", "category")
+
+# A .flipwise table larger than this is sorted from one scan of the
+# database instead of a query per card
+SCAN_SORT_MIN = 4096
+
+
+def insert_position(cards, key, value, descending = False):
+    """
+    Returns where a card goes in cards sorted by key: after the cards with
+    an equal key, as it was added after them.
+    """
+    low, high = 0, len(cards)
+    while low < high:
+        middle = (low + high) // 2
+        other = key(cards[middle])
+        if other >= value if descending else other <= value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class CardTable:
+    """
+    The rows of the card browser: the cards of one category, in deck order
+    or sorted by a column.
+
+    In deck order the rows are the live list kept by the category index,
+    so opening the table copies nothing and edits show up at once. Sorting
+    builds an array of card IDs once; cards added, deleted or moved to
+    another category afterwards are fitted into it, while an edited card
+    keeps its place until the table is sorted again. rows() reads only
+    the cards asked for, so a view pays for the rows on screen, not for
+    the size of the deck.
+    """
+
+    def __init__(self, deck, category = "All"):
+        """
+        Args:
+            deck (Deck): The deck to list.
+            category (str): The category to list, "All" for every card.
+        """
+        self.deck = deck
+        self.category = category
+        self.sort_column = None
+        self.descending = False
+        self._sorted = None
+        self._store = None
+        self._generation = 0
+        self._slots = 0
+
+    def __len__(self):
+        """
+        Returns the number of rows.
+        """
+        return len(self.cards())
+
+    def set_category(self, category):
+        """
+        Lists another category, keeping the sort column.
+        """
+        self.category = category
+        self.sort(self.sort_column, self.descending)
+
+    def sort(self, column, descending = False):
+        """
+        Orders the rows by a column of COLUMNS, or by deck order for None.
+        Text is compared ignoring case; ties stay in deck order.
+        """
+        self.sort_column = column
+        self.descending = descending
+        self._sorted = None
+        if column is None:
+            return
+        store = self.deck.flashcards
+        cards = self.deck.category_index.cards(self.category)
+        if isinstance(store, SqliteCardStore) and column != "category" and len(cards) >= SCAN_SORT_MIN:
+            keys = self._scan_keys(cards)
+            order = sorted(cards, key = keys.__getitem__, reverse = descending)
+        else:
+            order = sorted(cards, key = self._key(), reverse = descending)
+        self._sorted = array("I", order)
+        self._store = store
+        self._generation = store.generation
+        self._slots = store.slots
+
+    def _key(self):
+        """
+        Returns the sort key of a card for the sort column.
+        """
+        store = self.deck.flashcards
+        if self.sort_column == "category":
+            names = store.category_names()
+            ranks = array("I", bytes(4 * len(names)))
+            for rank, category_id in enumerate(sorted(range(len(names)), key = lambda number: names[number].casefold())):
+                ranks[category_id] = rank
+            return lambda card_id: ranks[store.category_id(card_id)]
+        text = store.front if self.sort_column == "front" else store.back
+        return lambda card_id: text(card_id).casefold()
+
+    def _scan_keys(self, cards):
+        """
+        Reads the sort column of the listed cards of a .flipwise deck in one
+        pass over the database.
+
+        Returns:
+            dict: {card ID: sort key}
+        """
+        store = self.deck.flashcards
+        listed = bytearray(store.slots)
+        for card_id in cards:
+            listed[card_id] = 1
+        field = 1 if self.sort_column == "front" else 2
+        return {row[0]: row[field].casefold() for row in store.texts() if listed[row[0]]}
+
+    def cards(self):
+        """
+        Returns the card IDs of the rows, in order.
+        """
+        if self.sort_column is None:
+            return self.deck.category_index.cards(self.category)
+        self._update()
+        return self._sorted
+
+    def _update(self):
+        """
+        Fits the edits made since the table was sorted into the order.
+        """
+        store = self.deck.flashcards
+        if store is not self._store or store.generation != self._generation:
+            # A reloaded deck, or a cleared one whose IDs start over
+            self.sort(self.sort_column, self.descending)
+            return
+        live = self.deck.category_index.cards(self.category)
+        if store.slots != self._slots:
+            key = self._key()
+            for card_id in live[bisect.bisect_left(live, self._slots):]:
+                self._sorted.insert(insert_position(self._sorted, key, key(card_id), self.descending), card_id)
+            self._slots = store.slots
+        if len(self._sorted) != len(live):
+            if self.category == "All":
+                listed = store.is_alive
+            else:
+                listed = lambda card_id: store.is_alive(card_id) and store.category(card_id) == self.category
+            self._sorted = array("I", filter(listed, self._sorted))
+            if len(self._sorted) != len(live):
+                # Cards moved in from another category
+                self.sort(self.sort_column, self.descending)
+
+    def rows(self, first, count):
+        """
+        Reads a page of rows.
+
+        Returns:
+            list: (card ID, front, back, category) of the rows from first on,
+            at most count of them.
+        """
+        store = self.deck.flashcards
+        return [(card_id, store.front(card_id), store.back(card_id), store.category(card_id))
+                for card_id in self.cards()[first:first + count]]
+
+    def position(self, card_id):
+        """
+        Returns the row of a card, or None if it is not listed.
+        """
+        cards = self.cards()
+        if self.sort_column is None:
+            position = bisect.bisect_left(cards, card_id)
+            return position if position < len(cards) and cards[position] == card_id else None
+        try:
+            return cards.index(card_id)
+        except ValueError:
+            return None
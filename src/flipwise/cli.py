@@ -0,0 +1,177 @@
+"""
+Command line tools for FlipWise decks.
+
+Usage:
+    python -m flipwise convert [--compact] SOURCE TARGET
+    python -m flipwise merge [--update] TARGET SOURCE [SOURCE ...]
+    python -m flipwise validate DECK [DECK ...]
+    python -m flipwise stats [--json] DECK [DECK ...]
+    python -m flipwise serve [--host HOST] [--port PORT] DECK
+
+Run from the src directory, or with src on PYTHONPATH. This module only
+imports argparse up front; the deck modules are imported by the command
+that needs them, so the tools start quickly and never load Tkinter.
+"""
+import argparse
+import sys
+
+# Problems reported per deck by validate before giving up on the rest
+MAX_PROBLEMS = 20
+
+
+def convert(args):
+    """
+    Rewrites a deck in another format, with its unsaved journal changes
+    and scheduling state. A target ending in .gz or .xz is compressed.
+    """
+    from flipwise.engine import Deck
+
+    deck = Deck.load(args.source)
+    try:
+        count = deck.export(args.target, args.compact)
+    finally:
+        deck.close()
+    print(f"{args.source} -> {args.target}: {count} cards")
+    return 0
+
+
+def merge(args):
+    """
+    Combines decks into one, in the order given. A card whose front, back
+    and category all match an earlier card, ignoring case and extra
+    whitespace, is left out; with --update, a card matching an earlier one
+    on front and category replaces its back.
+    """
+    from flipwise.engine import Deck
+
+    deck = Deck()
+    result = deck.merge(args.sources, update = args.update)
+    count = deck.export(args.target)
+    print(f"{args.target}: {count} cards from {len(args.sources)} decks, "
+          f"{result.duplicates} duplicates skipped, {result.updated} updated")
+    return 0
+
+
+def validate(args):
+    """
+    Reads decks completely and reports the ones that cannot be loaded or
+    hold cards with an empty front or back.
+    """
+    from flipwise.loader import iter_cards
+
+    failed = 0
+    for path in args.decks:
+        problems = []
+        count = 0
+        try:
+            for count, card in enumerate(iter_cards(path), 1):
+                for side in ("front", "back"):
+                    value = card[side]
+                    if not isinstance(value, str) or not value.strip():
+                        problems.append(f"card {count}: empty {side}")
+                if len(problems) >= MAX_PROBLEMS:
+                    break
+        except Exception as e:
+            problems.append(f"after card {count}: {e}")
+
+        if problems:
+            failed += 1
+            print(f"{path}: INVALID")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"{path}: ok, {count} cards")
+    return 1 if failed else 0
+
+
+def stats(args):
+    """
+    Prints card counts per category and by study state, and the review
+    history of each category.
+    """
+    import json
+
+    from flipwise.engine import Deck
+
+    results = {}
+    for path in args.decks:
+        deck = Deck.load(path)
+        try:
+            results[path] = deck.stats()
+        finally:
+            deck.close()
+
+    if args.json:
+        json.dump(results, sys.stdout, indent = 2, ensure_ascii = False)
+        print()
+        return 0
+    for path, summary in results.items():
+        print(f"{path}: {summary['cards']} cards, {summary['new']} new, {summary['reviewed']} reviewed, {summary['due']} due")
+        for name, count in summary["categories"].items():
+            print(f"  {count:>8}  {name}")
+        if summary["reviews"]:
+            print("  reviews   time/card  accuracy  category")
+        for name, reviews in summary["reviews"].items():
+            seconds = reviews["seconds"] / reviews["reviews"] if reviews["reviews"] else 0.0
+            accuracy = f"{reviews['correct'] / reviews['graded']:.0%}" if reviews["graded"] else "-"
+            print(f"  {reviews['reviews']:>7}  {seconds:>8.1f}s  {accuracy:>8}  {name}")
+    return 0
+
+
+def serve(args):
+    """
+    Serves a deck over HTTP/JSON until interrupted, with a study session
+    per client and autosave; see flipwise.server for the API.
+    """
+    from flipwise import server
+
+    server.serve(args.deck, args.host, args.port)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog = "python -m flipwise", description = "Batch tools for FlipWise decks (.flipwise, .json, .csv, optionally .gz or .xz).")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    command = commands.add_parser("convert", help = "convert a deck to another format")
+    command.add_argument("--compact", action = "store_true", help = "write JSON without whitespace")
+    command.add_argument("source")
+    command.add_argument("target")
+    command.set_defaults(run = convert)
+
+    command = commands.add_parser("merge", help = "merge decks into a new deck")
+    command.add_argument("target")
+    command.add_argument("--update", action = "store_true", help = "replace the back of cards with the same front and category")
+    command.add_argument("sources", nargs = "+")
+    command.set_defaults(run = merge)
+
+    command = commands.add_parser("validate", help = "check that decks load")
+    command.add_argument("decks", nargs = "+")
+    command.set_defaults(run = validate)
+
+    command = commands.add_parser("stats", help = "print deck statistics")
+    command.add_argument("--json", action = "store_true", help = "print JSON")
+    command.add_argument("decks", nargs = "+")
+    command.set_defaults(run = stats)
+
+    command = commands.add_parser("serve", help = "serve a deck over HTTP/JSON")
+    command.add_argument("--host", default = "127.0.0.1", help = "address to listen on (default: %(default)s)")
+    command.add_argument("--port", type = int, default = 8765, help = "port to listen on, 0 for any (default: %(default)s)")
+    command.add_argument("deck")
+    command.set_defaults(run = serve)
+    return parser
+
+
+def main(argv = None):
+    """
+    Runs the command line tools.
+
+    Returns:
+        int: The exit status.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.run(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file = sys.stderr)
+        return 1
@@ -0,0 +1,388 @@
+from array import array
+import collections
+import contextlib
+import errno
+import os
+import sqlite3
+import sys
+
+from flipwise.store import CardStore
+
+# Extension of FlipWise deck databases
+DECK_EXTENSION = ".flipwise"
+
+# Number of recently shown cards whose text is kept in memory
+TEXT_CACHE_SIZE = 256
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_category ON cards (category, id);
+CREATE TABLE IF NOT EXISTS schedule (
+    id INTEGER PRIMARY KEY,
+    due REAL NOT NULL,
+    interval REAL NOT NULL,
+    ease REAL NOT NULL,
+    reps INTEGER NOT NULL
+);
+"""
+
+
+def connect(file_path, create = False):
+    """
+    Opens a deck database, creating the schema if the file is new.
+
+    Args:
+        file_path (str): Path of the .flipwise file.
+        create (bool): Create the file if it is missing.
+
+    Returns:
+        sqlite3.Connection: A connection in autocommit mode.
+
+    Raises:
+        FileNotFoundError: If the file is missing and create is False.
+    """
+    # SQLite would create a missing file, leaving an empty deck behind
+    if not create and not os.path.exists(file_path):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_path)
+    connection = sqlite3.connect(file_path, isolation_level = None)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        connection.close()
+        raise ValueError(f"{file_path} was written by a newer version of FlipWise")
+
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    if version < SCHEMA_VERSION:
+        connection.executescript(SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+@contextlib.contextmanager
+def open_rows(file_path):
+    """
+    Streams the (row ID, category) pairs of a deck database in ID order.
+
+    Card text is not read. This has the same shape as loader.open_cards so
+    a DeckLoader can scan a database on its worker thread, using its own
+    connection.
+
+    Yields:
+        tuple: (rows, progress) where rows iterates over (rowid, category)
+        and progress() returns the fraction of the rows read so far.
+    """
+    connection = connect(file_path)
+    try:
+        total = connection.execute("SELECT count(*) FROM cards").fetchone()[0]
+        read = 0
+
+        def rows():
+            nonlocal read
+            cursor = connection.execute("SELECT id, category FROM cards ORDER BY id")
+            while True:
+                chunk = cursor.fetchmany(1000)
+                if not chunk:
+                    return
+                read += len(chunk)
+                yield from chunk
+
+        def progress():
+            return read / total if total else 1.0
+
+        yield rows(), progress
+    finally:
+        connection.close()
+
+
+class SqliteCardStore(CardStore):
+    """
+    A CardStore whose cards live in a .flipwise SQLite database.
+
+    Only the row ID and category of each card are kept in memory. Front
+    and back text are read from the database when a card is displayed
+    and the most recently used cards are cached. Every add, edit and
+    delete is a single-row write.
+    """
+
+    def __init__(self, file_path, create = False):
+        """
+        Args:
+            file_path (str): Path of the .flipwise file.
+            create (bool): Create the file if it is missing.
+        """
+        self.file_path = file_path
+        self.connection = connect(file_path, create)
+        super().__init__()
+
+    def _reset(self):
+        self._rowid = array("q")
+        self._category = array("I")
+        self._alive = bytearray()
+        self._live = 0
+        self._categories = []
+        self._category_ids = {}
+        self._cache = collections.OrderedDict()
+
+    @classmethod
+    def from_store(cls, file_path, store, scheduler = None):
+        """
+        Writes every card of a store into a new deck database.
+
+        The returned store uses the same card IDs as the source store, so
+        indexes built over it stay valid.
+
+        Args:
+            file_path (str): Path of the .flipwise file to create.
+            store (CardStore): The cards to write.
+            scheduler (Scheduler): Optional scheduling state to write too.
+        """
+        deck = cls(file_path, create = True)
+        connection = deck.connection
+        with deck.transaction():
+            connection.execute("DELETE FROM cards")
+            connection.execute("DELETE FROM schedule")
+            for card_id in range(store.slots):
+                if store.is_alive(card_id):
+                    cursor = connection.execute(
+                        "INSERT INTO cards (front, back, category) VALUES (?, ?, ?)",
+                        (store.front(card_id), store.back(card_id), store.category(card_id)))
+                    deck._append(cursor.lastrowid, store.category(card_id))
+                    if scheduler is not None and card_id < len(scheduler._due) and scheduler.is_reviewed(card_id):
+                        deck.save_schedule(card_id, *scheduler.state(card_id))
+                else:
+                    deck._rowid.append(0)
+                    deck._category.append(0)
+                    deck._alive.append(0)
+        return deck
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Groups several writes into one transaction.
+        """
+        self.connection.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def _append(self, rowid, category):
+        card_id = len(self._alive)
+        self._rowid.append(rowid)
+        self._category.append(self.intern(category))
+        self._alive.append(1)
+        self._live += 1
+        return card_id
+
+    def load_batch(self, rows):
+        """
+        Registers (rowid, category) pairs read by open_rows.
+
+        Returns:
+            range: The IDs given to the cards.
+        """
+        first = len(self._alive)
+        append = self._append
+        for rowid, category in rows:
+            append(rowid, category)
+        return range(first, len(self._alive))
+
+    def add(self, front, back, category):
+        cursor = self.connection.execute(
+            "INSERT INTO cards (front, back, category) VALUES (?, ?, ?)", (front, back, category))
+        return self._append(cursor.lastrowid, category)
+
+    def extend(self, cards):
+        with self.transaction():
+            return super().extend(cards)
+
+    def _fetch(self, card_id):
+        """
+        Returns (front, back) of a card, reading it from disk if not cached.
+        """
+        cache = self._cache
+        text = cache.get(card_id)
+        if text is not None:
+            cache.move_to_end(card_id)
+            return text
+        row = self.connection.execute(
+            "SELECT front, back FROM cards WHERE id = ?", (self._rowid[card_id],)).fetchone()
+        if row is None:
+            raise KeyError(card_id)
+        cache[card_id] = row
+        if len(cache) > TEXT_CACHE_SIZE:
+            cache.popitem(last = False)
+        return row
+
+    def front(self, card_id):
+        return self._fetch(card_id)[0]
+
+    def back(self, card_id):
+        return self._fetch(card_id)[1]
+
+    def cards(self):
+        """
+        Streams every card from the database in ID order.
+        """
+        cursor = self.connection.execute("SELECT front, back, category FROM cards ORDER BY id")
+        for front, back, category in cursor:
+            yield {"front": front, "back": back, "category": category}
+
+    def texts(self):
+        """
+        Streams (card ID, front, back) of every card in ID order, bypassing
+        the text cache.
+        """
+        # Live card IDs and row IDs increase together
+        cursor = self.connection.execute("SELECT front, back FROM cards ORDER BY id")
+        for card_id, (front, back) in zip(self, cursor):
+            yield card_id, front, back
+
+    def text_snapshot(self):
+        """
+        Returns texts() of the deck as it is now, safe to read on another
+        thread while the store keeps changing.
+        """
+        live_ids = array("I", self)
+        connection = sqlite3.connect(self.file_path, check_same_thread = False)
+        # The statement holds a WAL read snapshot from its first step on
+        cursor = connection.execute("SELECT front, back FROM cards ORDER BY id")
+
+        def texts():
+            try:
+                for card_id, (front, back) in zip(live_ids, cursor):
+                    yield card_id, front, back
+            finally:
+                connection.close()
+
+        return texts()
+
+    def card_snapshot(self):
+        """
+        Like text_snapshot(), with the category: streams (card ID, front,
+        back, category) of the deck as it is now.
+        """
+        live_ids = array("I", self)
+        connection = sqlite3.connect(self.file_path, check_same_thread = False)
+        cursor = connection.execute("SELECT front, back, category FROM cards ORDER BY id")
+
+        def cards():
+            try:
+                for card_id, (front, back, category) in zip(live_ids, cursor):
+                    yield card_id, front, back, category
+            finally:
+                connection.close()
+
+        return cards()
+
+    def update(self, card_id, front, back, category):
+        if not self.is_alive(card_id):
+            raise KeyError(card_id)
+        self.connection.execute(
+            "UPDATE cards SET front = ?, back = ?, category = ? WHERE id = ?",
+            (front, back, category, self._rowid[card_id]))
+        self._category[card_id] = self.intern(category)
+        self._cache.pop(card_id, None)
+
+    def remove(self, card_id):
+        if not self.is_alive(card_id):
+            raise KeyError(card_id)
+        self.connection.execute("DELETE FROM cards WHERE id = ?", (self._rowid[card_id],))
+        self.connection.execute("DELETE FROM schedule WHERE id = ?", (self._rowid[card_id],))
+        self._alive[card_id] = 0
+        self._live -= 1
+        self._cache.pop(card_id, None)
+
+    def clear(self):
+        with self.transaction():
+            self.connection.execute("DELETE FROM cards")
+            self.connection.execute("DELETE FROM schedule")
+        self._reset()
+        self.generation += 1
+
+    def take(self):
+        """
+        Deletes every card like clear() and returns them, under the same
+        IDs, as an in-memory CardStore; their text is read out first.
+        """
+        taken = CardStore()
+        rows = self.connection.execute("SELECT front, back, category FROM cards ORDER BY id")
+        for card_id in range(self.slots):
+            if self._alive[card_id]:
+                taken.add(*next(rows))
+            else:
+                taken.remove(taken.add("", "", ""))
+        rows.close()
+        self.clear()
+        return taken
+
+    def save_schedule(self, card_id, due, interval, ease, reps):
+        """
+        Stores the spaced-repetition state of one card.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO schedule (id, due, interval, ease, reps) VALUES (?, ?, ?, ?, ?)",
+            (self._rowid[card_id], due, interval, ease, reps))
+
+    def load_schedule(self, scheduler):
+        """
+        Restores the spaced-repetition state of every card into a Scheduler.
+
+        Both the schedule table and the card IDs are in row ID order, so
+        the two are merged in one pass.
+
+        Returns:
+            int: Number of cards whose state was restored.
+        """
+        rowids = self._rowid
+        card_id = 0
+        restored = 0
+        scheduler.ensure(len(rowids))
+        for rowid, due, interval, ease, reps in self.connection.execute(
+                "SELECT id, due, interval, ease, reps FROM schedule ORDER BY id"):
+            while card_id < len(rowids) and (rowids[card_id] < rowid or not self._alive[card_id]):
+                card_id += 1
+            if card_id == len(rowids):
+                break
+            if rowids[card_id] == rowid:
+                scheduler.set_state(card_id, due, interval, ease, reps)
+                restored += 1
+        return restored
+
+    def compact(self):
+        """
+        Text is not held in memory, so there is nothing to compact.
+        """
+
+    def copy_to(self, file_path):
+        """
+        Copies the whole database to another .flipwise file.
+        """
+        target = sqlite3.connect(file_path)
+        try:
+            self.connection.backup(target)
+        finally:
+            target.close()
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self.connection.close()
+
+    def nbytes(self):
+        columns = (self._rowid, self._category, self._alive)
+        total = sum(sys.getsizeof(column) for column in columns)
+        total += sys.getsizeof(self._categories) + sys.getsizeof(self._category_ids)
+        total += sum(sys.getsizeof(name) for name in self._categories)
+        total += sum(len(front) + len(back) for front, back in self._cache.values())
+        return total
@@ -0,0 +1,1161 @@
+from array import array
+import bisect
+import contextlib
+import itertools
+import os
+import random
+import time
+
+from flipwise import writer
+from flipwise.deckdb import SqliteCardStore, open_rows
+from flipwise.folder import FolderLoader, FolderResult, deck_files, parse_decks
+from flipwise.history import FLIP, GRADED, NEXT, PREVIOUS, ReviewLog, history_path
+from flipwise.index import CategoryIndex
+from flipwise.journal import Compactor, Journal, replay, set_aside
+from flipwise.loader import BATCH_SIZE, DeckLoader, deck_format, open_cards
+from flipwise.merge import Merger
+from flipwise.scheduler import Scheduler, card_key, load_sidecar, save_sidecar
+from flipwise.search import Indexer, SearchIndex
+from flipwise.shuffle import ShuffledView
+from flipwise.store import CardStore
+from flipwise.undo import Clearing, Insertion, Refill, Removal, Reverted, Rewrite, UndoLog
+
+# Graded cards that previous_card() can return to in study mode
+STUDY_HISTORY = 100
+
+
+class Deck:
+    """
+    A deck of flashcards and the view it is studied through.
+
+    The deck owns the card store, its category, search and scheduling
+    indexes, the journal that autosaves edits, and a cursor over the cards
+    that pass the current category and search filters. Nothing here
+    imports Tkinter: FlipWiseApp drives a Deck from the UI, and scripts
+    and the command line use it directly.
+    """
+
+    def __init__(self, store = None):
+        """
+        Args:
+            store (CardStore): Optional cards to start from; an empty
+                CardStore by default.
+        """
+        self.flashcards = CardStore() if store is None else store
+        self.category_index = CategoryIndex.build(self.flashcards)
+        self.scheduler = Scheduler()
+        self.deck_path = None
+        self.journal = None
+
+        # Background save: the writer thread and the edits made since its snapshot
+        self.saver = None
+        self.save_backlog = []
+
+        # The cards that pass the filters, and the cursor over them
+        self.filtered_cards = self.category_index.all
+        self.current_index = 0
+        self.showing_front = True
+        self.is_shuffle_mode = False
+        self.shuffle_seed = None
+        self.current_category = "All"
+
+        # Spaced repetition: the card being studied and the ones graded before it
+        self.is_study_mode = False
+        self.study_card = None
+        self.study_history = []
+        self.next_review = None
+
+        # Full-text search; None while no index is available
+        self.search_index = SearchIndex.build(self.flashcards.texts())
+        self.indexer = None
+        self.search_backlog = []
+        self.search_query = ""
+        self.search_applied = False
+
+        # Review history of a deck kept in a file, and when the current card was shown
+        self.history = None
+        self.card_shown_at = time.time()
+
+        # Undo and redo of adds, edits, deletes and clears
+        self.undo_log = UndoLog()
+
+    # Loading and saving
+
+    @classmethod
+    def for_file(cls, file_path):
+        """
+        Creates an empty deck of the right kind to load a deck file into.
+
+        A .flipwise deck keeps its text on disk, so only its IDs and
+        categories are read; JSON and CSV decks are read into memory.
+
+        Raises:
+            FileNotFoundError: If a .flipwise file does not exist.
+        """
+        kind = deck_format(file_path)
+        if kind is None:
+            raise ValueError(f"Unknown deck format: {file_path}")
+        if kind == "flipwise":
+            return cls(SqliteCardStore(file_path))
+        return cls()
+
+    @classmethod
+    def load(cls, file_path, autosave = False):
+        """
+        Reads a whole deck file on the calling thread.
+
+        Args:
+            file_path (str): Path of a .flipwise, JSON or CSV deck.
+            autosave (bool): Keep journaling edits to a JSON or CSV deck.
+                Without it the deck is only read, e.g. to inspect or
+                convert it.
+        """
+        deck = cls.for_file(file_path)
+        try:
+            deck.read_file(file_path)
+            deck.finish_loading(file_path, autosave)
+        except Exception:
+            deck.close()
+            raise
+        return deck
+
+    @classmethod
+    def load_folder(cls, folder, workers = None):
+        """
+        Reads every JSON and CSV deck under a folder into one new deck, on
+        the calling thread. The files are parsed in a process pool and
+        added in the order of deck_files(); files that fail are skipped.
+
+        Args:
+            folder (str): The folder to read, subfolders included.
+            workers (int): Worker processes; one per core by default.
+
+        Returns:
+            tuple: (Deck, FolderResult) where FolderResult.errors lists
+            (file path, exception) pairs.
+        """
+        store = CardStore()
+        errors = []
+        file_paths = deck_files(folder)
+        for file_path, parsed, error in parse_decks(file_paths, workers):
+            if error is not None:
+                errors.append((file_path, error))
+            else:
+                store.append_store(parsed)
+        return cls(store), FolderResult(len(file_paths), errors)
+
+    def folder_loader(self, folder, workers = None):
+        """
+        Returns a FolderLoader, not yet started, that parses the decks of a
+        folder into CardStores for add_store().
+        """
+        return FolderLoader(folder, workers)
+
+    def add_store(self, store):
+        """
+        Adds the cards of a CardStore parsed by a FolderLoader.
+
+        Returns:
+            list: The categories that did not exist before, unsorted.
+        """
+        new_ids = self.flashcards.append_store(store)
+        return self.category_index.add_many(self.flashcards, new_ids)
+
+    def loader(self, file_path):
+        """
+        Returns a DeckLoader, not yet started, that parses a deck file into
+        batches for add_batch().
+        """
+        reader = open_rows if isinstance(self.flashcards, SqliteCardStore) else None
+        return DeckLoader(file_path, reader = reader)
+
+    def read_file(self, file_path, cancelled = None):
+        """
+        Adds every card of a deck file to a deck made by for_file(); call
+        finish_loading() next. Only the card store and category index are
+        touched, so a deck nothing else uses yet can be read on a worker
+        thread.
+
+        Args:
+            file_path (str): Path of a .flipwise, JSON or CSV deck.
+            cancelled (threading.Event): Stops reading between batches.
+
+        Returns:
+            bool: False if reading was cancelled.
+        """
+        reader = open_rows if isinstance(self.flashcards, SqliteCardStore) else open_cards
+        with reader(file_path) as (cards, _progress):
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    return False
+                batch = list(itertools.islice(cards, BATCH_SIZE))
+                if not batch:
+                    return True
+                self.add_batch(batch)
+
+    def add_batch(self, batch):
+        """
+        Adds a batch of cards parsed from the deck file.
+
+        Returns:
+            list: The categories that did not exist before, unsorted.
+        """
+        new_ids = self.flashcards.load_batch(batch)
+        return self.category_index.add_many(self.flashcards, new_ids)
+
+    def finish_loading(self, file_path, autosave = True):
+        """
+        Restores the scheduling state of a freshly loaded deck. For a JSON
+        or CSV deck, also replays its journal and, with autosave, keeps
+        journaling the edits made from now on. Without autosave the
+        journal files are left as they are.
+
+        The search index is left unset; see start_indexing().
+
+        Returns:
+            int: Number of journaled changes that were replayed.
+        """
+        replayed = self.restore_state(file_path)
+        if autosave:
+            self.start_journal(file_path, replayed)
+        return 0 if replayed is None else replayed.applied
+
+    def restore_state(self, file_path):
+        """
+        The reading half of finish_loading(): restores the scheduling state
+        and replays the journal of a JSON or CSV deck in memory. No file is
+        written, so a deck read ahead but never shown leaves no trace.
+
+        Returns:
+            Replay: The outcome of the replay, or None for a .flipwise deck.
+        """
+        self.deck_path = file_path
+        self.search_index = None
+        if isinstance(self.flashcards, SqliteCardStore):
+            self.flashcards.load_schedule(self.scheduler)
+            return None
+
+        load_sidecar(file_path, self.flashcards, self.scheduler)
+        result = replay(file_path, self.flashcards, self.category_index, self.scheduler)
+        self.flashcards = result.store
+        self.category_index = result.index
+        self.filtered_cards = self.category_index.all
+        return result
+
+    def start_journal(self, file_path, replayed):
+        """
+        The writing half of finish_loading(): logs reviews to the deck's
+        history and journals the edits made to a JSON or CSV deck from now
+        on. A journal that does not belong to the deck file is set aside,
+        and one that did not replay cleanly is replaced by a checkpoint.
+
+        Args:
+            replayed (Replay): What restore_state() returned.
+        """
+        self.open_history(file_path)
+        if replayed is None:
+            return
+        if replayed.stale:
+            set_aside(file_path)
+        self.journal = Journal(file_path)
+        if replayed.clean:
+            self.journal.resume()
+        else:
+            self.journal.checkpoint(self.flashcards, self.category_index.all, self.scheduler)
+        self.autosave()
+
+    def save(self, file_path, compact = False):
+        """
+        Saves the deck to a file, which becomes the deck being edited.
+
+        Saving a .flipwise deck to JSON or CSV only exports it; edits keep
+        going to the .flipwise file.
+
+        Args:
+            compact (bool): Write JSON without whitespace.
+
+        Returns:
+            int: Number of cards saved.
+        """
+        kind = deck_format(file_path)
+        if kind == "flipwise":
+            self.close_journal()
+            store = self.flashcards
+            if isinstance(store, SqliteCardStore):
+                # Edits are already written, so only a copy to another file is needed
+                self.export(file_path)
+            else:
+                # Card IDs are kept, so the indexes stay valid
+                self.flashcards = SqliteCardStore.from_store(file_path, store, self.scheduler)
+                self.deck_path = file_path
+                self.open_history(file_path)
+        elif kind in ("json", "csv"):
+            if isinstance(self.flashcards, SqliteCardStore):
+                self.export(file_path, compact)
+            else:
+                # The saved file becomes the deck, with a fresh journal next to it
+                self.close_journal()
+                self.journal = Journal(file_path, compact)
+                self.journal.checkpoint(self.flashcards, self.category_index.all, self.scheduler)
+                self.deck_path = file_path
+                self.open_history(file_path)
+        else:
+            raise ValueError(f"Unknown deck format: {file_path}")
+        return len(self.flashcards)
+
+    def export(self, file_path, compact = False):
+        """
+        Writes a copy of the deck and its scheduling state to a file,
+        without making it the deck being edited.
+
+        Args:
+            compact (bool): Write JSON without whitespace.
+
+        Returns:
+            int: Number of cards written.
+        """
+        kind = deck_format(file_path)
+        store = self.flashcards
+        if kind == "flipwise":
+            if not isinstance(store, SqliteCardStore):
+                SqliteCardStore.from_store(file_path, store, self.scheduler).close()
+            elif os.path.abspath(file_path) != os.path.abspath(store.file_path):
+                store.copy_to(file_path)
+        elif kind in ("json", "csv"):
+            writer.write_deck(file_path, store.cards(), compact)
+            save_sidecar(file_path, store, self.scheduler)
+        else:
+            raise ValueError(f"Unknown deck format: {file_path}")
+        return len(store)
+
+    def start_saving(self, file_path, compact = False):
+        """
+        Saves the deck like save(), writing a JSON or CSV file from a
+        snapshot on a worker thread; call finish_saving() until it reports
+        done. Edits made meanwhile go to the journal of the new file once
+        it is in place.
+
+        A .flipwise file, or a deck kept in one, is saved before returning.
+
+        Returns:
+            bool: True if a background save was started.
+        """
+        if self.saver is not None:
+            self.saver.join()
+            self.finish_saving()
+        if self.is_compacting():
+            # A compaction also writes the deck file and its scheduling
+            # state; it must be in place before the save replaces them
+            self.journal.finish_compaction()
+        if deck_format(file_path) not in ("json", "csv") or isinstance(self.flashcards, SqliteCardStore):
+            self.save(file_path, compact)
+            return False
+        self.saver = Compactor(file_path, self.flashcards.copy(), self.scheduler.copy(), compact)
+        self.save_backlog = []
+        self.saver.start()
+        return True
+
+    def finish_saving(self):
+        """
+        Makes the file written by start_saving() the deck being edited,
+        once the worker thread is done.
+
+        Returns:
+            tuple: (done, error). done is False while the worker still runs;
+            error is the exception that stopped the save, or None. A failed
+            save leaves the deck as it was.
+        """
+        saver = self.saver
+        if saver is None:
+            return True, None
+        if saver.is_alive():
+            return False, None
+
+        self.saver = None
+        backlog, self.save_backlog = self.save_backlog, []
+        if saver.error is not None:
+            if saver.temp_path is not None and os.path.exists(saver.temp_path):
+                os.remove(saver.temp_path)
+            return True, saver.error
+
+        # The old journal goes first: closing it finishes a compaction,
+        # which would replace the deck file if the save went to the same path
+        self.close_journal()
+        writer.replace(saver.temp_path, saver.deck_path)
+        self.journal = Journal(saver.deck_path, saver.compact)
+        self.journal.begin(saver.snapshot)
+        for method, args in backlog:
+            getattr(self.journal, method)(*args)
+        self.deck_path = saver.deck_path
+        self.open_history(saver.deck_path)
+        self.autosave()
+        return True, None
+
+    def merger(self, file_paths, update = False):
+        """
+        Returns a Merger, not yet started, that streams deck files into
+        this deck without duplicates. Feed its batches to merge_batch() and
+        do not edit the deck until it is done.
+
+        Args:
+            file_paths (list): JSON or CSV files, merged in order.
+            update (bool): Replace the back of a card with the same front
+                and category instead of adding another card.
+        """
+        return Merger(file_paths, self.flashcards.card_snapshot(), self.flashcards.slots, update)
+
+    def merge_batch(self, changes):
+        """
+        Applies a batch of cards merged by a Merger.
+
+        Returns:
+            list: The categories that did not exist before, unsorted.
+        """
+        new_categories = []
+        store = self.flashcards
+        with self.batch():
+            for card_id, card in changes:
+                if card_id is None:
+                    card_id, created = self._insert(card["front"], card["back"], card["category"])
+                    if created:
+                        new_categories.append(card["category"])
+                elif store.is_alive(card_id):
+                    with self.undo_log.pause():
+                        self.edit(card_id, card["front"], card["back"], store.category(card_id))
+        # Imports are not undone one card at a time, and earlier edits no
+        # longer revert to the deck as it was
+        self.undo_log.clear()
+        self.autosave()
+        return new_categories
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Groups edits: a .flipwise deck commits them in one transaction and
+        the journal writes them out with one flush.
+        """
+        store = self.flashcards
+        with store.transaction() if isinstance(store, SqliteCardStore) else contextlib.nullcontext():
+            with self.journal.batch() if self.journal is not None else contextlib.nullcontext():
+                yield
+
+    def merge(self, file_paths, update = False):
+        """
+        Merges deck files into this deck on the calling thread.
+
+        Returns:
+            MergeResult: (added, duplicates, updated, spilled) where spilled
+            counts the keys that were moved to disk.
+        """
+        merger = self.merger(file_paths, update)
+        for changes, _progress in merger.steps():
+            self.merge_batch(changes)
+        return merger.result
+
+    def autosave(self):
+        """
+        Starts folding the journal into the deck file once it grows long.
+        Not while a background save runs: its file replaces the journal.
+        """
+        if self.journal is not None and self.saver is None and self.journal.needs_compaction():
+            self.journal.begin_compaction(self.flashcards, self.category_index.all, self.scheduler)
+
+    def is_compacting(self):
+        """
+        Returns True while a journal compaction has not been finished.
+        """
+        return self.journal is not None and self.journal.compactor is not None
+
+    def finish_compaction(self):
+        """
+        Finishes a background compaction once its worker thread is done.
+
+        Returns:
+            tuple: (done, error). done is False while the worker still runs;
+            error is the exception that stopped the compaction, or None.
+        """
+        if not self.is_compacting():
+            return True, None
+        if self.journal.compactor.is_alive():
+            return False, None
+        return True, self.journal.finish_compaction()
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the cards and their indexes,
+        in bytes.
+        """
+        total = self.flashcards.nbytes() + self.category_index.nbytes() + self.scheduler.nbytes() + self.undo_log.nbytes()
+        if self.search_index is not None:
+            total += self.search_index.nbytes()
+        return total
+
+    def close_journal(self):
+        """
+        Stops journaling the deck.
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def open_history(self, file_path):
+        """
+        Logs reviews to the history kept next to a deck file from now on.
+        """
+        self.close_history()
+        self.history = ReviewLog(history_path(file_path))
+
+    def close_history(self):
+        """
+        Writes out and stops logging the review history.
+        """
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+
+    def close(self):
+        """
+        Finishes a background save, flushes the journal and review history
+        and closes the deck.
+        """
+        if self.saver is not None:
+            self.saver.join()
+            self.finish_saving()
+        self.close_journal()
+        self.close_history()
+        self.flashcards.close()
+
+    # Editing
+
+    def add(self, front, back, category):
+        """
+        Adds a card, and moves the cursor to it if it is in the current view.
+
+        Returns:
+            tuple: (card ID, True if the card created a new category)
+        """
+        card_id, created = self._insert(front, back, category)
+        self.undo_log.record(Removal(self.undo_log.ref(card_id)))
+        self.autosave()
+        if not self.is_study_mode and self.in_current_view(card_id):
+            if self.is_shuffle_mode:
+                self.current_index = self.filtered_cards.index(card_id)
+            else:
+                self.current_index = len(self.filtered_cards) - 1
+        self.showing_front = True
+        return card_id, created
+
+    def _insert(self, front, back, category):
+        """
+        Adds a card to the store, the journal and every index, and to a
+        searched view it belongs to. The caller runs autosave().
+
+        Returns:
+            tuple: (card ID, True if the card created a new category)
+        """
+        card_id = self.flashcards.add(front, back, category)
+        self._log("add", front, back, category)
+        created = self.category_index.add(card_id, category)
+        self.scheduler.push(card_id, category)
+        self.reindex("add", card_id, front, back)
+        if self.view_is_copy() and not self.is_study_mode and self.in_current_view(card_id):
+            self._view_cards().append(card_id)
+        return card_id, created
+
+    def edit(self, card_id, front, back, category):
+        """
+        Changes the contents of a card.
+
+        Returns:
+            tuple: (old category, its position in categories() before the
+            edit, old category emptied, new category created)
+        """
+        store = self.flashcards
+        old_category = store.category(card_id)
+        old_position = self.category_index.position(old_category)
+        self.undo_log.record(Rewrite(self.undo_log.ref(card_id), store.card(card_id)))
+        self.reindex("update", card_id, store.front(card_id), store.back(card_id), front, back)
+        store.update(card_id, front, back, category)
+        self._log("edit", card_id, front, back, category)
+        emptied, created = self.category_index.move(card_id, old_category, category)
+        if category != old_category:
+            self.scheduler.push(card_id, category)
+        self.autosave()
+
+        # A searched view is a copy, so the card is dropped if it left the
+        # view and added if it joined it
+        if self.in_current_view(card_id):
+            self._add_to_view(card_id)
+        else:
+            self._drop_from_view(card_id)
+        self._clamp_cursor()
+        self.showing_front = True
+        return old_category, old_position, emptied, created
+
+    def delete(self, card_id):
+        """
+        Deletes a card.
+
+        Returns:
+            tuple: (category, its position in categories() before the
+            delete, True if the category has no cards left)
+        """
+        store = self.flashcards
+        category = store.category(card_id)
+        position = self.category_index.position(category)
+        self.undo_log.record(Insertion(self.undo_log.ref(card_id), store.card(card_id), self._schedule_state(card_id)))
+        self._drop_from_view(card_id)
+        self.reindex("remove", card_id, store.front(card_id), store.back(card_id))
+        store.remove(card_id)
+        self._log("delete", card_id)
+        emptied = self.category_index.remove(card_id, category)
+        self.autosave()
+
+        self._clamp_cursor()
+        self.showing_front = True
+        if self.is_study_mode:
+            self.study_history = [studied for studied in self.study_history if studied != card_id]
+            self.show_next_due()
+        return category, position, emptied
+
+    def _log(self, method, *args):
+        """
+        Writes an edit to the journal. While a background save runs, the
+        edit is also kept for the journal of the file being written.
+
+        Args:
+            method (str): The Journal method: "add", "edit", "delete",
+                "review" or "clear".
+        """
+        if self.journal is not None:
+            getattr(self.journal, method)(*args)
+        if self.saver is not None:
+            self.save_backlog.append((method, args))
+
+    def _drop_from_view(self, card_id):
+        """
+        Removes a card from a filtered_cards copy. Live views are updated by
+        the category index itself.
+        """
+        if not self.view_is_copy() or self.is_study_mode:
+            return
+        cards = self._view_cards()
+        position = bisect.bisect_left(cards, card_id)
+        if position < len(cards) and cards[position] == card_id:
+            del cards[position]
+
+    def _view_cards(self):
+        """
+        Returns the card IDs of the current view in ID order, under the
+        shuffle if there is one.
+        """
+        return self.filtered_cards.cards if self.is_shuffle_mode else self.filtered_cards
+
+    def _add_to_view(self, card_id):
+        """
+        Puts an edited card that joined the view into a filtered_cards copy,
+        keeping the cursor on the card on display.
+        """
+        if not self.view_is_copy() or self.is_study_mode:
+            return
+        cards = self._view_cards()
+        position = bisect.bisect_left(cards, card_id)
+        if position < len(cards) and cards[position] == card_id:
+            return
+        shown = self.current_card()
+        cards.insert(position, card_id)
+        if shown is None:
+            return
+        if self.is_shuffle_mode:
+            # The shuffled order follows the new length; find the card again
+            self.current_index = self.filtered_cards.index(shown)
+        elif position <= self.current_index:
+            self.current_index += 1
+
+    def _clamp_cursor(self):
+        """
+        Keeps current_index inside filtered_cards after cards were removed.
+        """
+        if self.current_index >= len(self.filtered_cards):
+            self.current_index = max(0, len(self.filtered_cards) - 1)
+
+    def clear(self):
+        """
+        Deletes every card.
+        """
+        self.undo_log.record(self._clear())
+
+    def _clear(self):
+        """
+        Deletes every card. The cards and their scheduling state are handed
+        to the change that brings them back rather than copied, so clearing
+        costs no more than without undo.
+
+        Returns:
+            Refill: The change that reverts the clear.
+        """
+        refill = Refill(self.flashcards.take(), self.scheduler, self.undo_log.take_refs())
+        self.scheduler = Scheduler()
+        self._log("clear")
+        self.category_index.clear()
+        self.autosave()
+        self.indexer = None
+        self.search_backlog = []
+        self.search_index = SearchIndex()
+        self.study_card = None
+        self.study_history = []
+        self.current_index = 0
+        self.showing_front = True
+        self.switch_category("All")
+        return refill
+
+    # Undo
+
+    def undo(self):
+        """
+        Reverts the last add, edit, delete or clear that was not undone.
+
+        Returns:
+            Reverted: The categories emptied and created, or None if there
+            was nothing to undo.
+        """
+        log = self.undo_log
+        if not log.undo_stack:
+            return None
+        inverse, reverted = self._revert(log.undo_stack.pop())
+        log.redo_stack.append(inverse)
+        return reverted
+
+    def redo(self):
+        """
+        Makes again the last edit reverted by undo().
+
+        Returns:
+            Reverted: The categories emptied and created, or None if there
+            was nothing to redo.
+        """
+        log = self.undo_log
+        if not log.redo_stack:
+            return None
+        inverse, reverted = self._revert(log.redo_stack.pop())
+        log.undo_stack.append(inverse)
+        return reverted
+
+    def _revert(self, change):
+        """
+        Applies a change from the undo log, journaled and indexed like any
+        other edit.
+
+        Returns:
+            tuple: (the change that reverts this one, Reverted)
+        """
+        log = self.undo_log
+        store = self.flashcards
+        with log.pause():
+            if isinstance(change, Removal):
+                card_id = change.ref.card_id
+                inverse = Insertion(change.ref, store.card(card_id), self._schedule_state(card_id))
+                category, position, emptied = self.delete(card_id)
+                reverted = Reverted([(category, position)] if emptied else [], [], False)
+            elif isinstance(change, Insertion):
+                card = change.card
+                card_id, created = self.add(card["front"], card["back"], card["category"])
+                self._restore_state(card_id, change.state)
+                log.move(change.ref, card_id)
+                inverse = Removal(change.ref)
+                reverted = Reverted([], [card["category"]] if created else [], False)
+            elif isinstance(change, Rewrite):
+                card_id = change.ref.card_id
+                inverse = Rewrite(change.ref, store.card(card_id))
+                card = change.card
+                old_category, old_position, emptied, created = self.edit(card_id, card["front"], card["back"], card["category"])
+                reverted = Reverted([(old_category, old_position)] if emptied else [], [card["category"]] if created else [], False)
+            elif isinstance(change, Refill):
+                self._refill(change)
+                inverse = Clearing()
+                reverted = Reverted([], [], True)
+            else:
+                inverse = self._clear()
+                reverted = Reverted([], [], True)
+        return inverse, reverted
+
+    def _refill(self, refill):
+        """
+        Adds back the cards of a clear in one go, with their scheduling
+        state, and points their CardRefs at their new IDs. The search index
+        is rebuilt on a worker thread; call finish_indexing() until it
+        reports done.
+        """
+        store = self.flashcards
+        old_ids = array("I", refill.store)
+        if isinstance(store, SqliteCardStore):
+            new_ids = store.extend(refill.store.cards())
+        else:
+            # The columns are copied whole, leaving out deleted cards so the
+            # IDs match the positions the journal replays the cards at
+            new_ids = store.append_store(refill.store, keep_deleted = False)
+        self._log("add_store", refill.store)
+        self.category_index.add_many(store, new_ids)
+        self.scheduler.ensure(store.slots)
+        self.scheduler.reset_queues()
+        with self.batch():
+            for old_id, card_id in zip(old_ids, new_ids):
+                if refill.scheduler.is_reviewed(old_id):
+                    self._restore_state(card_id, refill.scheduler.state(old_id))
+        for old_id, ref in refill.refs.items():
+            # Cards deleted before the clear come back through their own change
+            if refill.store.is_alive(old_id):
+                self.undo_log.move(ref, new_ids[bisect.bisect_left(old_ids, old_id)])
+        self.autosave()
+        self.start_indexing()
+        self.switch_category(self.current_category)
+
+    def _schedule_state(self, card_id):
+        """
+        Returns the scheduling state of a card, or None if it was never reviewed.
+        """
+        return self.scheduler.state(card_id) if self.scheduler.is_reviewed(card_id) else None
+
+    def _restore_state(self, card_id, state):
+        """
+        Gives a card that came back the scheduling state it had.
+        """
+        if state is None:
+            return
+        self.scheduler.set_state(card_id, *state, category = self.flashcards.category(card_id))
+        if isinstance(self.flashcards, SqliteCardStore):
+            self.flashcards.save_schedule(card_id, *state)
+        else:
+            self._log("review", card_id, *state)
+
+    # Navigation and filters
+
+    def current_card(self):
+        """
+        Returns the ID of the card on display, or None.
+        """
+        if self.is_study_mode:
+            return self.study_card
+        if not self.filtered_cards:
+            return None
+        return self.filtered_cards[self.current_index]
+
+    def next_card(self):
+        """
+        Moves to the next card (wrapping around at the end). In study mode,
+        moves to the card that is due first.
+        """
+        self._record(NEXT, self.current_card())
+        if self.is_study_mode:
+            self.show_next_due()
+            return
+        if not self.filtered_cards:
+            return
+        self.current_index = (self.current_index + 1) % len(self.filtered_cards)
+        self.showing_front = True
+
+    def previous_card(self):
+        """
+        Moves to the previous card (wrapping around at the beginning). In
+        study mode, goes back to the card graded last.
+        """
+        self._record(PREVIOUS, self.current_card())
+        if self.is_study_mode:
+            if self.study_history:
+                self.study_card = self.study_history.pop()
+                self.showing_front = True
+            return
+        if not self.filtered_cards:
+            return
+        self.current_index = (self.current_index - 1) % len(self.filtered_cards)
+        self.showing_front = True
+
+    def go_to_card(self, card_id, category = "All"):
+        """
+        Moves the cursor to a card, e.g. one picked in the card browser. A
+        card outside the current view is shown in category, or in its own
+        category if category does not hold it, without a search that hides
+        it.
+
+        Returns:
+            bool: False in study mode or if the card was deleted.
+        """
+        if self.is_study_mode or not self.flashcards.is_alive(card_id):
+            return False
+        self._record(NEXT, self.current_card())
+        if not self.in_current_view(card_id):
+            if category not in ("All", self.flashcards.category(card_id)):
+                category = self.flashcards.category(card_id)
+            self.switch_category(category)
+            if not self.in_current_view(card_id):
+                self.set_search("")
+        if self.is_shuffle_mode:
+            self.current_index = self.filtered_cards.index(card_id)
+        else:
+            self.current_index = bisect.bisect_left(self.filtered_cards, card_id)
+        self.showing_front = True
+        return True
+
+    def flip_card(self):
+        """
+        Flips the card on display between question and answer.
+        """
+        card_id = self.current_card()
+        if card_id is not None:
+            self._record(FLIP, card_id)
+            self.showing_front = not self.showing_front
+
+    def toggle_shuffle_mode(self, seed = None):
+        """
+        Shuffles the current view, or puts it back in order at the card on
+        display. The shuffled order is computed as the cards are visited,
+        so neither direction copies the view.
+
+        Args:
+            seed (int): Seed of the shuffled order; random by default.
+
+        Returns:
+            bool: False if there was nothing to shuffle.
+        """
+        if self.is_study_mode or not (self.filtered_cards or self.is_shuffle_mode):
+            return False
+        self.is_shuffle_mode = not self.is_shuffle_mode
+        if self.is_shuffle_mode:
+            self.shuffle_seed = random.getrandbits(64) if seed is None else seed
+            self.filtered_cards = ShuffledView(self.filtered_cards, self.shuffle_seed)
+            self.current_index = 0
+        else:
+            shuffled = self.filtered_cards
+            self.filtered_cards = shuffled.cards
+            self.current_index = shuffled.source(self.current_index) if shuffled else 0
+        self.showing_front = True
+        self.card_shown_at = time.time()
+        return True
+
+    def switch_category(self, category):
+        """
+        Shows the cards of a category ("All" for every card) that match the
+        current search.
+        """
+        self.filtered_cards = self.filter_cards(category)
+        if self.is_shuffle_mode:
+            self.filtered_cards = ShuffledView(self.filtered_cards, self.shuffle_seed)
+
+        self.current_index = 0
+        self.current_category = category
+        self.showing_front = True
+        self.card_shown_at = time.time()
+        if self.is_study_mode:
+            self.study_history = []
+            self.show_next_due()
+
+    def set_search(self, query):
+        """
+        Filters the current category by a search query ("" for no search).
+        """
+        self.search_query = query
+        self.switch_category(self.current_category)
+
+    def filter_cards(self, category):
+        """
+        Returns the cards of a category that match the search query.
+
+        Without a search this is the live view kept by the category index;
+        with one it is a copy, and search_applied is set.
+        """
+        cards = self.category_index.cards(category)
+        self.search_applied = False
+        if self.search_query and self.search_index is not None:
+            within = None if category == "All" else cards
+            results = self.search_index.search(self.search_query, within)
+            if results is not None:
+                self.search_applied = True
+                return results
+        return cards
+
+    def view_is_copy(self):
+        """
+        Returns True if the view holds a copy of the cards that edits must
+        update; a shuffle is only an order over the cards beneath it.
+        """
+        return self.search_applied
+
+    def in_current_view(self, card_id):
+        """
+        Returns True if a card belongs to the current category and search.
+        """
+        store = self.flashcards
+        if self.current_category not in ("All", store.category(card_id)):
+            return False
+        if not self.search_applied:
+            return True
+        return self.search_index.matches(self.search_query, store.front(card_id), store.back(card_id))
+
+    # Search index
+
+    def start_indexing(self):
+        """
+        Builds the search index on a worker thread; edits made meanwhile
+        are queued. Call finish_indexing() until it reports done.
+        """
+        self.search_index = None
+        self.search_backlog = []
+        self.indexer = Indexer(self.flashcards.text_snapshot())
+        self.indexer.start()
+
+    def finish_indexing(self):
+        """
+        Installs the search index once the worker thread has built it.
+
+        Returns:
+            tuple: (done, error). done is False while the worker still runs.
+        """
+        indexer = self.indexer
+        if indexer is None:
+            return True, None
+        if indexer.is_alive():
+            return False, None
+
+        self.indexer = None
+        if indexer.error is not None:
+            self.search_backlog = []
+            return True, indexer.error
+        # Catch up with the edits made while the index was built
+        for method, *args in self.search_backlog:
+            getattr(indexer.index, method)(*args)
+        self.search_backlog = []
+        self.search_index = indexer.index
+        if self.search_query and not self.is_study_mode:
+            self.switch_category(self.current_category)
+        return True, None
+
+    def reindex(self, method, *args):
+        """
+        Passes an edit on to the search index, or queues it while the
+        index is being built.
+
+        Args:
+            method (str): "add", "update" or "remove".
+        """
+        if self.indexer is not None:
+            self.search_backlog.append((method, *args))
+        elif self.search_index is not None:
+            getattr(self.search_index, method)(*args)
+
+    # Study mode
+
+    def set_study_mode(self, enabled):
+        """
+        Switches between browsing the cards in order and studying the cards
+        that are due, as scheduled by spaced repetition.
+        """
+        self.is_study_mode = enabled
+        self.study_card = None
+        self.study_history = []
+        self.showing_front = True
+        self.card_shown_at = time.time()
+        if enabled:
+            self.show_next_due()
+
+    def show_next_due(self, now = None):
+        """
+        Moves to the card of the current category that is due first. If no
+        card is due yet, study_card is None and next_review tells when one is.
+        """
+        result = self.scheduler.next_due(self.current_category, self.category_index.cards(self.current_category), self.flashcards)
+        self.study_card = None
+        self.next_review = None
+        if result is not None:
+            card_id, due = result
+            if due <= (time.time() if now is None else now):
+                self.study_card = card_id
+            else:
+                self.next_review = due
+        self.showing_front = True
+
+    def grade_card(self, grade, now = None):
+        """
+        Reschedules the studied card with the user's grade and moves on.
+
+        Args:
+            grade (int): AGAIN, HARD, GOOD or EASY.
+
+        Returns:
+            bool: False if no card was being studied.
+        """
+        card_id = self.study_card
+        if not self.is_study_mode or card_id is None:
+            return False
+        now = time.time() if now is None else now
+
+        state = self.scheduler.review(card_id, grade, now, self.flashcards.category(card_id))
+        if isinstance(self.flashcards, SqliteCardStore):
+            self.flashcards.save_schedule(card_id, *state)
+        else:
+            self._log("review", card_id, *state)
+            self.autosave()
+
+        self._record(GRADED + grade, card_id, now)
+        self.study_history.append(card_id)
+        del self.study_history[:-STUDY_HISTORY]
+        self.show_next_due(now)
+        return True
+
+    def _record(self, kind, card_id, now = None):
+        """
+        Logs an event on a card to the review history. Leaving a card
+        starts timing the next one.
+
+        Args:
+            kind (int): FLIP, NEXT, PREVIOUS or GRADED + grade.
+            card_id (int): The card, or None if no card is shown.
+        """
+        now = time.time() if now is None else now
+        if self.history is not None and card_id is not None:
+            store = self.flashcards
+            category = store.category(card_id)
+            self.history.record(card_key(store.front(card_id), category), kind, now - self.card_shown_at, category, now)
+        if kind != FLIP:
+            self.card_shown_at = now
+
+    # Statistics
+
+    def stats(self, now = None):
+        """
+        Summarizes the deck.
+
+        Returns:
+            dict: Card counts overall, per category and by study state.
+        """
+        now = time.time() if now is None else now
+        scheduler = self.scheduler
+        scheduler.ensure(self.flashcards.slots)
+        reviewed = due = 0
+        for card_id in self.category_index.all:
+            if scheduler.is_reviewed(card_id):
+                reviewed += 1
+                if scheduler.state(card_id)[0] <= now:
+                    due += 1
+        return {
+            "cards": len(self.flashcards),
+            "categories": {name: self.category_index.count(name) for name in self.category_index.categories()},
+            "new": len(self.flashcards) - reviewed,
+            "reviewed": reviewed,
+            "due": due,
+            "reviews": {name: stats._asdict() for name, stats in sorted(self.review_stats().items())},
+        }
+
+    def review_stats(self):
+        """
+        Returns the review statistics of each category, from the history
+        kept next to the deck file.
+
+        Returns:
+            dict: {category: CategoryStats}; empty for a deck without one.
+        """
+        if self.history is not None:
+            return self.history.stats()
+        if self.deck_path is None or not os.path.exists(history_path(self.deck_path)):
+            return {}
+        # Only read: inspecting a deck must not repair its history
+        return ReviewLog(history_path(self.deck_path), read_only = True).stats()
@@ -0,0 +1,110 @@
+import collections
+import os
+import queue
+import threading
+
+from flipwise.loader import deck_format, iter_cards
+from flipwise.store import CardStore
+
+FolderResult = collections.namedtuple("FolderResult", "files errors")
+
+
+def deck_files(folder):
+    """
+    Returns the JSON and CSV decks under a folder, subfolders included, in
+    the order they are loaded: sorted by path relative to the folder.
+    """
+    paths = []
+    for directory, subdirectories, names in os.walk(folder):
+        subdirectories.sort()
+        for name in sorted(names):
+            if deck_format(name) in ("json", "csv"):
+                paths.append(os.path.join(directory, name))
+    return paths
+
+
+def parse_deck(file_path):
+    """
+    Reads a JSON or CSV deck into a CardStore. Runs in a worker process;
+    the store pickles as a few flat buffers, so it is cheap to send back.
+    """
+    return CardStore(iter_cards(file_path))
+
+
+def parse_decks(file_paths, workers = None, cancelled = None):
+    """
+    Parses deck files in a process pool, one file per task.
+
+    Files are parsed in parallel but the results come back in the order
+    of file_paths, so the deck they are added to is always the same.
+
+    Args:
+        file_paths (list): JSON or CSV decks.
+        workers (int): Worker processes; os.cpu_count() by default.
+        cancelled (threading.Event): Stops handing out results when set.
+
+    Yields:
+        tuple: (file path, CardStore or None, error or None)
+    """
+    # Imported here: it pulls in logging, which the command line tools do not need
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not file_paths:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+    executor = ProcessPoolExecutor(workers)
+    try:
+        futures = [executor.submit(parse_deck, file_path) for file_path in file_paths]
+        for file_path, future in zip(file_paths, futures):
+            if cancelled is not None and cancelled.is_set():
+                return
+            try:
+                yield file_path, future.result(), None
+            except Exception as e:
+                yield file_path, None, e
+    finally:
+        executor.shutdown(wait = False, cancel_futures = True)
+
+
+class FolderLoader(threading.Thread):
+    """
+    Parses every deck in a folder with a process pool and queues the cards
+    one file at a time, in the order of deck_files().
+
+    A file that cannot be read is recorded and skipped. Like DeckLoader,
+    the worker never touches the UI, which polls `batches`:
+        ("store", CardStore, progress)
+        ("loaded", FolderResult, None)
+        ("error", exception, None)
+        ("cancelled", None, None)
+    where FolderResult.errors lists (file path, exception) pairs.
+    """
+
+    def __init__(self, folder, workers = None):
+        super().__init__(daemon = True)
+        self.folder = folder
+        self.workers = workers
+        self.batches = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the worker to stop after the current file.
+        """
+        self.cancelled.set()
+
+    def run(self):
+        try:
+            file_paths = deck_files(self.folder)
+            errors = []
+            for done, (file_path, store, error) in enumerate(parse_decks(file_paths, self.workers, self.cancelled), 1):
+                if error is not None:
+                    errors.append((file_path, error))
+                else:
+                    self.batches.put(("store", store, done / len(file_paths)))
+            if self.cancelled.is_set():
+                self.batches.put(("cancelled", None, None))
+            else:
+                self.batches.put(("loaded", FolderResult(len(file_paths), errors), None))
+        except Exception as e:
+            self.batches.put(("error", e, None))
@@ -0,0 +1,308 @@
+from array import array
+import collections
+import json
+import os
+import struct
+import time
+
+from flipwise.scheduler import AGAIN
+
+HISTORY_MAGIC = b"FWHIST\x01"
+
+# Event types. A grade (AGAIN to EASY) is logged as GRADED + grade.
+FLIP, NEXT, PREVIOUS = 0, 1, 2
+GRADED = 3
+
+# Events buffered in memory before they are appended to the file as a block
+FLUSH_EVENTS = 4096
+
+# Columns of a block, in file order: card key, time, event type,
+# seconds since the card was shown, category number
+COLUMNS = (("key", "Q"), ("time", "d"), ("kind", "B"), ("response", "f"), ("category", "I"))
+EVENT_BYTES = sum(array(typecode).itemsize for _name, typecode in COLUMNS)
+
+# Block header: events, bytes of new category names, summary rows
+BLOCK_HEADER = struct.Struct("<III")
+
+# Summary row: category number, then the fields of CategoryStats
+SUMMARY_ROW = struct.Struct("<IIdIdII")
+
+CategoryStats = collections.namedtuple("CategoryStats", "reviews seconds flips flip_seconds graded correct")
+COUNT_FIELDS = ("reviews", "flips", "graded", "correct")
+
+
+def history_path(deck_path):
+    """
+    Returns the path of the review history kept next to a deck.
+    """
+    return deck_path + ".history"
+
+
+_numpy_module = False
+
+
+def _numpy():
+    """
+    Returns numpy if it is installed. It is imported on first use, as it
+    takes longer to import than the command line tools have to start.
+    """
+    global _numpy_module
+    if _numpy_module is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_module = numpy
+    return _numpy_module
+
+
+def count_event(row, kind, seconds):
+    """
+    Adds an event to the sums of its category, a list of the fields of
+    CategoryStats.
+
+    A review is leaving a card for another (next, previous or a grade),
+    and its response is the time spent on the card; a flip's response is
+    the time taken to reveal the answer. Grades other than AGAIN count as
+    correct.
+    """
+    if kind == FLIP:
+        row[2] += 1
+        row[3] += seconds
+    else:
+        row[0] += 1
+        row[1] += seconds
+        if kind >= GRADED:
+            row[4] += 1
+            if kind > GRADED + AGAIN:
+                row[5] += 1
+
+
+def _add(totals, number, stats):
+    """
+    Adds the sums of a category to totals, a {category number: list} dict.
+    """
+    current = totals.get(number)
+    if current is None:
+        totals[number] = list(stats)
+    else:
+        for field, value in enumerate(stats):
+            current[field] += value
+
+
+def _add_rows(totals, data):
+    """
+    Adds packed SUMMARY_ROW records to totals, all at once with numpy.
+    """
+    numpy = _numpy()
+    if numpy is None:
+        for number, *stats in SUMMARY_ROW.iter_unpack(data):
+            _add(totals, number, stats)
+        return
+    fields = [("category", "<u4")] + [(name, "<u4" if name in COUNT_FIELDS else "<f8") for name in CategoryStats._fields]
+    rows = numpy.frombuffer(data, dtype = numpy.dtype(fields))
+    if not len(rows):
+        return
+    category = rows["category"]
+    size = int(category.max()) + 1
+    sums = [numpy.bincount(category, weights = rows[name], minlength = size) for name in CategoryStats._fields]
+    for number in numpy.flatnonzero(numpy.bincount(category, minlength = size)):
+        stats = [int(column[number]) if name in COUNT_FIELDS else float(column[number])
+                 for name, column in zip(CategoryStats._fields, sums)]
+        _add(totals, int(number), stats)
+
+
+class ReviewLog:
+    """
+    An append-only log of the flips, moves and grades made on a deck.
+
+    Events are buffered in array columns and appended to the file in
+    blocks of FLUSH_EVENTS. Each block holds its columns back to back,
+    preceded by the per-category sums of its events, so opening a log
+    reads only those sums and skips the columns: statistics cost the same
+    however many events were logged. The sums of the buffered block are
+    kept up to date as events are recorded. Cards are identified by card_key()
+    like the scheduling file, so the log survives renumbering and
+    reordering of the deck.
+
+    A block cut short by a crash is dropped when the log is opened.
+    """
+
+    def __init__(self, path, read_only = False):
+        """
+        Args:
+            path (str): The log file; created by the first flush().
+            read_only (bool): Only read the log, e.g. for its statistics:
+                a torn block at the end is skipped rather than cut off,
+                and nothing can be recorded.
+        """
+        self.path = path
+        self.read_only = read_only
+        self.categories = []
+        self.events = 0
+        self._category_numbers = {}
+        self._totals = {}
+        self._pending = {name: array(typecode) for name, typecode in COLUMNS}
+        self._pending_sums = {}
+        self._new_names = []
+        self._file = None
+        if os.path.exists(path):
+            self._read_summaries()
+
+    def __len__(self):
+        """
+        Returns the number of events logged, buffered ones included.
+        """
+        return self.events + len(self._pending["key"])
+
+    def _read_summaries(self):
+        # The sums of all blocks are added up in one go
+        _add_rows(self._totals, self._read_blocks())
+
+    def _read_blocks(self):
+        """
+        Reads the category names and sums of every block, skipping the
+        columns, and cuts off a torn block at the end.
+
+        Returns:
+            bytes: The SUMMARY_ROW records of all blocks.
+        """
+        size = os.path.getsize(self.path)
+        summaries = bytearray()
+        with open(self.path, "rb") as file:
+            if file.read(len(HISTORY_MAGIC)) != HISTORY_MAGIC:
+                raise ValueError(f"{self.path} is not a FlipWise review history")
+            while True:
+                start = file.tell()
+                header = file.read(BLOCK_HEADER.size)
+                if not header:
+                    return bytes(summaries)
+                if len(header) < BLOCK_HEADER.size:
+                    break
+                events, names_size, rows = BLOCK_HEADER.unpack(header)
+                end = start + BLOCK_HEADER.size + names_size + rows * SUMMARY_ROW.size + events * EVENT_BYTES
+                if end > size:
+                    break
+                for name in json.loads(file.read(names_size)):
+                    self._category_numbers[name] = len(self.categories)
+                    self.categories.append(name)
+                summaries += file.read(rows * SUMMARY_ROW.size)
+                self.events += events
+                file.seek(end)
+        if self.read_only:
+            return bytes(summaries)
+        # Torn block: cut it off so new blocks follow the last whole one
+        with open(self.path, "r+b") as file:
+            file.truncate(start)
+        return bytes(summaries)
+
+    def record(self, key, kind, response, category, now = None):
+        """
+        Logs an event.
+
+        Args:
+            key (int): card_key() of the card.
+            kind (int): FLIP, NEXT, PREVIOUS or GRADED + grade.
+            response (float): Seconds since the card was shown.
+            category (str): Category of the card.
+            now (float): Time of the event; time.time() by default.
+
+        Raises:
+            ValueError: If the log was opened read-only.
+        """
+        if self.read_only:
+            raise ValueError(f"{self.path} was opened read-only")
+        number = self._category_numbers.get(category)
+        if number is None:
+            number = self._category_numbers[category] = len(self.categories)
+            self.categories.append(category)
+            self._new_names.append(category)
+        pending = self._pending
+        pending["key"].append(key)
+        pending["time"].append(time.time() if now is None else now)
+        pending["kind"].append(kind)
+        pending["response"].append(response)
+        pending["category"].append(number)
+        row = self._pending_sums.get(number)
+        if row is None:
+            row = self._pending_sums[number] = [0, 0.0, 0, 0.0, 0, 0]
+        # The response as stored, so the sums match the column
+        count_event(row, kind, pending["response"][-1])
+        if len(pending["key"]) >= FLUSH_EVENTS:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered events to the file as one block.
+        """
+        pending = self._pending
+        events = len(pending["key"])
+        if not events:
+            return
+        summary = self._pending_sums
+        names = json.dumps(self._new_names, ensure_ascii = False).encode("utf-8")
+
+        if self._file is None:
+            new_file = not os.path.exists(self.path)
+            self._file = open(self.path, "ab")
+            if new_file:
+                self._file.write(HISTORY_MAGIC)
+        file = self._file
+        file.write(BLOCK_HEADER.pack(events, len(names), len(summary)))
+        file.write(names)
+        for number, stats in summary.items():
+            file.write(SUMMARY_ROW.pack(number, *stats))
+        for name, _typecode in COLUMNS:
+            pending[name].tofile(file)
+        file.flush()
+
+        for number, stats in summary.items():
+            _add(self._totals, number, stats)
+        self.events += events
+        self._pending = {name: array(typecode) for name, typecode in COLUMNS}
+        self._pending_sums = {}
+        self._new_names = []
+
+    def stats(self):
+        """
+        Returns the review statistics of each category.
+
+        Returns:
+            dict: {category: CategoryStats}, buffered events included.
+        """
+        totals = {number: list(sums) for number, sums in self._totals.items()}
+        for number, stats in self._pending_sums.items():
+            _add(totals, number, stats)
+        return {self.categories[number]: CategoryStats(*sums) for number, sums in totals.items()}
+
+    def columns(self):
+        """
+        Reads every logged event into arrays, e.g. for export or analysis.
+
+        Returns:
+            dict: {column name: array}, in the order of COLUMNS, with the
+            category column numbering self.categories.
+        """
+        self.flush()
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        if not os.path.exists(self.path):
+            return columns
+        remaining = self.events
+        with open(self.path, "rb") as file:
+            file.seek(len(HISTORY_MAGIC))
+            while remaining > 0:
+                events, names_size, rows = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+                file.seek(names_size + rows * SUMMARY_ROW.size, os.SEEK_CUR)
+                for name, _typecode in COLUMNS:
+                    columns[name].fromfile(file, events)
+                remaining -= events
+        return columns
+
+    def close(self):
+        """
+        Writes the buffered events and closes the file.
+        """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
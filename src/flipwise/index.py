@@ -0,0 +1,169 @@
+from array import array
+import bisect
+import sys
+
+
+class CategoryIndex:
+    """
+    Keeps, for every category, the IDs of its cards in ID order.
+
+    The index is updated in place as cards are added, edited and deleted,
+    so looking up the cards of a category never scans the deck. The lists
+    returned by cards() are live views and change along with the index.
+    """
+
+    def __init__(self):
+        self.all = array("I")
+        self._cards = {}
+        self._names = []
+
+    def __len__(self):
+        """
+        Returns the number of indexed cards.
+        """
+        return len(self.all)
+
+    @classmethod
+    def build(cls, store):
+        """
+        Creates an index holding every live card of a CardStore.
+        """
+        index = cls()
+        index.add_many(store, iter(store))
+        return index
+
+    def categories(self):
+        """
+        Returns the sorted names of the categories that have cards.
+        """
+        return self._names
+
+    def position(self, category):
+        """
+        Returns the position of a category in categories(), or -1.
+        """
+        position = bisect.bisect_left(self._names, category)
+        if position < len(self._names) and self._names[position] == category:
+            return position
+        return -1
+
+    def cards(self, category):
+        """
+        Returns the IDs of the cards in a category ("All" for every card).
+        """
+        if category == "All":
+            return self.all
+        return self._cards.get(category, array("I"))
+
+    def count(self, category):
+        """
+        Returns how many cards a category holds.
+        """
+        return len(self.cards(category))
+
+    def add(self, card_id, category):
+        """
+        Indexes a card.
+
+        Returns:
+            bool: True if the card created a new category.
+        """
+        _insert(self.all, card_id)
+        return self._add_to_category(card_id, category)
+
+    def add_many(self, store, card_ids):
+        """
+        Indexes a run of new cards from a CardStore.
+
+        Returns:
+            list: The categories that did not exist before, unsorted.
+        """
+        new_categories = []
+        for card_id in card_ids:
+            category = store.category(card_id)
+            ids = self._cards.get(category)
+            if ids is None:
+                ids = self._cards[category] = array("I")
+                new_categories.append(category)
+            _insert(ids, card_id)
+            _insert(self.all, card_id)
+        if new_categories:
+            self._names = sorted(self._cards)
+        return new_categories
+
+    def remove(self, card_id, category):
+        """
+        Removes a card from the index.
+
+        Returns:
+            bool: True if the category has no cards left.
+        """
+        _delete(self.all, card_id)
+        return self._remove_from_category(card_id, category)
+
+    def move(self, card_id, old_category, new_category):
+        """
+        Moves a card to another category.
+
+        Returns:
+            tuple: (old category emptied, new category created)
+        """
+        if old_category == new_category:
+            return False, False
+        emptied = self._remove_from_category(card_id, old_category)
+        created = self._add_to_category(card_id, new_category)
+        return emptied, created
+
+    def _add_to_category(self, card_id, category):
+        ids = self._cards.get(category)
+        if ids is None:
+            self._cards[category] = array("I", [card_id])
+            bisect.insort(self._names, category)
+            return True
+        _insert(ids, card_id)
+        return False
+
+    def _remove_from_category(self, card_id, category):
+        ids = self._cards[category]
+        _delete(ids, card_id)
+        if ids:
+            return False
+        del self._cards[category]
+        del self._names[self.position(category)]
+        return True
+
+    def clear(self):
+        """
+        Removes every card from the index.
+        """
+        self.all = array("I")
+        self._cards = {}
+        self._names = []
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the index, in bytes.
+        """
+        total = sys.getsizeof(self.all) + sys.getsizeof(self._cards) + sys.getsizeof(self._names)
+        total += sum(sys.getsizeof(name) + sys.getsizeof(cards) for name, cards in self._cards.items())
+        return total
+
+
+def _insert(ids, card_id):
+    """
+    Inserts a card ID into an ordered array; appending is the common case.
+    """
+    if not ids or ids[-1] < card_id:
+        ids.append(card_id)
+    else:
+        ids.insert(bisect.bisect_left(ids, card_id), card_id)
+
+
+def _delete(ids, card_id):
+    """
+    Deletes a card ID from an ordered array.
+    """
+    position = bisect.bisect_left(ids, card_id)
+    if position == len(ids) or ids[position] != card_id:
+        raise KeyError(card_id)
+    del ids[position]
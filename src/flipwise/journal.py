@@ -0,0 +1,569 @@
+from array import array
+import bisect
+import collections
+import contextlib
+import json
+import os
+import threading
+
+from flipwise.index import CategoryIndex
+from flipwise.scheduler import save_sidecar
+from flipwise.store import CardStore
+from flipwise import writer
+
+# Records written before the journal is folded into the deck file
+COMPACT_AFTER = 20000
+
+JOURNAL_VERSION = 1
+
+# One record per line, without spaces; built once rather than per record
+RECORD_ENCODER = json.JSONEncoder(ensure_ascii = False, separators = (",", ":"))
+
+# Records written with a single file write by add_store()
+WRITE_CHUNK = 4096
+
+Replay = collections.namedtuple("Replay", "store index applied clean stale")
+
+
+def journal_path(deck_path):
+    """
+    Returns the path of the journal kept next to a deck file.
+    """
+    return deck_path + ".journal"
+
+
+def pending_path(deck_path):
+    """
+    Returns the path of the journal written while a compaction runs.
+    """
+    return deck_path + ".journal.next"
+
+
+def base_stamp(deck_path):
+    """
+    Identifies the exact deck file a journal applies to.
+    """
+    stat = os.stat(deck_path)
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+
+def read_journal(path):
+    """
+    Reads a journal file.
+
+    A torn last line, left behind by a crash in the middle of a write, is
+    ignored.
+
+    Returns:
+        tuple: (header, records), or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding = "utf-8") as file:
+        lines = file.read().split("\n")
+
+    if lines[-1] != "":
+        lines.pop()
+    records = []
+    header = None
+    for line in lines:
+        if not line:
+            continue
+        value = json.loads(line)
+        if header is None:
+            header = value
+        else:
+            records.append(value)
+    if header is None or header.get("journal") != JOURNAL_VERSION:
+        return None
+    return header, records
+
+
+def replay_position(card_id, base_ids, base_slots):
+    """
+    Returns the position of a card in the replay order of a deck file that
+    holds the cards base_ids of a store with base_slots slots, or for None
+    the order of the store itself.
+    """
+    if base_ids is None:
+        return card_id
+    if card_id < base_slots:
+        return bisect.bisect_left(base_ids, card_id)
+    return len(base_ids) + card_id - base_slots
+
+
+def replay_card(position, base_ids, base_slots):
+    """
+    Returns the card ID at a position of the replay order; the inverse of
+    replay_position().
+    """
+    if base_ids is None:
+        return position
+    if position < len(base_ids):
+        return base_ids[position]
+    return base_slots + position - len(base_ids)
+
+
+def apply_record(record, store, index, scheduler):
+    """
+    Applies one journal record to a store, its category index and its
+    scheduling state.
+    """
+    op = record[0]
+    if op == "a":
+        _, front, back, category = record
+        index.add(store.add(front, back, category), category)
+    elif op == "e":
+        _, card_id, front, back, category = record
+        old_category = store.category(card_id)
+        store.update(card_id, front, back, category)
+        index.move(card_id, old_category, category)
+    elif op == "d":
+        card_id = record[1]
+        category = store.category(card_id)
+        store.remove(card_id)
+        index.remove(card_id, category)
+    elif op == "r":
+        _, card_id, due, interval, ease, reps = record
+        scheduler.set_state(card_id, due, interval, ease, reps)
+    elif op == "c":
+        store.clear()
+        index.clear()
+        scheduler.clear()
+    else:
+        raise ValueError(f"Unknown journal record: {record!r}")
+
+
+def replay(deck_path, store, index, scheduler):
+    """
+    Applies the journal of a deck to the cards loaded from the deck file.
+
+    If the program stopped while a compaction was running, both the old
+    and the pending journal are resolved here. No file is changed, so a
+    deck can be inspected without being journaled.
+
+    Args:
+        deck_path (str): Path of the JSON or CSV deck file.
+        store (CardStore): The cards read from the deck file, in file order.
+        index (CategoryIndex): The category index of store.
+        scheduler (Scheduler): The scheduling state of store; renumbered
+            in place if needed.
+
+    Returns:
+        Replay: (store, index, applied, clean, stale). The store and index
+        are new objects if the cards had to be renumbered. clean is False
+        when the journal files must be rewritten with Journal.checkpoint();
+        stale is True when the journal does not belong to the deck file and
+        must be kept aside with set_aside() first.
+    """
+    stamp = base_stamp(deck_path)
+    current = read_journal(journal_path(deck_path))
+    pending = read_journal(pending_path(deck_path))
+    applied = 0
+    clean = True
+    stale = False
+
+    if pending is not None:
+        clean = False
+        if current is not None and current[0]["seq"] == pending[0]["seq"]:
+            # The pending records were already merged into the journal
+            pending = None
+        elif current is not None and current[0]["base"] == stamp:
+            # Stopped before the compacted deck replaced the deck file
+            for record in current[1]:
+                apply_record(record, store, index, scheduler)
+            applied += len(current[1])
+            current = None
+            scheduler.renumber(index.all)
+            store = CardStore(store.cards())
+            index = CategoryIndex.build(store)
+        else:
+            # The deck file was already replaced; the old journal is folded in
+            current = None
+
+    if current is not None:
+        if current[0]["base"] == stamp:
+            for record in current[1]:
+                apply_record(record, store, index, scheduler)
+            applied += len(current[1])
+        else:
+            # The deck file was changed outside FlipWise
+            clean = False
+            stale = True
+
+    if pending is not None:
+        for record in pending[1]:
+            apply_record(record, store, index, scheduler)
+        applied += len(pending[1])
+
+    return Replay(store, index, applied, clean, stale)
+
+
+def set_aside(deck_path):
+    """
+    Renames a journal that does not belong to its deck file to
+    <journal>.stale, so the edits it holds are not lost to a new journal.
+    """
+    os.replace(journal_path(deck_path), journal_path(deck_path) + ".stale")
+
+
+class Compactor(threading.Thread):
+    """
+    Writes a snapshot of the deck to a temporary file on a worker thread,
+    along with its scheduling state.
+    """
+
+    def __init__(self, deck_path, snapshot, schedule = None, compact = False):
+        super().__init__(daemon = True)
+        self.deck_path = deck_path
+        self.snapshot = snapshot
+        self.schedule = schedule
+        self.compact = compact
+        self.temp_path = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.temp_path = writer.write_temp(self.deck_path, self.snapshot.cards(), self.compact)
+            if self.schedule is not None:
+                save_sidecar(self.deck_path, self.snapshot, self.schedule)
+        except Exception as e:
+            self.error = e
+
+
+class Journal:
+    """
+    Append-only log of the edits made to a JSON or CSV deck.
+
+    Every add, edit, delete and clear is appended as one line, so saving
+    an edit costs O(1) no matter how large the deck is. The journal is
+    replayed when the deck is opened, and compaction folds it back into
+    the deck file with a write-to-temp-then-rename.
+
+    Records name cards by their position in the replay order: the cards
+    of the deck file first, then every added card in turn. That is the
+    order a freshly loaded CardStore assigns IDs in, so the two only
+    differ after a compaction drops deleted cards from the deck file;
+    _base_ids maps live card IDs to their new positions until the deck is
+    reloaded.
+    """
+
+    def __init__(self, deck_path, compact = False):
+        """
+        Args:
+            deck_path (str): Path of the JSON or CSV deck file.
+            compact (bool): Write JSON without whitespace when the deck
+                file is rewritten.
+        """
+        self.deck_path = deck_path
+        self.compact = compact
+        self.path = journal_path(deck_path)
+        self.next_path = pending_path(deck_path)
+        self.seq = 0
+        self.records = 0
+        self.file = None
+        self.next_file = None
+        self.compactor = None
+        self._base_ids = None
+        self._base_slots = 0
+        # Numbering of the deck file and record count from before a
+        # compaction, to fall back on if it fails, and the numbering of the
+        # snapshot it writes
+        self._before_compaction = None
+        # Records after which a compaction is tried again once one failed
+        self._retry_after = 0
+        self._batched = False
+
+    def resume(self):
+        """
+        Continues the existing journal of a deck that was just replayed
+        cleanly, or starts an empty one.
+        """
+        current = read_journal(self.path)
+        if current is None:
+            self._start(self.seq + 1)
+            return
+        self.seq = current[0]["seq"]
+        self.records = len(current[1])
+
+        # Drop a torn last line so new records start on a line of their own
+        with open(self.path, "rb") as file:
+            data = file.read()
+        complete = data.rfind(b"\n") + 1
+        if complete != len(data):
+            os.truncate(self.path, complete)
+        self.file = open(self.path, "a", encoding = "utf-8")
+
+    def checkpoint(self, store, live_ids = None, scheduler = None):
+        """
+        Rewrites the deck file from store and starts an empty journal.
+
+        Args:
+            store (CardStore): The current cards.
+            live_ids (array): Optional ordered IDs of the live cards.
+            scheduler (Scheduler): Scheduling state to save alongside.
+        """
+        if self.compactor is not None:
+            self.compactor.join()
+            if self.compactor.temp_path is not None and os.path.exists(self.compactor.temp_path):
+                os.remove(self.compactor.temp_path)
+            self.compactor = None
+        self._close_files()
+        writer.write_deck(self.deck_path, store.cards(), self.compact)
+        if scheduler is not None:
+            save_sidecar(self.deck_path, store, scheduler)
+        self.begin(store, live_ids)
+
+    def begin(self, store, live_ids = None):
+        """
+        Starts an empty journal for a deck file that holds exactly the live
+        cards of store, such as one just written from a snapshot.
+        """
+        self._renumber(store, live_ids)
+        self._start(self.seq + 1)
+        if os.path.exists(self.next_path):
+            os.remove(self.next_path)
+
+    def _start(self, seq):
+        """
+        Atomically replaces the journal with an empty one for the current
+        deck file.
+        """
+        self.seq = seq
+        self.records = 0
+        self._retry_after = 0
+        temp_path = writer.temp_file(self.path)
+        with open(temp_path, "w", encoding = "utf-8") as file:
+            file.write(self._header(base_stamp(self.deck_path)))
+            file.flush()
+            os.fsync(file.fileno())
+        writer.replace(temp_path, self.path)
+        self.file = open(self.path, "a", encoding = "utf-8")
+
+    def _header(self, stamp):
+        return json.dumps({"journal": JOURNAL_VERSION, "seq": self.seq, "base": stamp}) + "\n"
+
+    def _renumber(self, store, live_ids = None):
+        """
+        Records that the deck file now holds exactly the live cards of store.
+        """
+        self._base_ids = array("I", store if live_ids is None else live_ids)
+        self._base_slots = store.slots
+
+    def _position(self, card_id):
+        """
+        Translates a card ID into its position in the replay order.
+        """
+        return replay_position(card_id, self._base_ids, self._base_slots)
+
+    def _write(self, record):
+        file = self.next_file or self.file
+        file.write(RECORD_ENCODER.encode(record) + "\n")
+        if not self._batched:
+            file.flush()
+        self.records += 1
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Writes the records logged inside the block with one flush at its end.
+        """
+        if self._batched:
+            yield
+            return
+        self._batched = True
+        try:
+            yield
+        finally:
+            self._batched = False
+            for file in (self.file, self.next_file):
+                if file is not None and not file.closed:
+                    file.flush()
+
+    def add(self, front, back, category):
+        """
+        Logs a new card.
+        """
+        self._write(["a", front, back, category])
+
+    def add_store(self, store):
+        """
+        Logs every live card of a CardStore as a new card, in ID order.
+        """
+        file = self.next_file or self.file
+        encode = RECORD_ENCODER.encode
+        lines = []
+        for card_id in store:
+            lines.append(encode(["a", store.front(card_id), store.back(card_id), store.category(card_id)]) + "\n")
+            if len(lines) >= WRITE_CHUNK:
+                file.write("".join(lines))
+                self.records += len(lines)
+                lines = []
+        file.write("".join(lines))
+        self.records += len(lines)
+        if not self._batched:
+            file.flush()
+
+    def edit(self, card_id, front, back, category):
+        """
+        Logs new contents for a card.
+        """
+        self._write(["e", self._position(card_id), front, back, category])
+
+    def delete(self, card_id):
+        """
+        Logs a deleted card.
+        """
+        self._write(["d", self._position(card_id)])
+
+    def review(self, card_id, due, interval, ease, reps):
+        """
+        Logs the new scheduling state of a reviewed card.
+        """
+        self._write(["r", self._position(card_id), due, interval, ease, reps])
+
+    def clear(self):
+        """
+        Logs that every card was deleted. A cleared CardStore hands out IDs
+        from zero again, exactly as a replay does.
+        """
+        self._write(["c"])
+        self._base_ids = None
+        self._base_slots = 0
+
+    def needs_compaction(self):
+        """
+        Returns True if the journal is long enough to be folded into the deck.
+        """
+        return self.compactor is None and self.records >= self._retry_after + COMPACT_AFTER
+
+    def begin_compaction(self, store, live_ids = None, scheduler = None):
+        """
+        Starts folding the journal into the deck file in the background.
+
+        Records written from now on go to a pending journal numbered
+        against the compacted deck. Call finish_compaction() from the
+        same thread that writes records once compactor is no longer alive.
+
+        Args:
+            store (CardStore): The current cards; copied before returning.
+            live_ids (array): Optional ordered IDs of the live cards.
+            scheduler (Scheduler): Scheduling state to save alongside.
+        """
+        snapshot = store.copy()
+        numbering = (self._base_ids, self._base_slots, self.records)
+        schedule = scheduler.copy() if scheduler is not None else None
+        self._renumber(store, live_ids)
+        self._before_compaction = numbering + (self._base_ids, self._base_slots)
+        self.seq += 1
+        self.next_file = open(self.next_path, "w", encoding = "utf-8")
+        self.next_file.write(self._header(None))
+        self.next_file.flush()
+        self.records = 0
+
+        self.compactor = Compactor(self.deck_path, snapshot, schedule, self.compact)
+        self.compactor.start()
+
+    def finish_compaction(self):
+        """
+        Moves the compacted deck into place and makes the pending journal
+        the journal of the new deck file.
+
+        Returns:
+            Exception: The error that stopped the compaction, or None.
+        """
+        compactor = self.compactor
+        compactor.join()
+        if compactor.error is not None:
+            self._abandon_compaction()
+            return compactor.error
+
+        writer.replace(compactor.temp_path, self.deck_path)
+
+        # Rewrite the pending records under a header for the new deck file
+        self.next_file.close()
+        with open(self.next_path, "r", encoding = "utf-8") as file:
+            pending = file.read().split("\n", 1)[1]
+        temp_path = writer.temp_file(self.path)
+        with open(temp_path, "w", encoding = "utf-8") as file:
+            file.write(self._header(base_stamp(self.deck_path)))
+            file.write(pending)
+            file.flush()
+            os.fsync(file.fileno())
+        self.file.close()
+        writer.replace(temp_path, self.path)
+        os.remove(self.next_path)
+
+        self.file = open(self.path, "a", encoding = "utf-8")
+        self.next_file = None
+        self.compactor = None
+        self._before_compaction = None
+        self._retry_after = 0
+        return None
+
+    def _abandon_compaction(self):
+        """
+        Cleans up after a failed compaction. The deck file is left as it
+        was, and the pending records are folded back into its journal,
+        renumbered against it, so the journal goes on as before and is
+        compacted again after another COMPACT_AFTER records.
+        """
+        compactor = self.compactor
+        if compactor.temp_path is not None and os.path.exists(compactor.temp_path):
+            os.remove(compactor.temp_path)
+        old_ids, old_slots, old_records, compacted_ids, compacted_slots = self._before_compaction
+
+        self.next_file.close()
+        pending = read_journal(self.next_path)[1]
+        lines = []
+        renumber = True
+        for record in pending:
+            if record[0] == "c":
+                # From a clear on, both numberings are the store's own
+                renumber = False
+            elif renumber and record[0] in ("e", "d", "r"):
+                card_id = replay_card(record[1], compacted_ids, compacted_slots)
+                record[1] = replay_position(card_id, old_ids, old_slots)
+            lines.append(RECORD_ENCODER.encode(record) + "\n")
+
+        self.file.flush()
+        with open(self.path, "r", encoding = "utf-8") as file:
+            current = file.read().split("\n", 1)[1]
+        # The header takes the seq of the pending journal, which marks it
+        # as merged should the program stop before it is removed
+        temp_path = writer.temp_file(self.path)
+        with open(temp_path, "w", encoding = "utf-8") as file:
+            file.write(self._header(base_stamp(self.deck_path)))
+            file.write(current)
+            file.write("".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+        self.file.close()
+        writer.replace(temp_path, self.path)
+        os.remove(self.next_path)
+
+        self.file = open(self.path, "a", encoding = "utf-8")
+        self.next_file = None
+        self.compactor = None
+        self._before_compaction = None
+        if renumber:
+            self._base_ids, self._base_slots = old_ids, old_slots
+        self.records = old_records + len(pending)
+        self._retry_after = self.records
+
+    def _close_files(self):
+        for file in (self.file, self.next_file):
+            if file is not None and not file.closed:
+                file.flush()
+                os.fsync(file.fileno())
+                file.close()
+        self.file = None
+        self.next_file = None
+
+    def close(self):
+        """
+        Waits for a running compaction and closes the journal.
+        """
+        if self.compactor is not None:
+            self.finish_compaction()
+        self._close_files()
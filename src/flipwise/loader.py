@@ -0,0 +1,284 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import queue
+import threading
+
+# Number of cards handed to the UI at a time
+BATCH_SIZE = 5000
+
+# Characters read from a JSON file per chunk
+CHUNK_SIZE = 1 << 16
+
+# Suffixes of compressed JSON and CSV decks, and the module that reads each
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".xz": "lzma"}
+
+# Leading bytes of gzip and xz streams
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+
+# Category of a card that names none
+DEFAULT_CATEGORY = "General"
+
+
+def normalize_card(card):
+    """
+    Turns a parsed JSON object or CSV row into a flashcard dict.
+
+    Args:
+        card (dict): The parsed object.
+
+    Returns:
+        dict: {"front": str, "back": str, "category": str}
+    """
+    return {"front": card["front"], "back": card["back"], "category": card.get("category") or DEFAULT_CATEGORY}
+
+
+def iter_json_cards(file, chunk_size = CHUNK_SIZE):
+    """
+    Parses a JSON array of flashcards one element at a time.
+
+    Only the current chunk and the element being decoded are held in
+    memory, so a deck of any size can be streamed.
+
+    Args:
+        file: A text file object positioned at the start of the array.
+        chunk_size (int): Characters to read per chunk.
+
+    Yields:
+        dict: One flashcard per array element.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array of flashcards")
+    pos += 1
+
+    expect_value = True
+    count = 0
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of file inside the JSON array")
+
+        char = buffer[pos]
+        if char == "]":
+            if expect_value and count:
+                raise ValueError("Unexpected ',' before the end of the JSON array")
+            return
+        if char == ",":
+            if expect_value:
+                raise ValueError("Unexpected ',' in the JSON array")
+            expect_value = True
+            pos += 1
+            continue
+        if not expect_value:
+            raise ValueError("Expected ',' between flashcards")
+
+        # Decode one element, reading more when it spans past the buffer
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next chunk
+                fill()
+                continue
+            break
+
+        pos = end
+        expect_value = False
+        count += 1
+        if not isinstance(value, dict):
+            raise ValueError("Every flashcard must be a JSON object")
+        yield normalize_card(value)
+
+
+def iter_csv_cards(file):
+    """
+    Parses a CSV file with front, back and category columns row by row.
+
+    Args:
+        file: A text file object opened with newline = "".
+
+    Yields:
+        dict: One flashcard per row.
+    """
+    for row in csv.DictReader(file):
+        yield normalize_card(row)
+
+
+def compression(file_path):
+    """
+    Returns "gzip" or "lzma" if the file name ends in .gz or .xz, or None.
+    """
+    return COMPRESSED_SUFFIXES.get(os.path.splitext(file_path)[1].lower())
+
+
+def deck_format(file_path):
+    """
+    Returns "json", "csv" or "flipwise" based on the file extension, or None.
+    JSON and CSV decks may also end in .gz or .xz.
+    """
+    lower = file_path.lower()
+    if lower.endswith(".flipwise"):
+        return "flipwise"
+    if compression(lower) is not None:
+        lower = os.path.splitext(lower)[0]
+    if lower.endswith(".json"):
+        return "json"
+    if lower.endswith(".csv"):
+        return "csv"
+    return None
+
+
+def open_decompressed(raw):
+    """
+    Wraps a binary file in a streaming decompressor if it starts like a
+    gzip or xz stream, whatever its name, and returns it unchanged if not.
+    """
+    magic = raw.read(len(XZ_MAGIC))
+    raw.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        import gzip
+
+        return gzip.GzipFile(fileobj = raw, mode = "rb")
+    if magic.startswith(XZ_MAGIC):
+        import lzma
+
+        return lzma.LZMAFile(raw, "rb")
+    return raw
+
+
+def iter_cards(file_path):
+    """
+    Streams the flashcards stored in a JSON or CSV file.
+
+    Args:
+        file_path (str): Path of the deck file.
+
+    Yields:
+        dict: One flashcard at a time.
+    """
+    with open_cards(file_path) as (cards, _progress):
+        yield from cards
+
+
+@contextlib.contextmanager
+def open_cards(file_path):
+    """
+    Opens a deck file for streaming.
+
+    Args:
+        file_path (str): Path of the deck file.
+
+    Yields:
+        tuple: (cards, progress) where cards iterates over flashcard dicts
+        and progress() returns the fraction of the file read so far.
+    """
+    kind = deck_format(file_path)
+    if kind not in ("json", "csv"):
+        raise ValueError(f"Unknown deck format: {file_path}")
+
+    raw = open(file_path, "rb")
+    size = os.fstat(raw.fileno()).st_size
+    stream = open_decompressed(raw)
+    if kind == "json":
+        text = io.TextIOWrapper(stream, encoding = "utf-8-sig")
+        cards = iter_json_cards(text)
+    else:
+        text = io.TextIOWrapper(stream, encoding = "utf-8-sig", newline = "")
+        cards = iter_csv_cards(text)
+
+    # Progress is measured on the file itself, compressed or not
+    def progress():
+        if size == 0 or raw.closed:
+            return 1.0
+        return min(1.0, raw.tell() / size)
+
+    with raw, text:
+        yield cards, progress
+
+
+class DeckLoader(threading.Thread):
+    """
+    Parses a deck file on a worker thread and queues the cards in batches.
+
+    The Tk main loop must not be touched from another thread, so the
+    worker never calls back into the UI; the UI polls `batches` from
+    `root.after` instead. Each queued item is one of:
+        ("batch", [cards], progress)
+        ("done", total, None)
+        ("error", exception, None)
+        ("cancelled", total, None)
+    """
+
+    def __init__(self, file_path, batch_size = BATCH_SIZE, reader = None):
+        """
+        Args:
+            file_path (str): Path of the deck file.
+            batch_size (int): Cards per queued batch.
+            reader: Context manager factory with the signature of
+                open_cards; defaults to open_cards.
+        """
+        super().__init__(daemon = True)
+        self.file_path = file_path
+        self.batch_size = batch_size
+        self.reader = reader or open_cards
+        self.batches = queue.Queue()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the worker to stop after the current batch.
+        """
+        self.cancelled.set()
+
+    def run(self):
+        total = 0
+        try:
+            with self.reader(self.file_path) as (cards, progress):
+                batch = []
+                for card in cards:
+                    batch.append(card)
+                    if len(batch) >= self.batch_size:
+                        if self.cancelled.is_set():
+                            self.batches.put(("cancelled", total, None))
+                            return
+                        total += len(batch)
+                        self.batches.put(("batch", batch, progress()))
+                        batch = []
+                if batch:
+                    total += len(batch)
+                    self.batches.put(("batch", batch, 1.0))
+            self.batches.put(("done", total, None))
+        except Exception as e:
+            self.batches.put(("error", e, None))
@@ -0,0 +1,209 @@
+import collections
+import itertools
+import queue
+import sqlite3
+import threading
+import unicodedata
+
+from flipwise.loader import BATCH_SIZE, open_cards
+
+# Keys kept in memory before they spill to a temporary SQLite file
+MEMORY_KEYS = 500_000
+
+# Keys looked up in the spill file per query
+SPILL_QUERY = 500
+
+# Batches queued by a Merger before it waits for the UI to take them
+QUEUED_BATCHES = 8
+
+MergeResult = collections.namedtuple("MergeResult", "added duplicates updated spilled")
+
+
+def normalize_text(text):
+    """
+    Returns text with Unicode, whitespace and case differences removed.
+    """
+    return unicodedata.normalize("NFC", " ".join(text.split())).casefold()
+
+
+class KeyIndex:
+    """
+    Maps 64-bit card keys to (card ID, back hash) pairs.
+
+    Up to memory_keys entries live in a dict. Past that they are moved to
+    a temporary SQLite database that is deleted when the index is closed,
+    so memory stays bounded however many cards are merged.
+    """
+
+    def __init__(self, memory_keys = MEMORY_KEYS):
+        self.memory_keys = memory_keys
+        self.spilled = 0
+        self._keys = {}
+        self._spill = None
+
+    def __len__(self):
+        return len(self._keys) + self.spilled
+
+    def lookup(self, keys):
+        """
+        Returns {key: (card ID, back hash)} for the given keys that are known.
+        """
+        memory = self._keys
+        found = {key: memory[key] for key in keys if key in memory}
+        if self._spill is None:
+            return found
+        missing = [key for key in keys if key not in found]
+        for start in range(0, len(missing), SPILL_QUERY):
+            chunk = missing[start:start + SPILL_QUERY]
+            cursor = self._spill.execute(f"SELECT key, card_id, back FROM keys WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, card_id, back in cursor:
+                found[key] = (card_id, back)
+        return found
+
+    def put(self, key, card_id, back = 0):
+        """
+        Records the card a key belongs to.
+        """
+        self._keys[key] = (card_id, back)
+        if len(self._keys) >= self.memory_keys:
+            self._flush()
+
+    def _flush(self):
+        if self._spill is None:
+            # An empty file name gives a private database on disk, deleted on close
+            self._spill = sqlite3.connect("", check_same_thread = False)
+            self._spill.execute("CREATE TABLE keys (key INTEGER PRIMARY KEY, card_id INTEGER, back INTEGER) WITHOUT ROWID")
+        with self._spill:
+            self._spill.executemany("INSERT OR REPLACE INTO keys VALUES (?, ?, ?)",
+                                    ((key, card_id, back) for key, (card_id, back) in self._keys.items()))
+        self.spilled = self._spill.execute("SELECT count(*) FROM keys").fetchone()[0]
+        self._keys = {}
+
+    def close(self):
+        """
+        Deletes the spill file.
+        """
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+class Merger(threading.Thread):
+    """
+    Streams deck files into an existing deck, leaving out duplicates.
+
+    A card is a duplicate if its front, back and category equal those of
+    a card already in the deck or read before, ignoring case and extra
+    whitespace. With update, cards are matched on front and category only,
+    and a card whose back differs replaces the back of its match instead.
+
+    Only the cards that change the deck are handed on, as lists of
+    (card ID, card) pairs: the ID is None for a card to add and names the
+    card to change otherwise. Added cards are expected to receive IDs
+    from first_id on, in order, so the deck must not be edited meanwhile.
+
+    Run it as a thread and poll `batches`, which holds
+        ("batch", [(card ID, card)], progress)
+        ("done", MergeResult, None)
+        ("error", exception, None)
+        ("cancelled", None, None)
+    or iterate over steps() on the calling thread.
+    """
+
+    def __init__(self, file_paths, existing, first_id, update = False, batch_size = BATCH_SIZE, memory_keys = MEMORY_KEYS):
+        """
+        Args:
+            file_paths (list): JSON or CSV files, merged in order.
+            existing (iterable): (card ID, front, back, category) of the
+                cards already in the deck.
+            first_id (int): The ID the deck gives its next new card.
+            update (bool): Update backs instead of adding a second card.
+            batch_size (int): Cards read per batch.
+            memory_keys (int): Keys kept in memory before spilling.
+        """
+        super().__init__(daemon = True)
+        self.file_paths = list(file_paths)
+        self.existing = existing
+        self.next_id = first_id
+        self.update = update
+        self.batch_size = batch_size
+        self.keys = KeyIndex(memory_keys)
+        self.batches = queue.Queue(QUEUED_BATCHES)
+        self.cancelled = threading.Event()
+        self.added = self.duplicates = self.updated = 0
+        self.result = None
+
+    def cancel(self):
+        """
+        Asks the worker to stop after the current batch.
+        """
+        self.cancelled.set()
+
+    def key(self, front, back, category):
+        """
+        Returns (key, back hash) of a card. hash() is only stable within
+        one process, which is all a merge needs.
+        """
+        front, back, category = normalize_text(front), normalize_text(back), normalize_text(category)
+        if self.update:
+            return hash((front, category)), hash(back)
+        return hash((front, back, category)), 0
+
+    def steps(self):
+        """
+        Merges the files, yielding ([(card ID, card)], progress) per batch.
+        result holds the counts once the generator is exhausted.
+        """
+        keys = self.keys
+        try:
+            for card_id, front, back, category in self.existing:
+                key, back_hash = self.key(front, back, category)
+                keys.put(key, card_id, back_hash)
+            self.existing = None
+
+            files = len(self.file_paths)
+            for number, file_path in enumerate(self.file_paths):
+                with open_cards(file_path) as (cards, progress):
+                    while True:
+                        batch = list(itertools.islice(cards, self.batch_size))
+                        if not batch:
+                            break
+                        yield self._merge_batch(batch), (number + progress()) / files
+            self.result = MergeResult(self.added, self.duplicates, self.updated, keys.spilled)
+        finally:
+            keys.close()
+
+    def _merge_batch(self, batch):
+        """
+        Returns the changes a batch of cards makes to the deck, and counts them.
+        """
+        hashed = [self.key(card["front"], card["back"], card["category"]) for card in batch]
+        found = self.keys.lookup({key for key, _ in hashed})
+        changes = []
+        for card, (key, back) in zip(batch, hashed):
+            match = found.get(key)
+            if match is None:
+                found[key] = (self.next_id, back)
+                self.keys.put(key, self.next_id, back)
+                self.next_id += 1
+                changes.append((None, card))
+                self.added += 1
+            elif match[1] == back:
+                self.duplicates += 1
+            else:
+                found[key] = (match[0], back)
+                self.keys.put(key, match[0], back)
+                changes.append((match[0], card))
+                self.updated += 1
+        return changes
+
+    def run(self):
+        try:
+            for changes, progress in self.steps():
+                if self.cancelled.is_set():
+                    self.batches.put(("cancelled", None, None))
+                    return
+                self.batches.put(("batch", changes, progress))
+            self.batches.put(("done", self.result, None))
+        except Exception as e:
+            self.batches.put(("error", e, None))
@@ -0,0 +1,125 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import time
+
+# Lines of the text report written next to a profile
+PROFILE_REPORT_LINES = 40
+
+
+class Recorder:
+    """
+    Collects wall time and call counts per named operation.
+
+    Recording is off until enabled; a timed() function then costs one
+    attribute check per call. An operation can also be armed with
+    profile_next() so that its next call runs under cProfile.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._stats = {}
+        self._armed = {}
+        self.last_profile = None
+
+    def reset(self):
+        """
+        Forgets every timing recorded so far.
+        """
+        self._stats = {}
+
+    def record(self, name, seconds):
+        """
+        Adds one call of an operation that took the given wall time.
+        """
+        if not self.enabled:
+            return
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+    def call(self, name, function, args, kwargs):
+        """
+        Runs function(*args, **kwargs) and records its wall time.
+        """
+        path = self._armed.pop(name, None)
+        profiler = cProfile.Profile() if path is not None else None
+        start = time.perf_counter()
+        try:
+            if profiler is None:
+                return function(*args, **kwargs)
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - start)
+            if profiler is not None:
+                self._dump(profiler, name, path)
+
+    def profile_next(self, name, path):
+        """
+        Runs the next call of an operation under cProfile, even while
+        recording is off.
+
+        Args:
+            name (str): The operation.
+            path (str): Where to dump the pstats file; a readable report
+                sorted by cumulative time is written to path + ".txt".
+        """
+        self._armed[name] = path
+
+    def armed(self):
+        """
+        Returns the operations waiting to be profiled.
+        """
+        return list(self._armed)
+
+    def _dump(self, profiler, name, path):
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream = report).sort_stats("cumulative").print_stats(PROFILE_REPORT_LINES)
+        with open(path + ".txt", "w", encoding = "utf-8") as file:
+            file.write(report.getvalue())
+        self.last_profile = (name, path)
+
+    def snapshot(self):
+        """
+        Returns the timings, slowest total first.
+
+        Returns:
+            list: {"name", "calls", "total_ms", "mean_ms", "max_ms"} dicts.
+        """
+        rows = [{"name": name, "calls": calls, "total_ms": total * 1000, "mean_ms": total / calls * 1000, "max_ms": worst * 1000}
+                for name, (calls, total, worst) in self._stats.items()]
+        rows.sort(key = lambda row: row["total_ms"], reverse = True)
+        return rows
+
+    def export(self, path):
+        """
+        Writes the timings to a JSON file.
+        """
+        with open(path, "w", encoding = "utf-8") as file:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "operations": self.snapshot()}, file, indent = 2)
+
+
+# The recorder used by timed() unless another one is given
+recorder = Recorder()
+
+
+def timed(name, recorder = recorder):
+    """
+    Decorates a function so its calls are recorded under name.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled and not recorder._armed:
+                return function(*args, **kwargs)
+            return recorder.call(name, function, args, kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,292 @@
+from array import array
+import hashlib
+import heapq
+import os
+import struct
+import sys
+
+from flipwise import writer
+
+# Grades accepted by Scheduler.review, from worst to best
+AGAIN, HARD, GOOD, EASY = 0, 1, 2, 3
+
+# SM-2 quality of each grade
+QUALITY = {AGAIN: 1, HARD: 3, GOOD: 4, EASY: 5}
+
+DAY = 86400.0
+
+# A failed card is shown again after this many seconds
+RELEARN_DELAY = 60.0
+
+DEFAULT_EASE = 2.5
+MINIMUM_EASE = 1.3
+
+SIDECAR_MAGIC = b"FWSRS\x01"
+
+
+class Scheduler:
+    """
+    SM-2 spaced-repetition state for every card, with heap-based due queues.
+
+    The interval, ease, repetition count and due time of each card are
+    kept in arrays indexed by card ID. One heap of (due, card ID) is kept
+    per category and built the first time the category is studied.
+    Rescheduling a card pushes a fresh entry instead of searching the heap;
+    entries whose due time no longer matches the card are dropped when they
+    reach the top. Picking and rescheduling are therefore O(log n).
+    """
+
+    def __init__(self):
+        self._due = array("d")
+        self._interval = array("d")
+        self._ease = array("d")
+        self._reps = array("I")
+        self._queues = {}
+        self.reviewed = False
+
+    def ensure(self, slots):
+        """
+        Makes room for card IDs below slots. New cards are due immediately.
+        """
+        missing = slots - len(self._due)
+        if missing > 0:
+            self._due.extend(array("d", [0.0]) * missing)
+            self._interval.extend(array("d", [0.0]) * missing)
+            self._ease.extend(array("d", [DEFAULT_EASE]) * missing)
+            self._reps.extend(array("I", [0]) * missing)
+
+    def clear(self):
+        """
+        Forgets every card, as after CardStore.clear().
+        """
+        self.__init__()
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the scheduling state, in bytes.
+        """
+        total = sum(sys.getsizeof(column) for column in (self._due, self._interval, self._ease, self._reps))
+        # A heap entry is a (due, card ID) tuple holding a float and an int
+        total += sum(sys.getsizeof(heap) + len(heap) * 116 for heap in self._queues.values())
+        return total
+
+    def state(self, card_id):
+        """
+        Returns (due, interval in days, ease, repetitions) of a card.
+        """
+        return self._due[card_id], self._interval[card_id], self._ease[card_id], self._reps[card_id]
+
+    def set_state(self, card_id, due, interval, ease, reps, category = None):
+        """
+        Overwrites the scheduling state of a card.
+
+        Args:
+            category (str): The category of the card, to update its queues.
+        """
+        self.ensure(card_id + 1)
+        self._due[card_id] = due
+        self._interval[card_id] = interval
+        self._ease[card_id] = ease
+        self._reps[card_id] = reps
+        if category is not None:
+            self.push(card_id, category)
+
+    def is_reviewed(self, card_id):
+        """
+        Returns True if the card has scheduling state worth saving.
+        """
+        return card_id < len(self._due) and self._due[card_id] != 0.0
+
+    def push(self, card_id, category):
+        """
+        Queues a new, edited or rescheduled card in the queues that are built.
+        """
+        self.ensure(card_id + 1)
+        entry = (self._due[card_id], card_id)
+        for name in ("All", category):
+            queue = self._queues.get(name)
+            if queue is not None:
+                heapq.heappush(queue, entry)
+
+    def reset_queues(self):
+        """
+        Drops every due queue; they are rebuilt on next use.
+        """
+        self._queues = {}
+
+    def _queue(self, category, card_ids):
+        queue = self._queues.get(category)
+        if queue is None:
+            self.ensure(card_ids[-1] + 1 if len(card_ids) else 0)
+            due = self._due
+            queue = [(due[card_id], card_id) for card_id in card_ids]
+            heapq.heapify(queue)
+            self._queues[category] = queue
+        return queue
+
+    def next_due(self, category, card_ids, store):
+        """
+        Returns the card of a category with the earliest due time.
+
+        Args:
+            category (str): The category being studied, or "All".
+            card_ids (array): The IDs of the cards in the category, used
+                only to build the queue the first time.
+            store (CardStore): The deck, used to skip stale entries.
+
+        Returns:
+            tuple: (card ID, due time), or None if the category is empty.
+        """
+        queue = self._queue(category, card_ids)
+        due = self._due
+        while queue:
+            entry_due, card_id = queue[0]
+            if (entry_due == due[card_id] and store.is_alive(card_id)
+                    and (category == "All" or store.category(card_id) == category)):
+                break
+            heapq.heappop(queue)
+        else:
+            return None
+
+        # Rebuild a queue that is mostly stale entries
+        if len(queue) > 2 * len(card_ids) + 64:
+            del self._queues[category]
+            return self.next_due(category, card_ids, store)
+        return card_id, entry_due
+
+    def review(self, card_id, grade, now, category):
+        """
+        Reschedules a card after the user graded their answer (SM-2).
+
+        Args:
+            card_id (int): The reviewed card.
+            grade (int): AGAIN, HARD, GOOD or EASY.
+            now (float): The current time, in seconds since the epoch.
+            category (str): The category of the card.
+
+        Returns:
+            tuple: The new (due, interval, ease, repetitions).
+        """
+        self.ensure(card_id + 1)
+        quality = QUALITY[grade]
+        interval = self._interval[card_id]
+        ease = self._ease[card_id]
+        reps = self._reps[card_id]
+
+        if quality < 3:
+            reps = 0
+            interval = 0.0
+            due = now + RELEARN_DELAY
+        else:
+            if reps == 0:
+                interval = 1.0
+            elif reps == 1:
+                interval = 6.0
+            else:
+                interval = round(interval * ease)
+            reps += 1
+            due = now + interval * DAY
+        ease = max(MINIMUM_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+        self.set_state(card_id, due, interval, ease, reps, category)
+        self.reviewed = True
+        return due, interval, ease, reps
+
+    def copy(self):
+        """
+        Returns a copy of the scheduling state without the due queues.
+        """
+        clone = Scheduler()
+        clone._due = array("d", self._due)
+        clone._interval = array("d", self._interval)
+        clone._ease = array("d", self._ease)
+        clone._reps = array("I", self._reps)
+        return clone
+
+    def renumber(self, live_ids):
+        """
+        Keeps only the given cards, renumbered 0, 1, 2... in that order.
+        """
+        self.ensure(max(live_ids) + 1 if len(live_ids) else 0)
+        for name in ("_due", "_interval", "_ease", "_reps"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[card_id] for card_id in live_ids)))
+        self._queues = {}
+
+
+def card_key(front, category):
+    """
+    Identifies a card across saves by its front and category.
+    """
+    digest = hashlib.blake2b(f"{front}\x1f{category}".encode("utf-8"), digest_size = 8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def sidecar_path(deck_path):
+    """
+    Returns the path of the scheduling file kept next to a JSON or CSV deck.
+    """
+    return deck_path + ".srs"
+
+
+def save_sidecar(deck_path, store, scheduler):
+    """
+    Saves the scheduling state of every reviewed card next to a deck.
+
+    Cards are identified by card_key, so the file stays valid however the
+    deck file is reordered.
+    """
+    keys = array("Q")
+    columns = (array("d"), array("d"), array("d"), array("I"))
+    scheduler.ensure(store.slots)
+    for card_id in store:
+        if scheduler.is_reviewed(card_id):
+            keys.append(card_key(store.front(card_id), store.category(card_id)))
+            for column, value in zip(columns, scheduler.state(card_id)):
+                column.append(value)
+
+    path = sidecar_path(deck_path)
+    if not keys and not os.path.exists(path):
+        return
+    temp_path = writer.temp_file(path)
+    with open(temp_path, "wb") as file:
+        file.write(SIDECAR_MAGIC)
+        file.write(struct.pack("<Q", len(keys)))
+        keys.tofile(file)
+        for column in columns:
+            column.tofile(file)
+        file.flush()
+        os.fsync(file.fileno())
+    writer.replace(temp_path, path)
+
+
+def load_sidecar(deck_path, store, scheduler):
+    """
+    Restores the scheduling state saved by save_sidecar, if any.
+
+    Returns:
+        int: Number of cards whose state was restored.
+    """
+    path = sidecar_path(deck_path)
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, "rb") as file:
+        if file.read(len(SIDECAR_MAGIC)) != SIDECAR_MAGIC:
+            raise ValueError(f"{path} is not a FlipWise scheduling file")
+        count = struct.unpack("<Q", file.read(8))[0]
+        keys = array("Q")
+        keys.fromfile(file, count)
+        columns = (array("d"), array("d"), array("d"), array("I"))
+        for column in columns:
+            column.fromfile(file, count)
+
+    states = {key: position for position, key in enumerate(keys)}
+    scheduler.ensure(store.slots)
+    restored = 0
+    for card_id in store:
+        position = states.get(card_key(store.front(card_id), store.category(card_id)))
+        if position is not None:
+            scheduler.set_state(card_id, *(column[position] for column in columns))
+            restored += 1
+    return restored
@@ -0,0 +1,245 @@
+from array import array
+import bisect
+import re
+import sys
+import threading
+
+from flipwise.index import _delete, _insert
+
+_WORD = re.compile(r"\w+")
+
+# A last word shorter than this matches whole words only, since a single
+# letter is a prefix of a large part of the vocabulary
+MIN_PREFIX = 2
+
+
+def tokenize(text):
+    """
+    Splits text into the lowercase words it is indexed and searched by.
+    """
+    return _WORD.findall(text.casefold())
+
+
+def card_words(front, back):
+    """
+    Returns the set of words a card is indexed under.
+    """
+    return set(_WORD.findall(f"{front}\n{back}".casefold()))
+
+
+class SearchIndex:
+    """
+    Inverted index from words to the IDs of the cards that contain them.
+
+    Every word of the front and back of a card maps to an ordered array of
+    card IDs, and the words themselves are kept sorted so the last word
+    typed can be matched as a prefix. A query only touches the postings of
+    the words it names, never the text of the cards.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._words = []
+        self._words_sorted = True
+
+    def __len__(self):
+        """
+        Returns the number of distinct indexed words.
+        """
+        return len(self._postings)
+
+    @classmethod
+    def build(cls, texts):
+        """
+        Creates an index from (card ID, front, back) tuples in ID order, as
+        returned by CardStore.texts().
+        """
+        index = cls()
+        postings = index._postings
+        for card_id, front, back in texts:
+            for word in card_words(front, back):
+                ids = postings.get(word)
+                if ids is None:
+                    postings[word] = array("I", [card_id])
+                else:
+                    ids.append(card_id)
+        # The vocabulary is sorted from the postings by the first prefix
+        # search; until then edits only touch the postings
+        index._words_sorted = False
+        return index
+
+    def add(self, card_id, front, back):
+        """
+        Indexes a new card.
+        """
+        self._add_words(card_id, card_words(front, back))
+
+    def remove(self, card_id, front, back):
+        """
+        Removes a card; front and back are the texts it was indexed with.
+        """
+        self._remove_words(card_id, card_words(front, back))
+
+    def update(self, card_id, old_front, old_back, front, back):
+        """
+        Reindexes an edited card, touching only the words that changed.
+        """
+        old_words = card_words(old_front, old_back)
+        new_words = card_words(front, back)
+        self._remove_words(card_id, old_words - new_words)
+        self._add_words(card_id, new_words - old_words)
+
+    def clear(self):
+        """
+        Removes every card from the index.
+        """
+        self.__init__()
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the index, in bytes.
+        """
+        total = sys.getsizeof(self._postings) + sys.getsizeof(self._words)
+        total += sum(sys.getsizeof(word) + sys.getsizeof(ids) for word, ids in self._postings.items())
+        return total
+
+    def _add_words(self, card_id, words):
+        for word in words:
+            ids = self._postings.get(word)
+            if ids is None:
+                self._postings[word] = array("I", [card_id])
+                if self._words_sorted:
+                    bisect.insort(self._words, word)
+            else:
+                _insert(ids, card_id)
+
+    def _remove_words(self, card_id, words):
+        for word in words:
+            ids = self._postings[word]
+            _delete(ids, card_id)
+            if not ids:
+                del self._postings[word]
+                if self._words_sorted:
+                    del self._words[bisect.bisect_left(self._words, word)]
+
+    def _expand(self, word, prefix):
+        """
+        Returns the postings of a word, or of every word it is a prefix of.
+        """
+        if not prefix:
+            ids = self._postings.get(word)
+            return [ids] if ids is not None else []
+
+        if not self._words_sorted:
+            self._words = sorted(self._postings)
+            self._words_sorted = True
+        words = self._words
+        postings = []
+        position = bisect.bisect_left(words, word)
+        while position < len(words) and words[position].startswith(word):
+            postings.append(self._postings[words[position]])
+            position += 1
+        return postings
+
+    def search(self, query, within = None):
+        """
+        Finds the cards that contain every word of a query.
+
+        The last word matches as a prefix, so results follow the query as
+        it is typed.
+
+        Args:
+            query (str): The text typed by the user.
+            within (array): Optional ordered card IDs to restrict the
+                results to, such as the cards of a category.
+
+        Returns:
+            array: The matching card IDs in ID order, or None if the query
+            has no words.
+        """
+        terms = _terms(query)
+        if not terms:
+            return None
+
+        # Each filter is a list of ordered ID arrays; a card passes if it is
+        # in any of them. Start from the smallest and narrow it down.
+        filters = [self._expand(word, prefix) for word, prefix in terms.items()]
+        if within is not None:
+            filters.append([within])
+        filters.sort(key = lambda postings: sum(map(len, postings)))
+
+        first = filters[0]
+        if not first:
+            return array("I")
+        if len(first) == 1:
+            result = array("I", first[0])
+        else:
+            result = array("I", sorted(set().union(*first)))
+
+        for postings in filters[1:]:
+            if not result:
+                break
+            if len(result) * len(postings) < sum(map(len, postings)):
+                # Few candidates: look each one up in the postings
+                result = array("I", (card_id for card_id in result
+                                     if any(_contains(ids, card_id) for ids in postings)))
+            else:
+                matching = set().union(*postings)
+                result = array("I", (card_id for card_id in result if card_id in matching))
+        return result
+
+    def matches(self, query, front, back):
+        """
+        Returns True if a card with the given text would be found by query.
+        """
+        words = card_words(front, back)
+        for word, prefix in _terms(query).items():
+            if prefix:
+                if not any(card_word.startswith(word) for card_word in words):
+                    return False
+            elif word not in words:
+                return False
+        return True
+
+
+def _terms(query):
+    """
+    Maps each word of a query to True if it matches as a prefix. Only the
+    last word does, unless the query ends with a space.
+    """
+    words = tokenize(query)
+    terms = dict.fromkeys(words, False)
+    if words and len(words[-1]) >= MIN_PREFIX and not query[-1:].isspace():
+        terms[words[-1]] = True
+    return terms
+
+
+class Indexer(threading.Thread):
+    """
+    Builds a SearchIndex on a worker thread.
+    """
+
+    def __init__(self, texts):
+        """
+        Args:
+            texts (iterable): (card ID, front, back) tuples that stay valid
+                while the deck changes, as returned by text_snapshot().
+        """
+        super().__init__(daemon = True)
+        self.texts = texts
+        self.index = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.index = SearchIndex.build(self.texts)
+        except Exception as e:
+            self.error = e
+
+
+def _contains(ids, card_id):
+    """
+    Returns True if an ordered array of IDs holds card_id.
+    """
+    position = bisect.bisect_left(ids, card_id)
+    return position < len(ids) and ids[position] == card_id
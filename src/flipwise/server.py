@@ -0,0 +1,563 @@
+"""
+Serves a deck over HTTP/JSON to many clients at once, e.g. a classroom.
+
+    python -m flipwise serve DECK [--host 127.0.0.1] [--port 8765]
+
+One deck is loaded and shared. Each client opens a session with its own
+category, shuffle order and cursor; edits from every client go through a
+single queue and are applied in batches. Requests and responses are JSON
+objects:
+
+    GET    /categories                  card counts per category
+    GET    /cards/ID                    a card
+    POST   /cards                       add {"front", "back", "category"}; the
+                                        category defaults to "General"
+    PUT    /cards/ID                    edit any of front, back, category
+    DELETE /cards/ID                    delete a card
+    POST   /save                        write the deck file now
+    POST   /sessions                    open {"category", "shuffle"}
+    GET    /sessions/SID                the session and its current card
+    PUT    /sessions/SID                change {"category", "shuffle"}
+    DELETE /sessions/SID                close a session
+    POST   /sessions/SID/next           move on and return the card
+    POST   /sessions/SID/previous       move back and return the card
+
+"shuffle" is true for a random order or an integer seed for a given one.
+Errors come back with a 4xx or 5xx status and {"error": message}.
+"""
+import asyncio
+from http import HTTPStatus
+import json
+import random
+import secrets
+import sys
+import time
+from urllib.parse import urlsplit
+
+from flipwise.engine import Deck
+from flipwise.loader import DEFAULT_CATEGORY
+from flipwise.shuffle import ShuffledView
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Edits applied to the deck in one batch at most
+WRITE_BATCH = 256
+
+# Time the first edit of a batch waits for others to join it, in seconds
+WRITE_DELAY = 0.002
+
+# Sessions unused for this long are closed, in seconds
+SESSION_TIMEOUT = 3600.0
+
+# How often compactions, background saves and idle sessions are checked
+MAINTENANCE_INTERVAL = 0.2
+
+# Largest request head and body accepted, in bytes
+MAX_HEAD = 16 * 1024
+MAX_BODY = 1024 * 1024
+
+# (method, path pattern, handler); "*" matches one path segment, which is
+# passed to the handler
+ROUTES = [
+    ("GET", ("categories",), "list_categories"),
+    ("GET", ("cards", "*"), "get_card"),
+    ("POST", ("cards",), "add_card"),
+    ("PUT", ("cards", "*"), "edit_card"),
+    ("DELETE", ("cards", "*"), "delete_card"),
+    ("POST", ("save",), "save"),
+    ("POST", ("sessions",), "open_session"),
+    ("GET", ("sessions", "*"), "get_session"),
+    ("PUT", ("sessions", "*"), "update_session"),
+    ("DELETE", ("sessions", "*"), "close_session"),
+    ("POST", ("sessions", "*", "next"), "next_card"),
+    ("POST", ("sessions", "*", "previous"), "previous_card"),
+]
+
+
+class HTTPError(Exception):
+    """
+    A request that cannot be served, answered with status and message.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Session:
+    """
+    One client's view of the shared deck: a category, an optional shuffle
+    order and a cursor.
+
+    The view is the live card list kept by the category index, so cards
+    added, edited or deleted by other clients show up at once; a shuffle
+    is a ShuffledView over it and is never copied.
+    """
+
+    def __init__(self, deck, category = "All", seed = None):
+        self.deck = deck
+        self.touched = time.monotonic()
+        self.set_view(category, seed)
+
+    def set_view(self, category, seed = None):
+        """
+        Switches to a category and shuffle seed (None for the deck order)
+        and goes back to the first card.
+        """
+        self.category = category
+        self.seed = seed
+        cards = self.deck.category_index.cards(category)
+        self._view = cards if seed is None else ShuffledView(cards, seed)
+        self.index = 0
+
+    def cards(self):
+        """
+        Returns the ordered card IDs of the session.
+        """
+        # A category emptied and refilled gets a new list from the index
+        cards = self.deck.category_index.cards(self.category)
+        if self.seed is None:
+            self._view = cards
+        elif self._view.cards is not cards:
+            self._view.cards = cards
+        return self._view
+
+    def current(self):
+        """
+        Returns the card ID under the cursor, or None if the view is empty.
+        """
+        cards = self.cards()
+        if not cards:
+            return None
+        self.index = min(self.index, len(cards) - 1)
+        return cards[self.index]
+
+    def move(self, step):
+        """
+        Moves the cursor by step cards, wrapping around, and returns the card.
+        """
+        cards = self.cards()
+        if cards:
+            self.index = (min(self.index, len(cards) - 1) + step) % len(cards)
+        return self.current()
+
+
+class DeckServer:
+    """
+    Serves a Deck over HTTP/1.1 with keep-alive, on one asyncio loop.
+
+    Reads are answered straight from the deck. Edits are queued, and a
+    writer task applies whatever has queued up, up to WRITE_BATCH, inside
+    one Deck.batch(): one journal flush or SQLite transaction per batch
+    instead of per edit. Each request still gets its own result.
+    """
+
+    def __init__(self, deck):
+        """
+        Args:
+            deck (Deck): A deck loaded with autosave, which the server owns
+                from now on.
+        """
+        self.deck = deck
+        self.sessions = {}
+        self.server = None
+        self._writes = asyncio.Queue()
+        self._save_lock = asyncio.Lock()
+        self._tasks = []
+
+    async def start(self, host = DEFAULT_HOST, port = DEFAULT_PORT):
+        """
+        Starts listening, and the writer and maintenance tasks.
+
+        Returns:
+            tuple: (host, port) listened on; port 0 picks a free port.
+        """
+        self.server = await asyncio.start_server(self._handle, host, port, limit = MAX_HEAD)
+        self._tasks = [asyncio.create_task(self._write_loop()), asyncio.create_task(self._maintain())]
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        """
+        Stops listening and applies the edits still queued.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions = True)
+        self._apply_batch(self._drain([]))
+
+    # HTTP
+
+    async def _handle(self, reader, writer):
+        """
+        Answers the requests of one connection until it closes.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, {"error": "request head too large"}, False)
+                    break
+
+                try:
+                    method, path, headers, keep_alive = parse_head(head)
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}, False)
+                    break
+                if "transfer-encoding" in headers:
+                    self._respond(writer, HTTPStatus.LENGTH_REQUIRED, {"error": "send a Content-Length"}, False)
+                    break
+                if length > MAX_BODY:
+                    self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"}, False)
+                    break
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, payload = await self.dispatch(method, path, body)
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii = False).encode("utf-8")
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json; charset=utf-8\r\nContent-Length: {len(data)}\r\n"
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        writer.write(head.encode("latin-1") + b"\r\n" + data)
+
+    async def dispatch(self, method, path, body):
+        """
+        Runs one request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path, e.g. "/sessions/abc/next".
+            body (bytes): A JSON object, or empty.
+
+        Returns:
+            tuple: (HTTPStatus, payload to send as JSON)
+        """
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "the body must be a JSON object")
+            handler, args = self._route(method, [part for part in path.split("/") if part])
+            return HTTPStatus.OK, await handler(data, *args)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    def _route(self, method, parts):
+        path_found = False
+        for route_method, pattern, name in ROUTES:
+            if len(pattern) != len(parts) or any(segment not in ("*", part) for segment, part in zip(pattern, parts)):
+                continue
+            if route_method == method:
+                return getattr(self, name), [part for segment, part in zip(pattern, parts) if segment == "*"]
+            path_found = True
+        if path_found:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "no such resource")
+
+    # Cards
+
+    async def list_categories(self, data):
+        index = self.deck.category_index
+        return {
+            "cards": len(self.deck.flashcards),
+            "categories": [{"name": name, "count": index.count(name)} for name in ["All"] + index.categories()],
+        }
+
+    async def get_card(self, data, card_id):
+        return self.card(self._card_id(card_id))
+
+    async def add_card(self, data):
+        # A card without a category is filed under the default one, as in deck files and the window
+        category = data.get("category")
+        if category is None or isinstance(category, str) and not category.strip():
+            data = dict(data, category = DEFAULT_CATEGORY)
+        fields = card_fields(data, ("front", "back", "category"))
+        card_id = await self.write("add", fields["front"], fields["back"], fields["category"])
+        return self.card(card_id)
+
+    async def edit_card(self, data, card_id):
+        fields = card_fields(data, [name for name in ("front", "back", "category") if name in data])
+        card_id = await self.write("edit", self._card_id(card_id), fields)
+        return self.card(card_id)
+
+    async def delete_card(self, data, card_id):
+        await self.write("delete", self._card_id(card_id))
+        return {"deleted": int(card_id)}
+
+    async def save(self, data):
+        # Queued like an edit, so the file holds every edit sent before
+        await self.write("sync")
+        async with self._save_lock:
+            deck = self.deck
+            # A compaction writes the deck file too; let it finish first
+            # without holding up other requests
+            while True:
+                done, error = deck.finish_compaction()
+                if error is not None:
+                    print(f"autosave: error compacting the journal: {error}", file = sys.stderr)
+                if done:
+                    break
+                await asyncio.sleep(MAINTENANCE_INTERVAL / 4)
+            count = len(deck.flashcards)
+            if deck.start_saving(deck.deck_path):
+                while True:
+                    done, error = deck.finish_saving()
+                    if done:
+                        break
+                    await asyncio.sleep(MAINTENANCE_INTERVAL / 4)
+                if error is not None:
+                    raise error
+            return {"saved": count, "path": deck.deck_path}
+
+    def card(self, card_id):
+        """
+        Returns a card as a JSON object, or None for None.
+        """
+        if card_id is None:
+            return None
+        store = self.deck.flashcards
+        return {"id": card_id, "front": store.front(card_id), "back": store.back(card_id), "category": store.category(card_id)}
+
+    def _card_id(self, text):
+        try:
+            card_id = int(text)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"not a card ID: {text}") from None
+        store = self.deck.flashcards
+        if not 0 <= card_id < store.slots or not store.is_alive(card_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no card {card_id}")
+        return card_id
+
+    # Sessions
+
+    async def open_session(self, data):
+        session_id = secrets.token_urlsafe(12)
+        self.sessions[session_id] = Session(self.deck, *self._view_args(data))
+        return self.session_state(session_id)
+
+    async def get_session(self, data, session_id):
+        return self.session_state(session_id)
+
+    async def update_session(self, data, session_id):
+        session = self._session(session_id)
+        category, seed = self._view_args(data, session)
+        session.set_view(category, seed)
+        return self.session_state(session_id)
+
+    async def close_session(self, data, session_id):
+        self._session(session_id)
+        del self.sessions[session_id]
+        return {"closed": session_id}
+
+    async def next_card(self, data, session_id):
+        self._session(session_id).move(1)
+        return self.session_state(session_id)
+
+    async def previous_card(self, data, session_id):
+        self._session(session_id).move(-1)
+        return self.session_state(session_id)
+
+    def session_state(self, session_id):
+        """
+        Returns a session and its current card as a JSON object.
+        """
+        session = self._session(session_id)
+        card_id = session.current()
+        return {
+            "session": session_id,
+            "category": session.category,
+            "shuffle": session.seed,
+            "position": session.index if card_id is not None else None,
+            "count": len(session.cards()),
+            "card": self.card(card_id),
+        }
+
+    def _session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no session {session_id}")
+        session.touched = time.monotonic()
+        return session
+
+    def _view_args(self, data, session = None):
+        """
+        Returns (category, shuffle seed) from a request, defaulting to the
+        session's current view.
+        """
+        category = data.get("category", session.category if session is not None else "All")
+        if not isinstance(category, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "category must be a string")
+        shuffle = data.get("shuffle", session.seed if session is not None else None)
+        if shuffle is True:
+            shuffle = random.getrandbits(64)
+        elif shuffle is False:
+            shuffle = None
+        elif shuffle is not None and not isinstance(shuffle, int):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "shuffle must be true, false or an integer seed")
+        return category, shuffle
+
+    # Batched edits
+
+    async def write(self, method, *args):
+        """
+        Queues an edit and waits for the batch it joins to be applied.
+
+        Args:
+            method (str): "add", "edit", "delete" or "sync" (no change).
+
+        Returns:
+            What the edit returned.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((future, method, args))
+        return await future
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._writes.get()]
+            # Let the edits of requests arriving meanwhile join the batch
+            await asyncio.sleep(WRITE_DELAY)
+            self._apply_batch(self._drain(batch))
+
+    def _drain(self, batch):
+        while len(batch) < WRITE_BATCH and not self._writes.empty():
+            batch.append(self._writes.get_nowait())
+        return batch
+
+    def _apply_batch(self, batch):
+        """
+        Applies queued edits in order, in one Deck.batch(), and hands each
+        its result or error.
+        """
+        if not batch:
+            return
+        with self.deck.batch():
+            for future, method, args in batch:
+                try:
+                    result = getattr(self, "_apply_" + method)(*args)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+
+    def _apply_add(self, front, back, category):
+        card_id, _created = self.deck.add(front, back, category)
+        return card_id
+
+    def _apply_edit(self, card_id, fields):
+        store = self.deck.flashcards
+        # The card may have been deleted by an edit queued before this one
+        if not store.is_alive(card_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no card {card_id}")
+        self.deck.edit(card_id, fields.get("front", store.front(card_id)), fields.get("back", store.back(card_id)),
+                       fields.get("category", store.category(card_id)))
+        return card_id
+
+    def _apply_delete(self, card_id):
+        if not self.deck.flashcards.is_alive(card_id):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no card {card_id}")
+        self.deck.delete(card_id)
+        return card_id
+
+    def _apply_sync(self):
+        return None
+
+    async def _maintain(self):
+        """
+        Finishes journal compactions and closes idle sessions.
+        """
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            _done, error = self.deck.finish_compaction()
+            if error is not None:
+                print(f"autosave: error compacting the journal: {error}", file = sys.stderr)
+            idle = time.monotonic() - SESSION_TIMEOUT
+            for session_id in [session_id for session_id, session in self.sessions.items() if session.touched < idle]:
+                del self.sessions[session_id]
+
+
+def parse_head(head):
+    """
+    Parses the request line and headers of an HTTP/1.x request.
+
+    Returns:
+        tuple: (method, path, {lowercase header name: value}, keep-alive)
+
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ")
+    if not version.startswith("HTTP/1."):
+        raise ValueError(version)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+    return method, urlsplit(target).path, headers, keep_alive
+
+
+def card_fields(data, names):
+    """
+    Returns the named card fields of a request, which must be non-empty
+    strings.
+    """
+    fields = {}
+    for name in names:
+        value = data.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a non-empty string")
+        fields[name] = value
+    return fields
+
+
+def serve(deck_path, host = DEFAULT_HOST, port = DEFAULT_PORT):
+    """
+    Loads a deck, with autosave, and serves it until interrupted.
+    """
+    deck = Deck.load(deck_path, autosave = True)
+
+    async def run():
+        server = DeckServer(deck)
+        address = await server.start(host, port)
+        print(f"Serving {deck_path} ({len(deck.flashcards)} cards) on http://{address[0]}:{address[1]}", flush = True)
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        deck.close()
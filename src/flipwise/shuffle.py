@@ -0,0 +1,136 @@
+import bisect
+import random
+
+# Feistel rounds; four are enough to scatter neighbouring positions
+ROUNDS = 4
+
+# Odd 64-bit multiplier of the round function (Fibonacci hashing)
+MULTIPLIER = 0x9E3779B97F4A7C15
+WORD = (1 << 64) - 1
+
+
+class Permutation:
+    """
+    A seeded random permutation of range(size), computed one position at
+    a time.
+
+    Positions are run through a Feistel network over the smallest power of
+    four that holds size, and walked again while they land past the end
+    (cycle walking), so nothing is stored per position: looking up either
+    direction takes a few multiplications, and the size can change without
+    recomputing anything. Growing past the power of four, or shrinking
+    below a quarter of it, changes the order: the walk takes fewer than
+    four steps on average only while the size fills a quarter of it.
+    """
+
+    def __init__(self, size, seed):
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(64) for _ in range(ROUNDS)]
+        self._half = 0
+        self.size = 0
+        self.resize(size)
+
+    def resize(self, size):
+        """
+        Changes the number of positions permuted.
+        """
+        self.size = size
+        needed = max(1, ((size - 1).bit_length() + 1) // 2)
+        if needed > self._half or size < 1 << (2 * self._half - 2):
+            self._half = needed
+            self._mask = (1 << needed) - 1
+
+    def __getitem__(self, position):
+        """
+        Returns where a position of the shuffled order comes from.
+        """
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        while True:
+            position = self._encrypt(position)
+            if position < self.size:
+                return position
+
+    def index(self, source):
+        """
+        Returns the shuffled position of a position of the original order.
+        """
+        if not 0 <= source < self.size:
+            raise ValueError(source)
+        while True:
+            source = self._decrypt(source)
+            if source < self.size:
+                return source
+
+    def _encrypt(self, value):
+        half, mask = self._half, self._mask
+        left, right = value >> half, value & mask
+        for key in self._keys:
+            left, right = right, left ^ ((((right ^ key) * MULTIPLIER) & WORD) >> 40 & mask)
+        return (left << half) | right
+
+    def _decrypt(self, value):
+        half, mask = self._half, self._mask
+        left, right = value >> half, value & mask
+        for key in reversed(self._keys):
+            left, right = right ^ ((((left ^ key) * MULTIPLIER) & WORD) >> 40 & mask), left
+        return (left << half) | right
+
+
+class ShuffledView:
+    """
+    The cards of a view in a seeded random order, without copying them.
+
+    cards is an ordered sequence of card IDs, either a live view of the
+    category index or a search result, and may change underneath: the
+    permutation follows its length on every lookup. Adding a card only
+    moves the few positions whose walk passed through the new slot.
+    """
+
+    def __init__(self, cards, seed):
+        """
+        Args:
+            cards (array): Card IDs in ascending order.
+            seed (int): The same seed gives the same order.
+        """
+        self.cards = cards
+        self.seed = seed
+        self._permutation = Permutation(len(cards), seed)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def _sync(self):
+        size = len(self.cards)
+        if size != self._permutation.size:
+            self._permutation.resize(size)
+        return self._permutation
+
+    def __getitem__(self, position):
+        """
+        Returns the card ID at a position of the shuffled order.
+        """
+        return self.cards[self._sync()[position]]
+
+    def __iter__(self):
+        for position in range(len(self.cards)):
+            yield self[position]
+
+    def source(self, position):
+        """
+        Returns the position in cards of a position of the shuffled order.
+        """
+        return self._sync()[position]
+
+    def index(self, card_id):
+        """
+        Returns the shuffled position of a card.
+
+        Raises:
+            ValueError: If the card is not in the view.
+        """
+        cards = self.cards
+        source = bisect.bisect_left(cards, card_id)
+        if source == len(cards) or cards[source] != card_id:
+            raise ValueError(card_id)
+        return self._sync().index(source)
@@ -0,0 +1,342 @@
+from array import array
+import sys
+
+
+class CardStore:
+    """
+    Column-oriented storage for flashcards.
+
+    Cards are addressed by integer IDs that never change while the store
+    is alive. The front and back of every card are stored as UTF-8 in one
+    contiguous buffer with offsets, and categories are interned so each
+    card only keeps a small integer category ID. Deleted cards leave a
+    tombstone behind so the IDs of the other cards stay valid.
+    """
+
+    def __init__(self, cards = ()):
+        """
+        Args:
+            cards (iterable): Optional flashcard dicts to add.
+        """
+        # Counts the clears: card IDs are handed out from zero again after each
+        self.generation = 0
+        self._reset()
+        self.extend(cards)
+
+    def _reset(self):
+        """
+        Empties every column.
+        """
+        self._text = bytearray()
+        self._start = array("Q")
+        self._front_len = array("I")
+        self._back_len = array("I")
+        self._category = array("I")
+        self._alive = bytearray()
+        self._live = 0
+        self._garbage = 0
+
+        self._categories = []
+        self._category_ids = {}
+
+    def __len__(self):
+        """
+        Returns the number of cards that have not been deleted.
+        """
+        return self._live
+
+    def __iter__(self):
+        """
+        Iterates over the IDs of the cards that have not been deleted.
+        """
+        if self._live == len(self._alive):
+            return iter(range(len(self._alive)))
+        return (card_id for card_id, alive in enumerate(self._alive) if alive)
+
+    @property
+    def slots(self):
+        """
+        Returns the number of IDs handed out so far, deleted cards included.
+        """
+        return len(self._alive)
+
+    def intern(self, category):
+        """
+        Returns the ID of a category name, registering it if needed.
+        """
+        category_id = self._category_ids.get(category)
+        if category_id is None:
+            category_id = len(self._categories)
+            self._categories.append(category)
+            self._category_ids[category] = category_id
+        return category_id
+
+    def category_name(self, category_id):
+        """
+        Returns the category name for an interned category ID.
+        """
+        return self._categories[category_id]
+
+    def category_names(self):
+        """
+        Returns every category name that was ever interned.
+        """
+        return list(self._categories)
+
+    def add(self, front, back, category):
+        """
+        Adds a flashcard to the store.
+
+        Returns:
+            int: The ID of the new card.
+        """
+        front_bytes = front.encode("utf-8")
+        back_bytes = back.encode("utf-8")
+        card_id = len(self._alive)
+
+        self._start.append(len(self._text))
+        self._front_len.append(len(front_bytes))
+        self._back_len.append(len(back_bytes))
+        self._text += front_bytes
+        self._text += back_bytes
+        self._category.append(self.intern(category))
+        self._alive.append(1)
+        self._live += 1
+        return card_id
+
+    def extend(self, cards):
+        """
+        Adds many flashcard dicts at once.
+
+        Returns:
+            range: The IDs of the new cards.
+        """
+        first = len(self._alive)
+        add = self.add
+        for card in cards:
+            add(card["front"], card["back"], card["category"])
+        return range(first, len(self._alive))
+
+    def load_batch(self, cards):
+        """
+        Adds a batch of cards parsed by a DeckLoader.
+
+        Returns:
+            range: The IDs of the new cards.
+        """
+        return self.extend(cards)
+
+    def append_store(self, other, keep_deleted = True):
+        """
+        Adds every card of another CardStore, copying its columns instead
+        of decoding and re-encoding each card.
+
+        Args:
+            other (CardStore): The cards to add.
+            keep_deleted (bool): Deleted cards of the other store come along
+                as deleted cards, or with False are left out, so the new
+                IDs follow each other like those of cards added one by one.
+
+        Returns:
+            range: The IDs of the new cards.
+        """
+        first = len(self._alive)
+        offset = len(self._text)
+        self._text += other._text
+        self._garbage += other._garbage
+        categories = [self.intern(name) for name in other._categories]
+        if keep_deleted or other._live == len(other._alive):
+            self._start.extend(start + offset for start in other._start)
+            self._front_len.extend(other._front_len)
+            self._back_len.extend(other._back_len)
+            self._category.extend(categories[category] for category in other._category)
+            self._alive += other._alive
+        else:
+            live = [card_id for card_id, alive in enumerate(other._alive) if alive]
+            self._start.extend(other._start[card_id] + offset for card_id in live)
+            self._front_len.extend(other._front_len[card_id] for card_id in live)
+            self._back_len.extend(other._back_len[card_id] for card_id in live)
+            self._category.extend(categories[other._category[card_id]] for card_id in live)
+            self._alive += bytes([1]) * len(live)
+            # The text of the deleted cards is copied along as garbage
+            self._garbage += sum(other._front_len[card_id] + other._back_len[card_id]
+                                 for card_id, alive in enumerate(other._alive) if not alive)
+        self._live += other._live
+        return range(first, len(self._alive))
+
+    def is_alive(self, card_id):
+        """
+        Returns True if the card exists and has not been deleted.
+        """
+        return 0 <= card_id < len(self._alive) and self._alive[card_id] == 1
+
+    def front(self, card_id):
+        """
+        Returns the front text of a card.
+        """
+        start = self._start[card_id]
+        return self._text[start:start + self._front_len[card_id]].decode("utf-8")
+
+    def back(self, card_id):
+        """
+        Returns the back text of a card.
+        """
+        start = self._start[card_id] + self._front_len[card_id]
+        return self._text[start:start + self._back_len[card_id]].decode("utf-8")
+
+    def category(self, card_id):
+        """
+        Returns the category name of a card.
+        """
+        return self._categories[self._category[card_id]]
+
+    def category_id(self, card_id):
+        """
+        Returns the interned category ID of a card.
+        """
+        return self._category[card_id]
+
+    def card(self, card_id):
+        """
+        Returns a card as a {"front", "back", "category"} dict.
+        """
+        return {"front": self.front(card_id), "back": self.back(card_id), "category": self.category(card_id)}
+
+    def cards(self):
+        """
+        Iterates over every live card as a dict, in ID order.
+        """
+        for card_id in self:
+            yield self.card(card_id)
+
+    def texts(self):
+        """
+        Iterates over (card ID, front, back) for every live card, in ID order.
+        """
+        for card_id in self:
+            yield card_id, self.front(card_id), self.back(card_id)
+
+    def text_snapshot(self):
+        """
+        Returns texts() of the deck as it is now, safe to read on another
+        thread while the store keeps changing.
+        """
+        return self.copy().texts()
+
+    def card_snapshot(self):
+        """
+        Like text_snapshot(), with the category: iterates over (card ID,
+        front, back, category) of the deck as it is now.
+        """
+        snapshot = self.copy()
+        return ((card_id, front, back, snapshot.category(card_id)) for card_id, front, back in snapshot.texts())
+
+    def update(self, card_id, front, back, category):
+        """
+        Replaces the contents of a card, keeping its ID.
+
+        The new text is appended to the buffer; the old text is reclaimed
+        by compact() once enough of the buffer is unused.
+        """
+        if not self.is_alive(card_id):
+            raise KeyError(card_id)
+        front_bytes = front.encode("utf-8")
+        back_bytes = back.encode("utf-8")
+
+        self._garbage += self._front_len[card_id] + self._back_len[card_id]
+        self._start[card_id] = len(self._text)
+        self._front_len[card_id] = len(front_bytes)
+        self._back_len[card_id] = len(back_bytes)
+        self._text += front_bytes
+        self._text += back_bytes
+        self._category[card_id] = self.intern(category)
+        self._maybe_compact()
+
+    def remove(self, card_id):
+        """
+        Deletes a card. Its ID is not reused.
+        """
+        if not self.is_alive(card_id):
+            raise KeyError(card_id)
+        self._alive[card_id] = 0
+        self._live -= 1
+        self._garbage += self._front_len[card_id] + self._back_len[card_id]
+        self._maybe_compact()
+
+    def clear(self):
+        """
+        Deletes every card and releases the buffers.
+        """
+        self._reset()
+        self.generation += 1
+
+    def take(self):
+        """
+        Deletes every card like clear() and returns them, under the same
+        IDs, as a new CardStore. The buffers are handed over, not copied.
+        """
+        taken = CardStore()
+        vars(taken).update(vars(self))
+        self._reset()
+        self.generation += 1
+        return taken
+
+    def copy(self):
+        """
+        Returns an independent copy of the store with the same card IDs.
+
+        The columns are copied as whole buffers, so this is fast enough to
+        take a snapshot for a background thread.
+        """
+        clone = CardStore()
+        clone._text = bytearray(self._text)
+        clone._start = array("Q", self._start)
+        clone._front_len = array("I", self._front_len)
+        clone._back_len = array("I", self._back_len)
+        clone._category = array("I", self._category)
+        clone._alive = bytearray(self._alive)
+        clone._live = self._live
+        clone._garbage = self._garbage
+        clone._categories = list(self._categories)
+        clone._category_ids = dict(self._category_ids)
+        return clone
+
+    def _maybe_compact(self):
+        """
+        Compacts the text buffer when more than half of it is unused.
+        """
+        if self._garbage > 4096 and self._garbage * 2 > len(self._text):
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the text buffer without the text of deleted or edited cards.
+        Card IDs are not affected.
+        """
+        text = bytearray()
+        for card_id in range(len(self._alive)):
+            start = self._start[card_id]
+            end = start + self._front_len[card_id] + self._back_len[card_id]
+            self._start[card_id] = len(text)
+            if self._alive[card_id]:
+                text += self._text[start:end]
+            else:
+                self._front_len[card_id] = 0
+                self._back_len[card_id] = 0
+        self._text = text
+        self._garbage = 0
+
+    def close(self):
+        """
+        Releases any resources held by the store.
+        """
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the store, in bytes.
+        """
+        columns = (self._text, self._start, self._front_len, self._back_len, self._category, self._alive)
+        total = sum(sys.getsizeof(column) for column in columns)
+        total += sys.getsizeof(self._categories) + sys.getsizeof(self._category_ids)
+        total += sum(sys.getsizeof(name) for name in self._categories)
+        return total
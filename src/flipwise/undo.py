@@ -0,0 +1,140 @@
+import collections
+import contextlib
+import sys
+import weakref
+
+# Edits that can be undone; older ones are forgotten
+UNDO_LEVELS = 200
+
+# The changes kept by an UndoLog. Each one is what it takes to revert an
+# edit, and reverting it yields the change that reverts that in turn.
+# Removal: delete a card (reverts an add).
+Removal = collections.namedtuple("Removal", "ref")
+# Insertion: add a deleted card back, with its scheduling state or None.
+Insertion = collections.namedtuple("Insertion", "ref card state")
+# Rewrite: give a card back its contents (reverts an edit).
+Rewrite = collections.namedtuple("Rewrite", "ref card")
+# Refill: add back the cards of a cleared CardStore, with their scheduling
+# state; refs are the CardRefs of those cards, by their old ID.
+Refill = collections.namedtuple("Refill", "store scheduler refs")
+# Clearing: delete every card (reverts a Refill).
+Clearing = collections.namedtuple("Clearing", "")
+
+# What reverting a change did to the categories, for a window to follow:
+# emptied lists (category, position it had) for the categories left without
+# cards and created the new ones. rebuilt is True when every card was
+# replaced, by a clear or its undo, and the categories must be read again.
+Reverted = collections.namedtuple("Reverted", "emptied created rebuilt")
+
+
+class CardRef:
+    """
+    Names a card in the undo log.
+
+    A deleted card that comes back gets a new ID. Every change naming the
+    card holds the same CardRef, so pointing it at the new ID keeps the
+    whole log valid without rewriting it.
+    """
+
+    __slots__ = ("card_id", "__weakref__")
+
+    def __init__(self, card_id):
+        self.card_id = card_id
+
+
+class UndoLog:
+    """
+    The undo and redo stacks of a deck, kept as a log of changes.
+
+    Each change records only what its edit touched: a card's old contents,
+    a deleted card, or for a clear the emptied CardStore itself, which is
+    handed over rather than copied. Taking and reverting a change therefore
+    costs time and memory in proportion to the edit, not to the deck.
+    Deck.undo() and Deck.redo() apply the changes.
+    """
+
+    def __init__(self, levels = UNDO_LEVELS):
+        """
+        Args:
+            levels (int): Edits kept for undo; older ones are dropped.
+        """
+        self.undo_stack = collections.deque(maxlen = levels)
+        self.redo_stack = []
+        self.paused = False
+        # CardRefs still named by a change, by card ID
+        self._refs = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        """
+        Returns the number of edits that can be undone.
+        """
+        return len(self.undo_stack)
+
+    def ref(self, card_id):
+        """
+        Returns the CardRef of a card, shared with the changes naming it.
+        """
+        ref = self._refs.get(card_id)
+        if ref is None:
+            ref = self._refs[card_id] = CardRef(card_id)
+        return ref
+
+    def move(self, ref, card_id):
+        """
+        Points a CardRef at the new ID of a card that came back.
+        """
+        if self._refs.get(ref.card_id) is ref:
+            del self._refs[ref.card_id]
+        ref.card_id = card_id
+        self._refs[card_id] = ref
+
+    def take_refs(self):
+        """
+        Returns the CardRefs of every card and forgets them, for a clear:
+        a cleared store hands out IDs from zero again.
+        """
+        refs = dict(self._refs)
+        self._refs.clear()
+        return refs
+
+    def record(self, change):
+        """
+        Adds the change that reverts a new edit. Anything undone before can
+        no longer be redone.
+        """
+        if self.paused:
+            return
+        self.undo_stack.append(change)
+        self.redo_stack.clear()
+
+    @contextlib.contextmanager
+    def pause(self):
+        """
+        Records nothing inside the block, e.g. while a change is applied.
+        """
+        paused = self.paused
+        self.paused = True
+        try:
+            yield
+        finally:
+            self.paused = paused
+
+    def clear(self):
+        """
+        Forgets every change, e.g. after an edit that cannot be undone.
+        """
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._refs.clear()
+
+    def nbytes(self):
+        """
+        Returns the approximate memory held by the changes, in bytes.
+        """
+        total = 0
+        for change in list(self.undo_stack) + self.redo_stack:
+            if isinstance(change, Refill):
+                total += change.store.nbytes() + change.scheduler.nbytes() + sys.getsizeof(change.refs)
+            elif isinstance(change, (Insertion, Rewrite)):
+                total += sum(sys.getsizeof(value) for value in change.card.values()) + sys.getsizeof(change.card)
+        return total
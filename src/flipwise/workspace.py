@@ -0,0 +1,353 @@
+import collections
+import os
+import threading
+
+from flipwise.deckdb import SqliteCardStore
+from flipwise.engine import Deck
+from flipwise.search import SearchIndex
+
+# Memory the cached decks may use together with the deck on display
+MEMORY_BUDGET = 512 * 2**20
+
+# Where a deck was left: restored when an evicted deck is read again
+ViewState = collections.namedtuple("ViewState", "category index shuffle_seed")
+
+CachedDeck = collections.namedtuple("CachedDeck", "deck stamp nbytes")
+
+
+def file_stamp(file_path):
+    """
+    Returns (modification time, size) of a file, or None if it is gone.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Prefetcher(threading.Thread):
+    """
+    Reads a deck file into a new Deck on a worker thread.
+
+    For a JSON or CSV deck the worker also replays the journal in memory
+    and builds the search index, so the deck is ready to show once it is
+    done. The worker only reads: the journal is opened by finish(), once
+    the deck is shown, so a deck read ahead and dropped leaves its files as
+    they were. A .flipwise deck keeps its SQLite connection on the thread
+    that created it, so finish() restores its scheduling state on that
+    thread and the search index is left to Deck.start_indexing().
+    """
+
+    def __init__(self, file_path):
+        super().__init__(daemon = True)
+        self.file_path = file_path
+        # Created here: a .flipwise deck's connection belongs to this thread
+        self.deck = Deck.for_file(file_path)
+        self.stamp = None
+        self.nbytes = None
+        self.replayed = None
+        self.error = None
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Asks the worker to stop after the current batch.
+        """
+        self.cancelled.set()
+
+    def run(self):
+        deck = self.deck
+        try:
+            # Taken first, so a file changed while it is read counts as changed
+            stamp = file_stamp(self.file_path)
+            if not deck.read_file(self.file_path, self.cancelled):
+                return
+            if not isinstance(deck.flashcards, SqliteCardStore):
+                self.replayed = deck.restore_state(self.file_path)
+                deck.search_index = SearchIndex.build(deck.flashcards.texts())
+            self.nbytes = deck.nbytes()
+            self.stamp = stamp
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        """
+        Completes the deck on the calling thread once the worker is done,
+        and starts journaling its edits.
+
+        Returns:
+            Deck: The deck, ready to show.
+        """
+        if isinstance(self.deck.flashcards, SqliteCardStore):
+            self.deck.finish_loading(self.file_path)
+        else:
+            self.deck.start_journal(self.file_path, self.replayed)
+        return self.deck
+
+
+class Workspace:
+    """
+    A list of deck files to switch between, and a cache of the decks read
+    from them.
+
+    Switching back to a cached deck is instant: it comes back as it was
+    left, with its category, cursor, shuffle, search index and journal.
+    Cached decks are evicted least recently used first once they use more
+    than the memory budget together with the deck on display; the view of
+    an evicted deck is remembered and restored when it is read again. A
+    deck whose file changed on disk since it was cached is read again.
+
+    The deck after the one on display is read ahead on a worker thread;
+    see prefetch_next(). Everything else runs on the calling thread, which
+    must be the one that uses the decks.
+    """
+
+    def __init__(self, budget = MEMORY_BUDGET):
+        """
+        Args:
+            budget (int): Bytes the decks may use, as told by Deck.nbytes().
+        """
+        self.budget = budget
+        self.paths = []
+        self.active = None
+        self.active_path = None
+        # Size of the deck on display when it was shown, and whether it had a search index then
+        self._active_bytes = 0
+        self._active_indexed = False
+        self._cache = collections.OrderedDict()
+        self._loads = {}
+        self._abandoned = []
+        self._views = {}
+
+    def add(self, file_path):
+        """
+        Adds a deck file to the list.
+
+        Returns:
+            str: The absolute path the deck is known by.
+        """
+        file_path = os.path.abspath(file_path)
+        if file_path not in self.paths:
+            self.paths.append(file_path)
+        return file_path
+
+    def remove(self, file_path):
+        """
+        Takes a deck off the list and closes it. The deck on display is
+        left open and becomes the caller's to close.
+        """
+        self.paths.remove(file_path)
+        self._views.pop(file_path, None)
+        if file_path == self.active_path:
+            self.active = self.active_path = None
+        self._discard(file_path)
+
+    def next_path(self, file_path = None):
+        """
+        Returns the deck listed after file_path, wrapping around, or the
+        first deck if file_path is not listed. None if there is no other.
+        """
+        paths = [path for path in self.paths if path != file_path]
+        if not paths:
+            return None
+        if file_path not in self.paths:
+            return paths[0]
+        position = self.paths.index(file_path)
+        return self.paths[(position + 1) % len(self.paths)]
+
+    def is_cached(self, file_path):
+        """
+        Returns True if a deck is on display or cached.
+        """
+        return file_path == self.active_path or file_path in self._cache
+
+    def is_loading(self, file_path):
+        """
+        Returns True while a deck is being read ahead.
+        """
+        load = self._loads.get(file_path)
+        return load is not None and load.is_alive()
+
+    def take(self, file_path):
+        """
+        Shows a deck if that can be done now: it is on display already, is
+        cached and unchanged on disk, or has been read ahead. The deck on
+        display before goes back to the cache.
+
+        Returns:
+            Deck: The deck, or None if it must be read first.
+
+        Raises:
+            Exception: Whatever stopped the deck from being read ahead.
+        """
+        if file_path == self.active_path:
+            return self.active
+        entry = self._cache.pop(file_path, None)
+        if entry is not None:
+            if entry.stamp == file_stamp(file_path):
+                return self._activate(file_path, entry.deck, entry.nbytes)
+            # Changed on disk since it was cached
+            entry.deck.close()
+
+        load = self._loads.get(file_path)
+        if load is None or load.is_alive():
+            return None
+        del self._loads[file_path]
+        if load.error is not None:
+            load.deck.close()
+            raise load.error
+        if load.stamp != file_stamp(file_path):
+            load.deck.close()
+            return None
+        deck = load.finish()
+        self.restore_view(file_path, deck)
+        return self._activate(file_path, deck, load.nbytes)
+
+    def adopt(self, file_path, deck):
+        """
+        Shows a deck that was read by the caller, e.g. with a DeckLoader,
+        and restores the view it was left with. The deck on display before
+        goes back to the cache.
+        """
+        file_path = self.add(file_path)
+        self._discard(file_path)
+        self.restore_view(file_path, deck)
+        self._activate(file_path, deck)
+
+    def release(self):
+        """
+        Moves the deck on display to the cache, e.g. before another deck
+        replaces it. It keeps journaling edits; its background save and
+        compaction are finished first so its file no longer changes.
+        """
+        deck, file_path = self.active, self.active_path
+        if deck is None:
+            return
+        # Measuring walks the search index, so the size taken when the deck
+        # was shown is kept unless its index has been built since
+        nbytes = self._active_bytes
+        if self._active_indexed != (deck.search_index is not None):
+            nbytes = deck.nbytes()
+        self.active = self.active_path = None
+        self._active_bytes = 0
+        if deck.saver is not None:
+            deck.saver.join()
+            deck.finish_saving()
+        if deck.is_compacting():
+            deck.journal.compactor.join()
+            deck.finish_compaction()
+        if deck.history is not None:
+            deck.history.flush()
+        # Saving under a new name moves the deck to that file
+        if deck.deck_path is not None and os.path.abspath(deck.deck_path) != file_path:
+            file_path = self.add(deck.deck_path)
+        self._views[file_path] = ViewState(deck.current_category, deck.current_index,
+                                           deck.shuffle_seed if deck.is_shuffle_mode else None)
+        self._cache[file_path] = CachedDeck(deck, file_stamp(file_path), nbytes)
+        self._evict()
+
+    def restore_view(self, file_path, deck):
+        """
+        Puts a freshly read deck back at the category, shuffle and cursor
+        it was left with, if it was shown before.
+        """
+        view = self._views.get(file_path)
+        if view is None:
+            return
+        if view.category == "All" or deck.category_index.count(view.category):
+            deck.switch_category(view.category)
+        if view.shuffle_seed is not None:
+            deck.toggle_shuffle_mode(view.shuffle_seed)
+        if deck.filtered_cards:
+            deck.current_index = min(view.index, len(deck.filtered_cards) - 1)
+
+    def prefetch(self, file_path):
+        """
+        Starts reading a deck on a worker thread, unless it is cached or
+        already being read.
+
+        Raises:
+            ValueError: If the file is not a deck.
+        """
+        if self.is_cached(file_path) or file_path in self._loads or not os.path.exists(file_path):
+            return
+        load = Prefetcher(file_path)
+        self._loads[file_path] = load
+        load.start()
+
+    def prefetch_next(self):
+        """
+        Reads ahead the deck listed after the one on display, while the
+        decks stay within the budget. A deck read ahead but never shown is
+        dropped when another one is read, so at most one is held.
+        """
+        target = self.next_path(self.active_path)
+        for file_path, load in list(self._loads.items()):
+            if file_path != target and not load.is_alive():
+                self._discard(file_path)
+        self._sweep()
+        if target is None or any(load.is_alive() for load in self._loads.values()):
+            return
+        if self._used() >= self.budget:
+            return
+        try:
+            self.prefetch(target)
+        except ValueError:
+            pass
+
+    def close(self):
+        """
+        Stops reading ahead and closes every deck, the one on display included.
+        """
+        loads = list(self._loads.values()) + self._abandoned
+        self._loads = {}
+        self._abandoned = []
+        for load in loads:
+            load.cancel()
+        for load in loads:
+            load.join()
+            load.deck.close()
+        for entry in self._cache.values():
+            entry.deck.close()
+        self._cache.clear()
+        if self.active is not None:
+            self.active.close()
+            self.active = self.active_path = None
+
+    def _activate(self, file_path, deck, nbytes = None):
+        self.release()
+        self.active, self.active_path = deck, file_path
+        self._active_bytes = deck.nbytes() if nbytes is None else nbytes
+        self._active_indexed = deck.search_index is not None
+        self._evict()
+        return deck
+
+    def _used(self):
+        return self._active_bytes + sum(entry.nbytes for entry in self._cache.values())
+
+    def _evict(self):
+        used = self._used()
+        while self._cache and used > self.budget:
+            _file_path, entry = self._cache.popitem(last = False)
+            entry.deck.close()
+            used -= entry.nbytes
+
+    def _discard(self, file_path):
+        """
+        Closes the cached copy of a deck and stops reading it ahead.
+        """
+        entry = self._cache.pop(file_path, None)
+        if entry is not None:
+            entry.deck.close()
+        load = self._loads.pop(file_path, None)
+        if load is not None:
+            # Its deck is closed once the worker has noticed
+            load.cancel()
+            self._abandoned.append(load)
+        self._sweep()
+
+    def _sweep(self):
+        for load in [load for load in self._abandoned if not load.is_alive()]:
+            self._abandoned.remove(load)
+            load.deck.close()
@@ -0,0 +1,176 @@
+import csv
+import io
+import json
+import os
+
+from flipwise.loader import compression, deck_format
+
+# Compression levels of .gz and .xz decks; higher ones cost much more time
+GZIP_LEVEL = 6
+XZ_PRESET = 6
+
+# Permissions of a deck file that did not exist before it was saved
+NEW_FILE_MODE = 0o644
+
+
+def write_json(file, cards, compact = False):
+    """
+    Streams flashcards to a text file as a JSON array, one card per line,
+    or with compact, on one line without spaces.
+    """
+    if compact:
+        write_compact_json(file, cards)
+        return
+    file.write("[")
+    separator = "\n  "
+    for card in cards:
+        file.write(separator)
+        file.write(json.dumps(card, ensure_ascii = False))
+        separator = ",\n  "
+    file.write("\n]\n")
+
+
+def write_compact_json(file, cards):
+    """
+    Streams flashcards to a text file as a JSON array without whitespace.
+    """
+    encode = json.JSONEncoder(ensure_ascii = False, separators = (",", ":")).encode
+    file.write("[")
+    separator = ""
+    for card in cards:
+        file.write(separator)
+        file.write(encode(card))
+        separator = ","
+    file.write("]\n")
+
+
+def write_csv(file, cards):
+    """
+    Streams flashcards to a text file as CSV with a header row.
+    """
+    writer = csv.writer(file)
+    writer.writerow(["front", "back", "category"])
+    for card in cards:
+        writer.writerow([card["front"], card["back"], card["category"]])
+
+
+def open_compressed(raw, method):
+    """
+    Wraps a binary file in a streaming compressor ("gzip" or "lzma").
+    The caller closes raw after the returned stream.
+    """
+    if method == "gzip":
+        import gzip
+
+        # mtime 0 keeps the output identical for identical decks
+        return gzip.GzipFile(fileobj = raw, mode = "wb", compresslevel = GZIP_LEVEL, mtime = 0)
+    import lzma
+
+    return lzma.LZMAFile(raw, "wb", preset = XZ_PRESET)
+
+
+def write_temp(file_path, cards, compact = False):
+    """
+    Writes a deck next to file_path without touching file_path itself.
+    A .gz or .xz deck is compressed as it is written.
+
+    Args:
+        compact (bool): Write JSON without whitespace.
+
+    Returns:
+        str: Path of the fully written and synced temporary file.
+    """
+    kind = deck_format(file_path)
+    if kind not in ("json", "csv"):
+        raise ValueError(f"Unknown deck format: {file_path}")
+
+    temp_path = temp_file(file_path)
+    method = compression(file_path)
+    try:
+        with open(temp_path, "wb") as raw:
+            stream = raw if method is None else open_compressed(raw, method)
+            file = io.TextIOWrapper(stream, encoding = "utf-8", newline = "")
+            if kind == "json":
+                write_json(file, cards, compact)
+            else:
+                write_csv(file, cards)
+            file.flush()
+            # Closing a compressor writes its trailer; raw stays open to be synced
+            if stream is raw:
+                file.detach()
+            else:
+                file.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def temp_file(file_path):
+    """
+    Creates an empty temporary file next to file_path, to be moved over it
+    with replace(). Every call gets a file of its own, so a background save
+    and a journal compaction of the same deck never write the same file.
+    The file gets the permissions of file_path, or NEW_FILE_MODE if it is new.
+
+    Returns:
+        str: Path of the temporary file.
+    """
+    import tempfile
+
+    folder, name = os.path.split(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix = name + ".", suffix = ".tmp", dir = folder)
+    os.close(fd)
+    try:
+        mode = os.stat(file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+    os.chmod(temp_path, mode)
+    return temp_path
+
+
+def replace(temp_path, file_path):
+    """
+    Atomically moves a file written by write_temp over file_path.
+    """
+    os.replace(temp_path, file_path)
+    fsync_directory(file_path)
+
+
+def write_deck(file_path, cards, compact = False):
+    """
+    Saves a deck as JSON or CSV, compressed if its name ends in .gz or .xz.
+    The file is written to a temporary file first and renamed over the
+    target, so a crash never leaves a half-written deck behind.
+
+    Args:
+        compact (bool): Write JSON without whitespace.
+
+    Returns:
+        int: Number of cards written.
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for card in cards:
+            count += 1
+            yield card
+
+    replace(write_temp(file_path, counted(), compact), file_path)
+    return count
+
+
+def fsync_directory(file_path):
+    """
+    Makes a rename inside the directory of file_path durable, where supported.
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,9 +1,73 @@
 import tkinter as tk
-from tkinter import simpledialog, messagebox, filedialog
-import json
-import csv
+from tkinter import simpledialog, messagebox, filedialog, ttk
 import os
-import random
+import queue
+import sys
+import time
+
+from flipwise import perf
+from flipwise.browser import COLUMNS, CardTable
+from flipwise.deckdb import DECK_EXTENSION
+from flipwise.engine import Deck
+from flipwise.history import CategoryStats
+from flipwise.loader import deck_format
+from flipwise.perf import timed
+from flipwise.scheduler import AGAIN, EASY, GOOD, HARD
+from flipwise.workspace import Workspace
+
+# How often the UI drains cards parsed by the loader thread
+LOAD_POLL_MS = 20
+LOAD_BATCHES_PER_POLL = 4
+
+# How often a running journal compaction is checked for completion
+COMPACTION_POLL_MS = 200
+
+# Typing pause before the search box filters the cards
+SEARCH_DELAY_MS = 150
+
+# How often the background search indexer is checked for completion
+INDEX_POLL_MS = 100
+
+# How often a background save is checked for completion
+SAVE_POLL_MS = 100
+
+# JSON and CSV decks, plain or compressed, as offered by the file dialogs
+TEXT_FILE_TYPES = [("JSON files", "*.json *.json.gz *.json.xz"), ("CSV files", "*.csv *.csv.gz *.csv.xz")]
+SAVE_FILE_TYPES = [("FlipWise decks", "*" + DECK_EXTENSION), ("JSON files", "*.json"), ("Compressed JSON", "*.json.gz *.json.xz"),
+                   ("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz *.csv.xz")]
+
+# Unreadable files listed after loading a folder
+MAX_LISTED_ERRORS = 10
+
+# Widgets that take typed text, where single-key shortcuts must not fire
+TEXT_WIDGETS = (tk.Entry, tk.Text, tk.Spinbox, ttk.Entry, ttk.Spinbox)
+
+# Navigation closer together than this is treated as a held key
+KEY_REPEAT_MS = 150
+
+# While a navigation key is held, the card is redrawn at most this often
+REPEAT_FRAME_MS = 100
+
+# How often the Performance panel redraws its table
+PERF_REFRESH_MS = 1000
+
+# How often the Statistics window recomputes its table
+STATS_REFRESH_MS = 1000
+
+# Categories listed at once by the card browser's category picker; typing
+# narrows the list down
+PICKER_CATEGORIES = 1000
+
+# Row height of the card browser if the theme does not set one, in pixels
+BROWSER_ROW_HEIGHT = 20
+
+# Names of the ttk themes built from FlipWiseApp.light_theme and dark_theme
+LIGHT_THEME = "flipwise-light"
+DARK_THEME = "flipwise-dark"
+
+# Operations that can be profiled from the Performance panel
+PROFILED_OPERATIONS = ["open_deck", "poll_loader", "save_deck", "switch_category", "refresh_categories",
+                       "update_card_display", "toggle_dark_mode", "toggle_shuffle_mode", "apply_search"]
 
 class FlipWiseApp:
     """
@@ -42,23 +106,47 @@ class FlipWiseApp:
             "button_fg": "white"
             }
 
-        # Useful bindings
-        self.root.bind("<space>", lambda e: self.flip_card())
-        self.root.bind("<Right>", lambda e: self.next_card())
-        self.root.bind("<Left>", lambda e: self.previous_card())
-        self.root.bind("<e>", lambda e: self.edit_card())
-        self.root.bind("<s>", lambda e: self.toggle_shuffle_mode())
-        self.root.bind("<c>", lambda e: self.clear_cards())
-        self.root.bind("<Delete>", lambda e: self.delete_card())
-
-        # Store flashcards as a list of dicts: [{"front": str, "back": str, "category": str}]
-        self.flashcards = []
-        self.filtered_cards = []
-        self.current_index = 0
-        self.showing_front = True
-        self.is_shuffle_mode = False
-        self.current_category = "All"
-        categories = sorted({card["category"] for card in self.flashcards})
+        # Both themes are registered with ttk once; switching is a single theme_use()
+        self.style = ttk.Style(self.root)
+        self.create_theme(LIGHT_THEME, self.light_theme)
+        self.create_theme(DARK_THEME, self.dark_theme)
+
+        # Useful bindings; plain keys do nothing while typing in the search box
+        self.root.bind("<space>", shortcut(self.flip_card))
+        self.root.bind("<Right>", shortcut(self.next_card))
+        self.root.bind("<Left>", shortcut(self.previous_card))
+        self.root.bind("<e>", shortcut(self.edit_card))
+        self.root.bind("<s>", shortcut(self.toggle_shuffle_mode))
+        self.root.bind("<c>", shortcut(self.clear_cards))
+        self.root.bind("<Delete>", shortcut(self.delete_card))
+        self.root.bind("<Key-1>", shortcut(lambda: self.grade_card(AGAIN)))
+        self.root.bind("<Key-2>", shortcut(lambda: self.grade_card(HARD)))
+        self.root.bind("<Key-3>", shortcut(lambda: self.grade_card(GOOD)))
+        self.root.bind("<Key-4>", shortcut(lambda: self.grade_card(EASY)))
+        self.root.bind("<Control-Tab>", lambda e: self.next_deck())
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-b>", lambda e: self.show_browser())
+
+        # The deck, its filters and the cursor live in a headless Deck
+        self.deck = Deck()
+        self.workspace = Workspace()
+        self.switching = None
+        self.loader = None
+        self.merger = None
+        self.previous_deck = None
+        self.search_after_id = None
+        self.compaction_after_id = None
+        self.load_started = None
+        self.perf_window = None
+        self.stats_window = None
+        self.browser = None
+
+        # Redraws are coalesced into one per idle tick; see request_redraw()
+        self.display_dirty = False
+        self.redraw_id = None
+        self.last_redraw = 0.0
+        self.last_navigation = 0.0
 
         # Menu
         self.menu_bar = tk.Menu(self.root)
@@ -69,63 +157,121 @@ class FlipWiseApp:
         self.menu_bar.add_cascade(label = "File", menu = self.file_menu)
         self.file_menu.add_command(label = "Save Flashcards", command = self.save_flashcards)
         self.file_menu.add_command(label = "Load Flashcards", command = self.load_flashcards)
+        self.file_menu.add_command(label = "Load Folder...", command = self.load_folder)
+        self.file_menu.add_command(label = "Import/Merge...", command = self.merge_flashcards)
+        self.compact_json = tk.BooleanVar(self.root, False)
+        self.file_menu.add_checkbutton(label = "Compact JSON", variable = self.compact_json)
         self.file_menu.add_command(label = "Clear Flashcards", command = self.clear_cards)
         self.file_menu.add_separator()
-        self.file_menu.add_command(label = "Exit", command = self.root.quit)
+        self.file_menu.add_command(label = "Exit", command = self.exit_app)
+
+        # Edit Menu
+        self.edit_menu = tk.Menu(self.menu_bar, tearoff = 0)
+        self.menu_bar.add_cascade(label = "Edit", menu = self.edit_menu)
+        self.edit_menu.add_command(label = "Undo", accelerator = "Ctrl+Z", command = self.undo)
+        self.edit_menu.add_command(label = "Redo", accelerator = "Ctrl+Y", command = self.redo)
+
+        # Decks Menu
+        self.decks_menu = tk.Menu(self.menu_bar, tearoff = 0)
+        self.menu_bar.add_cascade(label = "Decks", menu = self.decks_menu)
+        self.decks_menu.add_command(label = "Add Decks...", command = self.add_decks)
+        self.decks_menu.add_command(label = "Next Deck", accelerator = "Ctrl+Tab", command = self.next_deck)
+        self.decks_menu.add_command(label = "Remove Deck", command = self.remove_deck)
 
         # View Menu
         self.view_menu = tk.Menu(self.menu_bar, tearoff = 0)
         self.menu_bar.add_cascade(label = "View", menu = self.view_menu)
         self.view_menu.add_command(label = "Dark Mode", command = self.toggle_dark_mode)
+        self.view_menu.add_command(label = "Statistics", command = self.show_statistics)
+        self.view_menu.add_command(label = "Performance", command = self.show_performance)
+        self.view_menu.add_command(label = "Browse Cards", accelerator = "Ctrl+B", command = self.show_browser)
+
+        # Progress indicator shown while a deck is loading
+        self.load_frame = ttk.Frame(root)
+        self.load_status = ttk.Label(self.load_frame, text = "Loading...")
+        self.load_status.pack(side = tk.LEFT)
+        self.load_cancel_btn = ttk.Button(self.load_frame, text = "Cancel", command = self.cancel_loading)
+        self.load_cancel_btn.pack(side = tk.RIGHT)
+        self.load_progress = ttk.Progressbar(self.load_frame, mode = "determinate", maximum = 100)
+        self.load_progress.pack(side = tk.LEFT, expand = True, fill = "x", padx = 5)
+
+        # Decks of the workspace
+        deck_frame = ttk.Frame(root)
+        deck_frame.pack(pady = 5, padx = 10, fill = "x")
+        ttk.Label(deck_frame, text = "Deck:").pack(side = tk.LEFT)
+        self.deck_picker = ttk.Combobox(deck_frame, state = "readonly")
+        self.deck_picker.pack(side = tk.LEFT, expand = True, fill = "x", padx = 5)
+        self.deck_picker.bind("<<ComboboxSelected>>", lambda e: self.switch_deck(self.workspace.paths[self.deck_picker.current()]))
+
+        # Search box
+        search_frame = ttk.Frame(root)
+        search_frame.pack(pady = 5, padx = 10, fill = "x")
+        ttk.Label(search_frame, text = "Search:").pack(side = tk.LEFT)
+        self.search_var = tk.StringVar(self.root)
+        self.search_var.trace_add("write", self.on_search_changed)
+        self.search_entry = ttk.Entry(search_frame, textvariable = self.search_var)
+        self.search_entry.pack(side = tk.LEFT, expand = True, fill = "x", padx = 5)
+        self.search_status = ttk.Label(search_frame, text = "")
+        self.search_status.pack(side = tk.LEFT)
 
         # Label to display question/answer
-        self.card_label = tk.Label(root, text = "No cards yet. Add one!", font = ("Arial", 10), width = 30, height = 10, relief="groove", wraplength = 600, cursor = "hand2")
+        self.card_label = ttk.Label(root, text = "No cards yet. Add one!", style = "Card.TLabel", width = 30, wraplength = 600, cursor = "hand2")
         self.card_label.pack(expand = True, fill = "both", padx = 10, pady = 10)
         self.card_label.bind("<Button-1>", self.on_card_label_click)
 
 
         # Buttons for flashcard actions
-        navegation_frame = tk.Frame(root)
+        navegation_frame = ttk.Frame(root)
         navegation_frame.pack(pady = 5, padx = 5)
-        self.previous_btn = tk.Button(navegation_frame, text="BACK!", command = self.previous_card)
+        self.previous_btn = ttk.Button(navegation_frame, text="BACK!", command = self.previous_card)
         self.previous_btn.pack(side = tk.LEFT)
 
-        self.flip_btn = tk.Button(navegation_frame,  text = "FLIP!", command = self.flip_card)
+        self.flip_btn = ttk.Button(navegation_frame,  text = "FLIP!", command = self.flip_card)
         self.flip_btn.pack(side = tk.LEFT)
 
-        self.next_btn = tk.Button(navegation_frame, text = "NEXT!", command = self.next_card)
+        self.next_btn = ttk.Button(navegation_frame, text = "NEXT!", command = self.next_card)
         self.next_btn.pack(side = tk.LEFT)
 
         # Buttons for adding/deleting flashcards
-        button_frame = tk.Frame(root)
+        button_frame = ttk.Frame(root)
         button_frame.pack(pady = 5, padx = 5)
 
-        self.add_btn = tk.Button(button_frame, text = "+ Add Card", command = self.add_card)
+        self.add_btn = ttk.Button(button_frame, text = "+ Add Card", command = self.add_card)
         self.add_btn.pack(side = tk.LEFT)
 
-        self.edit_btn = tk.Button(button_frame, text = "Edit", command = self.edit_card)
+        self.edit_btn = ttk.Button(button_frame, text = "Edit", command = self.edit_card)
         self.edit_btn.pack(side = tk.LEFT)
 
-        self.delete_btn = tk.Button(button_frame, text = "- Delete Card", command = self.delete_card)
+        self.delete_btn = ttk.Button(button_frame, text = "- Delete Card", command = self.delete_card)
         self.delete_btn.pack(side = tk.LEFT)
 
         # Misc Buttons
-        button_frame2 = tk.Frame(root)
+        button_frame2 = ttk.Frame(root)
         button_frame2.pack(pady = 5, padx = 5)
 
-        self.shuffle_btn = tk.Button(button_frame2, text = "Shuffle Mode", command = self.toggle_shuffle_mode)
+        self.shuffle_btn = ttk.Button(button_frame2, text = "Shuffle Mode", command = self.toggle_shuffle_mode)
         self.shuffle_btn.pack(side = tk.LEFT)
+
+        self.study_btn = ttk.Button(button_frame2, text = "Study Mode", command = self.toggle_study_mode)
+        self.study_btn.pack(side = tk.LEFT)
+
+        # Grade buttons, shown in study mode
+        self.grade_frame = ttk.Frame(root)
+        for grade, label in ((AGAIN, "Again (1)"), (HARD, "Hard (2)"), (GOOD, "Good (3)"), (EASY, "Easy (4)")):
+            ttk.Button(self.grade_frame, text = label, command = lambda grade = grade: self.grade_card(grade)).pack(side = tk.LEFT)
         
         # Category Selector
-        button_frame4 = tk.Frame(root)
+        button_frame4 = ttk.Frame(root)
         button_frame4.pack(pady = 5, padx = 5)
         self.category_var = tk.StringVar(self.root)
         self.category_var.set("All")
-        self.category_menu = tk.OptionMenu(button_frame4, self.category_var, "All", *categories, command = self.switch_category)
+        self.category_menu = ttk.OptionMenu(button_frame4, self.category_var, "All", "All", command = self.switch_category)
         self.category_menu.pack(side = tk.BOTTOM)
 
 
-        self.update_card_display()
+        self.use_theme()
+        self.request_redraw()
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
     
     def on_card_label_click(self, event):
         """
@@ -146,62 +292,136 @@ class FlipWiseApp:
     def previous_card(self):
         """
         Move to the previous flashcard (wraps around if at the beginning).
+        In study mode, go back to the card graded last.
         """
-        if not self.filtered_cards:
-            return
-        self.current_index = (self.current_index - 1) % len(self.filtered_cards)
-        self.showing_front = True
-        self.update_card_display()
+        self.deck.previous_card()
+        self.request_redraw(throttle = self.is_key_repeat())
 
     def flip_card(self):
         """
         Flip the flashcard between question and answer.
         """
-        if not self.flashcards:
-            return
-        self.showing_front = not self.showing_front
-        self.update_card_display()
+        self.deck.flip_card()
+        self.request_redraw()
     
     def next_card(self):
         """
         Move to the next flashcard (wraps around if at the end).
+        In study mode, show the card that is due first.
+        """
+        self.deck.next_card()
+        self.request_redraw(throttle = self.is_key_repeat())
+
+    def is_key_repeat(self):
+        """
+        Returns True if this navigation follows the previous one closely
+        enough to come from a held key.
         """
-        if not self.flashcards:
+        now = time.perf_counter()
+        repeat = now - self.last_navigation < KEY_REPEAT_MS / 1000
+        self.last_navigation = now
+        return repeat
+
+    def request_redraw(self, throttle = False):
+        """
+        Marks the card display as out of date. The display is redrawn once
+        when Tk is next idle, however many changes asked for it.
+
+        Args:
+            throttle (bool): Wait until REPEAT_FRAME_MS after the last
+                redraw, so a held key skips the cards in between and the
+                display lands on the final one.
+        """
+        self.display_dirty = True
+        if self.redraw_id is not None:
             return
-        self.current_index = (self.current_index + 1) % len(self.filtered_cards)
-        self.showing_front = True
-        self.update_card_display()
+        wait_ms = 0
+        if throttle:
+            wait_ms = int(REPEAT_FRAME_MS - (time.perf_counter() - self.last_redraw) * 1000)
+        if wait_ms > 0:
+            self.redraw_id = self.root.after(wait_ms, self.redraw)
+        else:
+            self.redraw_id = self.root.after_idle(self.redraw)
+
+    def redraw(self):
+        """
+        Redraws the card display if it was marked out of date.
+        """
+        self.redraw_id = None
+        if self.display_dirty:
+            self.display_dirty = False
+            self.last_redraw = time.perf_counter()
+            self.update_card_display()
+            if self.browser is not None:
+                self.browser.refresh()
 
     def save_flashcards(self):
         """
-        Save flashcards to a JSON file or CSV file.
+        Save flashcards to a FlipWise deck, or export them to a JSON or CSV file.
         """
-        if not self.flashcards:
+        if self.deck_is_loading("Save") or self.deck_is_saving("Save"):
+            return
+        if not self.deck.flashcards:
             messagebox.showinfo("Save", "No flashcards to save.")
             return
         
-        file_path = filedialog.asksaveasfilename(filetypes = [("JSON files", "*.json"), ("CSV Files", "*.csv")], title="Save Flashcards")
+        file_path = filedialog.asksaveasfilename(filetypes = SAVE_FILE_TYPES, title="Save Flashcards")
         if not file_path:
             return
+        if deck_format(file_path) is None:
+            messagebox.showinfo("Save file", f"Format unknown")
+            return
 
         try:
-            if file_path[-5:] == ".json":
-                with open(file_path, "w") as f:
-                    json.dump(self.flashcards, f, indent = 2)
-
-            elif file_path[-4:] == ".csv":
-                with open(file_path, "w") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["front", "back", "category"])
-
-                    for card in self.flashcards:
-                        writer.writerow([card["front"], card["back"], card["category"]])
-            else:
-                messagebox.showinfo("Save file", f"Format unknown")
+            count = len(self.deck.flashcards)
+            if self.save_deck(file_path):
+                # The deck stays usable; edits made meanwhile are kept
+                self.root.title(f"FlipWise - Saving {os.path.basename(file_path)}...")
+                self.root.after(SAVE_POLL_MS, self.poll_saving, count)
                 return
-            messagebox.showinfo("Save file", f"Saved {len(self.flashcards)} cards!")
+            messagebox.showinfo("Save file", f"Saved {count} cards!")
         except Exception as e:
             messagebox.showerror("Save file", f"Error saving file:\n{e}")
+
+    @timed("save_deck")
+    def save_deck(self, file_path):
+        """
+        Saves the deck to the file picked in save_flashcards().
+
+        Returns:
+            bool: True if the save goes on in the background.
+        """
+        return self.deck.start_saving(file_path, self.compact_json.get())
+
+    def poll_saving(self, count):
+        """
+        Finishes a background save once the worker thread is done.
+
+        Args:
+            count (int): Number of cards in the snapshot being written.
+        """
+        done, error = self.deck.finish_saving()
+        if not done:
+            self.root.after(SAVE_POLL_MS, self.poll_saving, count)
+            return
+        self.root.title("FlipWise - Flashcard App")
+        self.watch_compaction()
+        if error is not None:
+            messagebox.showerror("Save file", f"Error saving file:\n{error}")
+        else:
+            messagebox.showinfo("Save file", f"Saved {count} cards!")
+
+    def deck_is_saving(self, title):
+        """
+        Tells the user to wait if the deck is being saved in the background.
+
+        Returns:
+            bool: True if the deck must not be replaced yet.
+        """
+        if self.deck.saver is None:
+            return False
+        messagebox.showinfo(title, "Please wait until the deck has been saved.")
+        return True
         
     
     def add_card(self):
@@ -211,38 +431,33 @@ class FlipWiseApp:
         add_window = tk.Toplevel(self.root)
         add_window.title("Add Flashcard")
         self.center_window(add_window)
-        self.apply_theme(add_window)
 
-        tk.Label(add_window, text = "Front:").pack(pady = 5)
-        front_field = tk.Entry(add_window, width = 40)
+        ttk.Label(add_window, text = "Front:").pack(pady = 5)
+        front_field = ttk.Entry(add_window, width = 40)
         front_field.pack(pady = 5)
 
-        tk.Label(add_window, text = "Back:").pack(pady = 5)
-        back_field = tk.Entry(add_window, width = 40)
+        ttk.Label(add_window, text = "Back:").pack(pady = 5)
+        back_field = ttk.Entry(add_window, width = 40)
         back_field.pack(pady = 5)
 
-        tk.Label(add_window, text = "Category:").pack(pady = 5)
-        category_field = tk.Entry(add_window, width = 40)
+        ttk.Label(add_window, text = "Category:").pack(pady = 5)
+        category_field = ttk.Entry(add_window, width = 40)
         category_field.pack(pady = 5)
         
         # Saving Button
         def save_card():
+            if self.deck_is_loading("Add Flashcard"):
+                add_window.destroy()
+                return
             front = front_field.get().strip()
             back = back_field.get().strip()
             category = category_field.get().strip() or "General"
             if front and back:
-                new_card = {"front": front, "back": back, "category": category}
-                self.flashcards.append(new_card)
-
-                if self.filtered_cards:
-                    self.current_index = len(self.filtered_cards) - 1
-                else:
-                    self.current_index = 0
-                
-                self.showing_front = True
-                self.update_card_display()
-                self.refresh_categories()
-                self.switch_category(self.current_category)
+                card_id, created = self.deck.add(front, back, category)
+                if created:
+                    self.add_category_entry(category)
+                self.watch_compaction()
+                self.request_redraw()
             elif not front and not back:
                 messagebox.showinfo("Add Flashcard", "Failed! Missing front and back of flashcard!")
             elif not front:
@@ -250,96 +465,489 @@ class FlipWiseApp:
             else:
                 messagebox.showinfo("Add Flashcard", "Failed! Missing back of flashcard")
             add_window.destroy()
-        tk.Button(add_window, text = "Save", command = save_card).pack(pady = 10)
+        ttk.Button(add_window, text = "Save", command = save_card).pack(pady = 10)
 
 
     def delete_card(self):
         """
         Deletes the currently displayed flashcard.
         """
-        if not self.flashcards:
+        if self.deck_is_loading("Delete Card"):
+            return
+        card_to_delete = self.deck.current_card()
+        if card_to_delete is None:
             messagebox.showinfo("Delete Card", "No cards to delete.")
             return
         
-        card_to_delete = self.filtered_cards[self.current_index]
-        front = card_to_delete["front"]
+        front = self.deck.flashcards.front(card_to_delete)
         confirm = messagebox.askyesno("Delete Card", f"Delete this card?\n\nFront: {front}")
         
         if not confirm:
             return
         
-        self.flashcards.remove(card_to_delete)
-
-        # Adjusting index
-        if self.current_index >= len(self.filtered_cards):
-            self.current_index = max(0, len(self.filtered_cards) - 1)
-        
-        self.showing_front = True
-        self.refresh_categories()
-        self.switch_category(self.current_category)
-        self.update_card_display()
+        category, position, emptied = self.deck.delete(card_to_delete)
+        if emptied:
+            self.remove_category_entry(position, category)
+        self.watch_compaction()
+        self.request_redraw()
 
     def load_flashcards(self):
         """
         Load flashcards from a JSON or CSV file.
+
+        The file is parsed on a worker thread and the cards arrive in
+        batches, so the window stays responsive on very large decks.
         """
-        file_path = filedialog.askopenfilename(filetypes = [("JSON files", "*.json"), ("CSV files", "*.csv")], title="Load Flashcards")
+        if self.loader is not None or self.merger is not None:
+            messagebox.showinfo("Load", "A deck is already being loaded.")
+            return
+        if self.deck_is_saving("Load"):
+            return
+
+        file_path = filedialog.askopenfilename(filetypes = [("FlipWise decks", "*" + DECK_EXTENSION)] + TEXT_FILE_TYPES, title="Load Flashcards")
         if not file_path:
             return
-        
+        self.open_deck(file_path)
+
+    def merge_flashcards(self):
+        """
+        Streams JSON or CSV files into the current deck, leaving out cards
+        it already has.
+        """
+        if self.deck_is_loading("Import/Merge") or self.deck_is_saving("Import/Merge"):
+            return
+        file_paths = filedialog.askopenfilenames(filetypes = TEXT_FILE_TYPES, title = "Import/Merge Flashcards")
+        if not file_paths:
+            return
+        update = messagebox.askyesnocancel("Import/Merge", "When an imported card has the same front and category as a card in the deck but a different back, replace the back?\n\nYes: update the card\nNo: add the imported card as well")
+        if update is None:
+            return
+
+        self.merger = self.deck.merger(file_paths, update)
+        self.merger.start()
+        self.load_status.config(text = "Merging...")
+        self.load_progress["value"] = 0
+        self.load_frame.pack(pady = 5, padx = 5, fill = "x", before = self.card_label)
+        self.root.after(LOAD_POLL_MS, self.poll_merger)
+
+    def poll_merger(self):
+        """
+        Applies the batches of cards found by the merge worker.
+        """
+        merger = self.merger
+        if merger is None:
+            return
+
+        for _ in range(LOAD_BATCHES_PER_POLL):
+            try:
+                kind, value, progress = merger.batches.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "batch":
+                for category in sorted(self.deck.merge_batch(value)):
+                    self.add_category_entry(category)
+                self.watch_compaction()
+                self.load_progress["value"] = progress * 100
+                self.load_status.config(text = f"Merging... {merger.added} added, {merger.duplicates} duplicates")
+                self.request_redraw()
+                continue
+
+            self.merger = None
+            self.load_frame.pack_forget()
+            self.request_redraw()
+            if kind == "done":
+                messagebox.showinfo("Import/Merge", f"Added {value.added} cards, updated {value.updated}, skipped {value.duplicates} duplicates.")
+            elif kind == "cancelled":
+                messagebox.showinfo("Import/Merge", "Merge stopped. The cards merged so far were kept.")
+            else:
+                messagebox.showerror("Import/Merge", f"Error merging files:\n{value}\n\nThe cards merged before the error were kept.")
+            return
+
+        self.root.after(LOAD_POLL_MS, self.poll_merger)
+
+    @timed("open_deck")
+    def open_deck(self, file_path):
+        """
+        Adds a deck file to the workspace and shows it.
+
+        Args:
+            file_path (str): Path of a .flipwise, JSON or CSV deck.
+        """
+        if not os.path.exists(file_path) or deck_format(file_path) is None:
+            return
+        file_path = self.workspace.add(file_path)
+        self.refresh_deck_picker()
+        self.switch_deck(file_path)
+
+    def stream_deck(self, file_path):
+        """
+        Starts loading a deck file in the background, showing its cards as
+        they arrive.
+
+        Args:
+            file_path (str): Path of a .flipwise, JSON or CSV deck.
+        """
         try:
-            if file_path and os.path.exists(file_path):
-                if file_path[-5:] == ".json":
-                    with open(file_path, "r") as file:
-                        self.flashcards = json.load(file)
-                elif file_path[-4:] == ".csv":
-                    with open(file_path, "r") as file:
-                        reader = csv.DictReader(file)
-                        self.flashcards = [{"front": row["front"], "back": row["back"], "category": row["category"]} for row in reader]
-                else:
-                    return
+            deck = Deck.for_file(file_path)
+        except Exception as e:
+            messagebox.showerror("Load from file", f"Error loading file:\n{e}")
+            return
+        self.start_loading(deck, deck.loader(file_path))
+
+    def load_folder(self):
+        """
+        Loads every JSON and CSV deck in a folder as one deck. The files are
+        parsed in parallel; the ones that fail are listed at the end.
+        """
+        if self.deck_is_loading("Load Folder") or self.deck_is_saving("Load Folder"):
+            return
+        folder = filedialog.askdirectory(title = "Load Folder", mustexist = True)
+        if not folder:
+            return
+        deck = Deck()
+        self.start_loading(deck, deck.folder_loader(folder))
 
-                self.current_index = 0
-                self.showing_front = True
-                self.refresh_categories()
-                self.switch_category("All")
-                self.update_card_display()
-                messagebox.showinfo("Load", f"Loaded {len(self.flashcards)} cards!")
+    def add_decks(self):
+        """
+        Adds deck files to the workspace, and shows the first one if no
+        workspace deck is on display yet.
+        """
+        file_paths = filedialog.askopenfilenames(filetypes = [("FlipWise decks", "*" + DECK_EXTENSION)] + TEXT_FILE_TYPES, title = "Add Decks")
+        if not file_paths:
+            return
+        added = [self.workspace.add(file_path) for file_path in file_paths if deck_format(file_path) is not None]
+        self.refresh_deck_picker()
+        if self.workspace.active is None and added:
+            self.switch_deck(added[0])
+        else:
+            self.workspace.prefetch_next()
+
+    def next_deck(self):
+        """
+        Shows the deck listed after the one on display.
+        """
+        file_path = self.workspace.next_path(self.workspace.active_path)
+        if file_path is not None:
+            self.switch_deck(file_path)
+
+    def remove_deck(self):
+        """
+        Takes the deck on display off the workspace list. It stays on
+        display until another deck replaces it.
+        """
+        if self.workspace.active_path is None:
+            messagebox.showinfo("Remove Deck", "The deck on display is not in the workspace.")
+            return
+        self.workspace.remove(self.workspace.active_path)
+        self.refresh_deck_picker()
+
+    def switch_deck(self, file_path):
+        """
+        Shows a deck of the workspace. A cached or prefetched deck appears
+        at once, as it was left; one being prefetched is waited for, and
+        any other is loaded in the background.
+        """
+        if self.deck_is_loading("Switch Deck") or self.deck_is_saving("Switch Deck"):
+            self.refresh_deck_picker()
+            return
+        previous = self.deck
+        owned = previous is self.workspace.active
+        try:
+            deck = self.workspace.take(file_path)
         except Exception as e:
+            self.refresh_deck_picker()
             messagebox.showerror("Load from file", f"Error loading file:\n{e}")
+            return
+        if deck is not None:
+            # A deck from outside the workspace, such as a loaded folder, is not kept
+            if not owned and previous is not deck:
+                previous.close()
+            self.show_deck(deck)
+        elif self.workspace.is_loading(file_path):
+            self.switching = file_path
+            self.load_status.config(text = f"Loading {os.path.basename(file_path)}...")
+            self.load_progress.config(mode = "indeterminate")
+            self.load_progress.start()
+            self.load_frame.pack(pady = 5, padx = 5, fill = "x", before = self.card_label)
+            self.root.after(LOAD_POLL_MS, self.poll_switch)
+        else:
+            self.stream_deck(file_path)
 
+    def poll_switch(self):
+        """
+        Shows the deck being waited for once it has been prefetched.
+        """
+        file_path = self.switching
+        if file_path is None:
+            return
+        if self.workspace.is_loading(file_path):
+            self.root.after(LOAD_POLL_MS, self.poll_switch)
+            return
+        self.stop_switching()
+        self.switch_deck(file_path)
+
+    def stop_switching(self):
+        """
+        Stops waiting for a prefetched deck and hides the progress indicator.
+        """
+        self.switching = None
+        self.load_progress.stop()
+        self.load_progress.config(mode = "determinate")
+        self.load_frame.pack_forget()
+
+    def show_deck(self, deck):
+        """
+        Puts a deck taken from the workspace on display, with the category,
+        cursor and shuffle it was left with.
+        """
+        self.deck = deck
+        if deck.search_query != self.search_var.get():
+            deck.set_search(self.search_var.get())
+        if deck.search_index is None and deck.indexer is None:
+            deck.start_indexing()
+        if deck.indexer is not None:
+            self.root.after(INDEX_POLL_MS, self.poll_indexer)
+        if deck.is_study_mode:
+            self.grade_frame.pack(pady = 5, padx = 5, after = self.card_label)
+        else:
+            self.grade_frame.pack_forget()
+        self.category_var.set(deck.current_category)
+        self.refresh_categories()
+        self.refresh_deck_picker()
+        self.watch_compaction()
+        self.request_redraw()
+        self.workspace.prefetch_next()
+
+    def refresh_deck_picker(self):
+        """
+        Lists the workspace decks in the picker and selects the one on display.
+        """
+        paths = self.workspace.paths
+        self.deck_picker["values"] = [os.path.basename(file_path) for file_path in paths]
+        if self.workspace.active_path in paths:
+            self.deck_picker.current(paths.index(self.workspace.active_path))
+        else:
+            self.deck_picker.set("")
+
+    def start_loading(self, deck, loader):
+        """
+        Shows a new deck and starts its loader thread.
+
+        Args:
+            deck (Deck): The empty deck the loader fills.
+            loader: A DeckLoader or FolderLoader, not yet started.
+        """
+        # Keep the current deck around in case the load fails or is cancelled.
+        # A workspace deck keeps journaling, as it goes back to the cache.
+        if self.deck is not self.workspace.active:
+            self.deck.close_journal()
+        self.previous_deck = self.deck
+        self.deck = deck
+        self.grade_frame.pack_forget()
+        self.category_var.set("All")
+        self.refresh_categories()
+        self.request_redraw()
+
+        self.loader = loader
+        self.loader.start()
+        self.load_started = time.perf_counter()
+
+        self.load_status.config(text = "Loading...")
+        self.load_progress["value"] = 0
+        self.load_frame.pack(pady = 5, padx = 5, fill = "x", before = self.card_label)
+        self.root.after(LOAD_POLL_MS, self.poll_loader)
+
+    @timed("poll_loader")
+    def poll_loader(self):
+        """
+        Moves the batches parsed by the loader thread into the deck.
+        """
+        loader = self.loader
+        if loader is None:
+            return
+
+        for _ in range(LOAD_BATCHES_PER_POLL):
+            try:
+                kind, value, progress = loader.batches.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "batch":
+                first_batch = not self.deck.flashcards
+                new_categories = self.deck.add_batch(value)
+                for category in sorted(new_categories):
+                    self.add_category_entry(category)
+                self.load_progress["value"] = progress * 100
+                self.load_status.config(text = f"Loading... {len(self.deck.flashcards)} cards")
+                if first_batch:
+                    self.request_redraw()
+            elif kind == "store":
+                for category in sorted(self.deck.add_store(value)):
+                    self.add_category_entry(category)
+                self.load_progress["value"] = progress * 100
+                self.load_status.config(text = f"Loading... {len(self.deck.flashcards)} cards")
+                self.request_redraw()
+            elif kind == "loaded":
+                self.finish_loading()
+                perf.recorder.record("load folder (whole deck)", time.perf_counter() - self.load_started)
+                message = f"Loaded {len(self.deck.flashcards)} cards from {value.files - len(value.errors)} of {value.files} files."
+                if value.errors:
+                    lines = [f"{os.path.basename(path)}: {error}" for path, error in value.errors[:MAX_LISTED_ERRORS]]
+                    if len(value.errors) > MAX_LISTED_ERRORS:
+                        lines.append(f"... and {len(value.errors) - MAX_LISTED_ERRORS} more")
+                    messagebox.showwarning("Load Folder", message + "\n\nThese files could not be read:\n" + "\n".join(lines))
+                else:
+                    messagebox.showinfo("Load Folder", message)
+                return
+            elif kind == "done":
+                try:
+                    applied = self.deck.finish_loading(loader.file_path)
+                except Exception as e:
+                    self.finish_loading(restore = True)
+                    messagebox.showerror("Load from file", f"Error replaying the journal:\n{e}")
+                    return
+                self.finish_loading(file_path = loader.file_path)
+                perf.recorder.record("load (whole deck)", time.perf_counter() - self.load_started)
+                message = f"Loaded {len(self.deck.flashcards)} cards!"
+                if applied:
+                    message += f"\nRecovered {applied} unsaved changes."
+                messagebox.showinfo("Load", message)
+                return
+            elif kind == "cancelled":
+                self.finish_loading(restore = True)
+                messagebox.showinfo("Load", "Loading cancelled.")
+                return
+            else:
+                self.finish_loading(restore = True)
+                messagebox.showerror("Load from file", f"Error loading file:\n{value}")
+                return
+
+        self.root.after(LOAD_POLL_MS, self.poll_loader)
+
+    def watch_compaction(self):
+        """
+        Polls a journal compaction started by the last edit until it ends.
+        """
+        if self.deck.is_compacting() and self.compaction_after_id is None:
+            self.compaction_after_id = self.root.after(COMPACTION_POLL_MS, self.poll_compaction)
+
+    def poll_compaction(self):
+        """
+        Finishes a background compaction once its worker thread is done.
+        """
+        self.compaction_after_id = None
+        done, error = self.deck.finish_compaction()
+        if not done:
+            self.watch_compaction()
+        elif error is not None:
+            messagebox.showerror("Autosave", f"Error compacting the journal:\n{error}\n\nEdits are still being saved to the journal.")
+
+    def exit_app(self):
+        """
+        Flushes the journals and closes the decks before quitting.
+        """
+        if self.deck is not self.workspace.active:
+            self.deck.close()
+        self.workspace.close()
+        self.root.quit()
+
+    def deck_is_loading(self, title):
+        """
+        Tells the user to wait if a deck is still loading.
+
+        Returns:
+            bool: True if the deck must not be changed yet.
+        """
+        if self.loader is None and self.merger is None and self.switching is None:
+            return False
+        messagebox.showinfo(title, "Please wait until the deck has finished loading.")
+        return True
+
+    def cancel_loading(self):
+        """
+        Stops the deck currently being loaded or merged.
+        """
+        if self.switching is not None:
+            # The deck keeps being prefetched, and is shown at once when picked again
+            self.stop_switching()
+            self.refresh_deck_picker()
+        for worker in (self.loader, self.merger):
+            if worker is not None:
+                self.load_status.config(text = "Cancelling...")
+                worker.cancel()
+
+    def finish_loading(self, restore = False, file_path = None):
+        """
+        Hides the progress indicator and refreshes the view once a load ends.
+
+        Args:
+            restore (bool): Put back the deck that was open before the load.
+            file_path (str): The deck file that was loaded, which joins the
+                workspace; None for a folder.
+        """
+        self.loader = None
+        self.load_frame.pack_forget()
+        if restore:
+            self.deck.close()
+            self.deck = self.previous_deck
+        elif file_path is not None:
+            if self.previous_deck is not self.workspace.active:
+                self.previous_deck.close()
+            # Sends the deck shown before back to the cache
+            self.workspace.adopt(file_path, self.deck)
+        elif self.previous_deck is self.workspace.active:
+            self.workspace.release()
+        else:
+            self.previous_deck.close()
+        self.previous_deck = None
+
+        self.deck.search_query = self.search_var.get()
+        self.deck.set_study_mode(False)
+        self.deck.start_indexing()
+        self.root.after(INDEX_POLL_MS, self.poll_indexer)
+        self.watch_compaction()
+
+        # A workspace deck comes back with the view it was left with
+        self.category_var.set(self.deck.current_category if file_path is not None else "All")
+        self.refresh_categories()
+        if file_path is None:
+            self.switch_category("All")
+        self.refresh_deck_picker()
+        self.request_redraw()
+        self.workspace.prefetch_next()
 
-    
     def edit_card(self):
         """
         Edit the current flashcard.
         """
-        if not self.flashcards:
+        if self.deck_is_loading("Edit Card"):
+            return
+        card_id = self.deck.current_card()
+        if card_id is None:
             messagebox.showinfo("Edit Card", "No cards available to edit.")
             return
         
-        card = self.flashcards[self.current_index]
-        front = card["front"]
-        back = card["back"]
-        category = card["category"]
+        front = self.deck.flashcards.front(card_id)
+        back = self.deck.flashcards.back(card_id)
+        category = self.deck.flashcards.category(card_id)
 
         edit_window = tk.Toplevel(self.root)
         edit_window.title("Edit Flashcard")
         self.center_window(edit_window)
-        self.apply_theme(edit_window)
 
-        tk.Label(edit_window, text = "Front:").pack(pady = 5)
-        front_field = tk.Entry(edit_window, width = 40)
+        ttk.Label(edit_window, text = "Front:").pack(pady = 5)
+        front_field = ttk.Entry(edit_window, width = 40)
         front_field.insert(0, front)
         front_field.pack(pady = 5)
 
-        tk.Label(edit_window, text = "Back:").pack(pady = 5)
-        back_field = tk.Entry(edit_window, width = 40)
+        ttk.Label(edit_window, text = "Back:").pack(pady = 5)
+        back_field = ttk.Entry(edit_window, width = 40)
         back_field.insert(0, back)
         back_field.pack(pady = 5)
 
-        tk.Label(edit_window, text = "Category:").pack(pady = 5)
-        category_field = tk.Entry(edit_window, width = 40)
+        ttk.Label(edit_window, text = "Category:").pack(pady = 5)
+        category_field = ttk.Entry(edit_window, width = 40)
         category_field.insert(0, category)
         category_field.pack(pady = 5)
         
@@ -348,12 +956,17 @@ class FlipWiseApp:
             front = front_field.get().strip()
             back = back_field.get().strip()
             category = category_field.get().strip() or "General"
-            if front and back:
-                self.flashcards[self.current_index] = {"front": front, "back": back, "category": category}
-                self.showing_front = True
-                self.update_card_display()
-                self.refresh_categories()
-                self.switch_category(self.current_category)
+            deck = self.deck
+            if not deck.flashcards.is_alive(card_id):
+                messagebox.showinfo("Edit Flashcard", "Failed! The flashcard no longer exists!")
+            elif front and back:
+                old_category, old_position, emptied, created = deck.edit(card_id, front, back, category)
+                if emptied:
+                    self.remove_category_entry(old_position, old_category)
+                if created:
+                    self.add_category_entry(category)
+                self.watch_compaction()
+                self.request_redraw()
                 messagebox.showinfo("Edit Flashcard", "Flashcard updated successfully!")
             elif not front and not back:
                 messagebox.showinfo("Edit Flashcard", "Failed! Missing front and back of flashcard!")
@@ -362,155 +975,402 @@ class FlipWiseApp:
             else:
                 messagebox.showinfo("Edit Flashcard", "Failed! Missing back of flashcard")
             edit_window.destroy()
-        tk.Button(edit_window, text = "Save", command = save_edited_card).pack(pady = 10)
+        ttk.Button(edit_window, text = "Save", command = save_edited_card).pack(pady = 10)
 
+    @timed("toggle_shuffle_mode")
     def toggle_shuffle_mode(self):
         """
         Shuffles the cards.
         """
-        if not self.filtered_cards:
+        if not self.deck.toggle_shuffle_mode():
             return
-
-        self.is_shuffle_mode = not self.is_shuffle_mode
-
-        if self.is_shuffle_mode:
-            self.filtered_cards = list(self.filtered_cards)
-            random.shuffle(self.filtered_cards)
-            self.current_index = 0
-            self.showing_front = True
-            self.update_card_display()
+        self.request_redraw()
+        if self.deck.is_shuffle_mode:
             messagebox.showinfo("Shuffle Cards", "Cards shuffled!")
-        else:
-            if getattr(self, "current_category", "All") ==  "All":
-                self.filtered_cards = list(self.flashcards)
-            else:
-                category = self.current_category
-                self.filtered_cards = [card for card in self.flashcards if card.get("category") == category]
-            
-            self.current_index = 0
-            self.showing_front = True
-            self.update_card_display()
 
     def clear_cards(self):
         """
         Clear the currently loaded flashcards.
         """
-        if not self.flashcards:
+        if self.deck_is_loading("Clear Cards"):
+            return
+        if not self.deck.flashcards:
             messagebox.showinfo("Clear Cards", "No flashcards to clear")
             return
         if messagebox.askyesno("Clear Cards", "Are you sure you want to clear all flashcards?"):
-            self.flashcards = []
-            self.filtered_cards = []
-            self.current_index = 0
-            self.showing_front = True
+            self.deck.clear()
+            self.watch_compaction()
             self.refresh_categories()
-            self.switch_category(self.current_category)
-            self.update_card_display()
+            self.switch_category("All")
 
+    def undo(self):
+        """
+        Reverts the last add, edit, delete or clear of cards.
+        """
+        self.revert(self.deck.undo, "Undo")
+
+    def redo(self):
+        """
+        Makes again the last change reverted by undo().
+        """
+        self.revert(self.deck.redo, "Redo")
+
+    def revert(self, action, title):
+        """
+        Runs Deck.undo() or Deck.redo() and brings the window up to date.
+        """
+        if self.deck_is_loading(title):
+            return
+        reverted = action()
+        if reverted is None:
+            return
+        if reverted.rebuilt:
+            # A clear or its undo replaced every card
+            self.refresh_categories()
+        else:
+            for category, position in reverted.emptied:
+                self.remove_category_entry(position, category)
+            for category in reverted.created:
+                self.add_category_entry(category)
+        self.category_var.set(self.deck.current_category)
+        if self.deck.indexer is not None:
+            self.root.after(INDEX_POLL_MS, self.poll_indexer)
+        self.watch_compaction()
+        self.request_redraw()
+
+    @timed("switch_category")
     def switch_category(self, selected_category):
         """
         Switches the active category and filters the flashcards shown.
         """
-        if selected_category == "All":
-            self.filtered_cards = self.flashcards
+        self.deck.switch_category(selected_category)
+        self.request_redraw()
+
+    def toggle_study_mode(self):
+        """
+        Switches between browsing the cards in order and studying the cards
+        that are due, as scheduled by spaced repetition.
+        """
+        if self.deck_is_loading("Study Mode"):
+            return
+        self.deck.set_study_mode(not self.deck.is_study_mode)
+        if self.deck.is_study_mode:
+            self.grade_frame.pack(pady = 5, padx = 5, after = self.card_label)
         else:
-            self.filtered_cards = [card for card in self.flashcards if card["category"] == selected_category]
+            self.grade_frame.pack_forget()
+        self.request_redraw()
 
-        self.current_index = 0
-        self.current_category = selected_category
-        self.showing_front = True
-        self.update_card_display()
+    def grade_card(self, grade):
+        """
+        Reschedules the studied card with the user's grade and moves on.
 
+        Args:
+            grade (int): AGAIN, HARD, GOOD or EASY.
+        """
+        if self.deck.grade_card(grade):
+            self.watch_compaction()
+            self.request_redraw()
+
+    def on_search_changed(self, *args):
+        """
+        Filters the cards shortly after the user stops typing.
+        """
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DELAY_MS, self.apply_search)
+
+    @timed("apply_search")
+    def apply_search(self):
+        """
+        Filters the current category by the text of the search box.
+        """
+        self.search_after_id = None
+        if self.loader is not None:
+            return
+        self.deck.set_search(self.search_var.get())
+        self.request_redraw()
+
+    def poll_indexer(self):
+        """
+        Installs the search index once the worker thread has built it.
+        """
+        done, error = self.deck.finish_indexing()
+        if not done:
+            self.root.after(INDEX_POLL_MS, self.poll_indexer)
+        elif error is not None:
+            messagebox.showerror("Search", f"Error indexing the cards:\n{error}")
+        else:
+            self.request_redraw()
+
+    def category_command(self, category):
+        """
+        Returns the dropdown callback that selects a category.
+        """
+        return lambda: (self.category_var.set(category), self.switch_category(category))
+
+    def add_category_entry(self, category):
+        """
+        Inserts a new category into the dropdown at its sorted position.
+        """
+        position = self.deck.category_index.position(category) + 1
+        self.category_menu["menu"].insert_command(position, label = category, command = self.category_command(category))
+
+    def remove_category_entry(self, position, category):
+        """
+        Removes an emptied category from the dropdown.
+
+        Args:
+            position (int): The position the category had in the index.
+            category (str): The category name.
+        """
+        self.category_menu["menu"].delete(position + 1)
+        if self.deck.current_category == category:
+            self.category_var.set("All")
+            self.switch_category("All")
+
+    @timed("refresh_categories")
     def refresh_categories(self):
         """
         Refreshes the category dropdown menu based on available flashcards.
         """
         # Gather all categories
-        categories = sorted({card.get("category", "General") for card in self.flashcards})
-        categories = ["All"] + categories
+        categories = ["All"] + self.deck.category_index.categories()
 
         # Clear existing menu
         self.category_menu["menu"].delete(0, "end")
 
         # Rebuild menu with new categories
         for cat in categories:
-            self.category_menu["menu"].add_command(label = cat, command = lambda value = cat: (self.category_var.set(value), self.switch_category(value)))
+            self.category_menu["menu"].add_command(label = cat, command = self.category_command(cat))
 
         # Ensure current selection is valid
         if self.category_var.get() not in categories:
             self.category_var.set("All")
             self.switch_category("All")
 
+    @timed("update_card_display")
     def update_card_display(self):
         """
         Update the flashcard label with new text.
         """
-        if not self.filtered_cards:
+        deck = self.deck
+        if deck.search_applied:
+            self.search_status.config(text = f"{len(deck.filtered_cards)} found")
+        elif deck.search_query and deck.indexer is not None:
+            self.search_status.config(text = "Indexing...")
+        else:
+            self.search_status.config(text = "")
+
+        card_id = deck.current_card()
+        if card_id is None and deck.is_study_mode and deck.next_review is not None:
+            wait = format_delay(deck.next_review - time.time())
+            self.card_label.config(text = f"All caught up!\n\nNext review in {wait}.")
+        elif card_id is None and deck.search_applied:
+            self.card_label.config(text = "No cards match the search.")
+        elif card_id is None:
             self.card_label.config(text = "No cards yet. Add one!")
         else:
-            card = self.filtered_cards[self.current_index]
-            if (self.showing_front):
-                text = card["front"]
+            if (deck.showing_front):
+                text = deck.flashcards.front(card_id)
             else:
-                text = card["back"]
+                text = deck.flashcards.back(card_id)
             
-            category = card["category"]
+            category = deck.flashcards.category(card_id)
             self.card_label.config(text = f"{text}\n\n{category}")
 
+    @timed("toggle_dark_mode")
     def toggle_dark_mode(self):
         """
         Toggles between light and dark mode.
         """
         self.dark_mode = not self.dark_mode
-        self.apply_theme(self.root)
+        self.use_theme()
+
+    def create_theme(self, name, theme):
+        """
+        Registers a ttk theme with the colors of a theme dict.
+
+        Args:
+            name (str): The ttk theme name.
+            theme (dict): "bg", "fg", "button_bg" and "button_fg" colors.
+        """
+        self.style.theme_create(name, parent = "clam", settings = {
+            ".": {"configure": {"background": theme["bg"], "foreground": theme["fg"], "fieldbackground": theme["bg"],
+                                "insertcolor": theme["fg"], "troughcolor": theme["bg"]}},
+            "TButton": {"configure": {"background": theme["button_bg"], "foreground": theme["button_fg"]},
+                        "map": {"background": [("active", theme["bg"])], "foreground": [("active", theme["fg"])]}},
+            "TMenubutton": {"configure": {"background": theme["button_bg"], "foreground": theme["button_fg"]},
+                            "map": {"background": [("active", theme["bg"])], "foreground": [("active", theme["fg"])]}},
+            "TEntry": {"configure": {"fieldbackground": theme["bg"], "foreground": theme["fg"]}},
+            "Card.TLabel": {"configure": {"font": ("Arial", 10), "relief": "groove", "anchor": "center", "justify": "center", "padding": 10}},
+            "Treeview": {"configure": {"background": theme["bg"], "fieldbackground": theme["bg"], "foreground": theme["fg"]}},
+            "Treeview.Heading": {"configure": {"background": theme["button_bg"], "foreground": theme["button_fg"]}},
+        })
+
+    def use_theme(self):
+        """
+        Switches the ttk theme to the current mode. Only the window
+        backgrounds and the menus are plain Tk and colored one by one;
+        the menus are found through the menu bar's cascades.
+        """
         if self.dark_mode:
             theme = self.dark_theme
-        else: 
+        else:
             theme = self.light_theme
+        self.style.theme_use(DARK_THEME if self.dark_mode else LIGHT_THEME)
 
-        # Update root background
+        # Windows opened later pick their background from the option database
+        self.root.option_add("*Toplevel.background", theme["bg"])
         self.root.configure(bg = theme["bg"])
-
-        # Update menu bar & submenus
-        self.menu_bar.configure(bg = theme["bg"], fg = theme["fg"])
-        self.file_menu.configure(bg = theme["bg"], fg = theme["fg"])
-        self.view_menu.configure(bg = theme["bg"], fg = theme["fg"])
-
-        # Update card label
-        self.card_label.config(bg = theme["bg"], fg = theme["fg"])
-
-        # Update category dropdown
-        self.category_menu.config(bg = theme["button_bg"], fg = theme["button_fg"])
-
-        # Update all buttons
-        for widget in self.root.winfo_children():
-            if isinstance(widget, tk.Button):
-                widget.config(bg = theme["button_bg"], fg = theme["button_fg"], activebackground = theme["bg"], activeforeground = theme["fg"])
-        
-        # Update all open Toplevel windows
         for window in self.root.winfo_children():
             if isinstance(window, tk.Toplevel):
-                self.apply_theme(window)
+                window.configure(bg = theme["bg"])
+        for menu in [*submenus(self.menu_bar), self.category_menu["menu"]]:
+            menu.configure(bg = theme["bg"], fg = theme["fg"])
 
-    def apply_theme(self, window):
+    def show_performance(self):
         """
-        Applies the current theme to a given Toplevel window and its widgets.
+        Opens the Performance panel: timings of each operation, JSON export
+        and profiling of single calls.
         """
-        if self.dark_mode:
-            theme = self.dark_theme
-        else:
-            theme = self.light_theme
-        window.configure(bg = theme["bg"])
-
-        for widget in window.winfo_children():
-            if isinstance(widget, tk.Label):
-                widget.config(bg = theme["bg"], fg = theme["fg"])
-            elif isinstance(widget, tk.Entry):
-                widget.config(bg = theme["bg"], fg = theme["fg"], insertbackground = theme["fg"])
-            elif isinstance(widget, tk.Button):
-                widget.config(bg = theme["button_bg"], fg = theme["button_fg"], activebackground = theme["bg"], activeforeground = theme["fg"])
-            elif isinstance(widget, (tk.Frame, tk.Toplevel)):
-                self.apply_theme(widget)
+        if self.perf_window is not None and self.perf_window.winfo_exists():
+            self.perf_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Performance")
+        window.geometry("560x420")
+        self.perf_window = window
+
+        recording = tk.BooleanVar(window, perf.recorder.enabled)
+        def toggle_recording():
+            perf.recorder.enabled = recording.get()
+        ttk.Checkbutton(window, text = "Record timings", variable = recording, command = toggle_recording).pack(anchor = "w", padx = 10, pady = 5)
+
+        table = ttk.Treeview(window, columns = ("calls", "total", "mean", "max"), height = 12)
+        table.heading("#0", text = "Operation")
+        for column, title in (("calls", "Calls"), ("total", "Total ms"), ("mean", "Mean ms"), ("max", "Max ms")):
+            table.heading(column, text = title)
+            table.column(column, width = 80, anchor = "e")
+        table.pack(expand = True, fill = "both", padx = 10)
+
+        buttons = ttk.Frame(window)
+        buttons.pack(pady = 5, padx = 10, fill = "x")
+        ttk.Button(buttons, text = "Reset", command = perf.recorder.reset).pack(side = tk.LEFT)
+
+        def export():
+            file_path = filedialog.asksaveasfilename(parent = window, defaultextension = ".json", filetypes = [("JSON files", "*.json")], title = "Export Timings")
+            if file_path:
+                try:
+                    perf.recorder.export(file_path)
+                except Exception as e:
+                    messagebox.showerror("Performance", f"Error exporting timings:\n{e}", parent = window)
+        ttk.Button(buttons, text = "Export JSON...", command = export).pack(side = tk.LEFT)
+
+        operation = tk.StringVar(window, PROFILED_OPERATIONS[0])
+        def profile_next():
+            file_path = filedialog.asksaveasfilename(parent = window, defaultextension = ".prof", filetypes = [("Profile stats", "*.prof")], title = "Save Profile")
+            if file_path:
+                perf.recorder.profile_next(operation.get(), file_path)
+        ttk.Button(buttons, text = "Profile next call...", command = profile_next).pack(side = tk.RIGHT)
+        ttk.Combobox(buttons, textvariable = operation, values = PROFILED_OPERATIONS, state = "readonly", width = 20).pack(side = tk.RIGHT, padx = 5)
+
+        status = ttk.Label(window, text = "", anchor = "w")
+        status.pack(fill = "x", padx = 10, pady = 5)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            table.delete(*table.get_children())
+            for row in perf.recorder.snapshot():
+                table.insert("", "end", text = row["name"], values = (row["calls"], f"{row['total_ms']:.1f}", f"{row['mean_ms']:.2f}", f"{row['max_ms']:.1f}"))
+            armed = perf.recorder.armed()
+            if armed:
+                status.config(text = "Waiting to profile: " + ", ".join(armed))
+            elif perf.recorder.last_profile is not None:
+                name, path = perf.recorder.last_profile
+                status.config(text = f"Profile of {name} saved to {path} (report in {os.path.basename(path)}.txt)")
+            window.after(PERF_REFRESH_MS, refresh)
+        refresh()
+
+    def show_statistics(self):
+        """
+        Opens the Statistics window: reviews, time on card and accuracy of
+        each category, from the review history of the deck on display.
+        """
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Statistics")
+        window.geometry("640x360")
+        self.stats_window = window
+
+        columns = (("reviews", "Reviews"), ("time", "Time/card"), ("flips", "Flips"), ("flip_time", "Time to flip"),
+                   ("graded", "Graded"), ("accuracy", "Accuracy"))
+        table = ttk.Treeview(window, columns = [column for column, _title in columns], height = 12)
+        table.heading("#0", text = "Category")
+        for column, title in columns:
+            table.heading(column, text = title)
+            table.column(column, width = 80, anchor = "e")
+        table.pack(expand = True, fill = "both", padx = 10, pady = 5)
+        status = ttk.Label(window, text = "", anchor = "w")
+        status.pack(fill = "x", padx = 10, pady = 5)
+
+        def row(stats):
+            return (stats.reviews,
+                    f"{stats.seconds / stats.reviews:.1f} s" if stats.reviews else "-",
+                    stats.flips,
+                    f"{stats.flip_seconds / stats.flips:.1f} s" if stats.flips else "-",
+                    stats.graded,
+                    f"{stats.correct / stats.graded:.0%}" if stats.graded else "-")
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            # The log keeps running sums per category, so this does not grow with the history
+            stats = self.deck.review_stats()
+            table.delete(*table.get_children())
+            if stats:
+                total = CategoryStats(*(sum(values) for values in zip(*stats.values())))
+                table.insert("", "end", text = "All", values = row(total))
+            for category in sorted(stats):
+                table.insert("", "end", text = category, values = row(stats[category]))
+            history = self.deck.history
+            if history is None:
+                status.config(text = "Reviews are logged for decks loaded from or saved to a file.")
+            else:
+                status.config(text = f"{len(history)} events logged in {os.path.basename(history.path)}")
+            window.after(STATS_REFRESH_MS, refresh)
+        refresh()
+
+    def show_browser(self):
+        """
+        Opens the card browser: the cards of a category as a table that can
+        be sorted and scrolled, where clicking a card shows it.
+        """
+        if self.browser is not None:
+            self.browser.window.lift()
+            return
+        self.browser = CardBrowser(self)
+
+    def go_to_card(self, card_id, category = "All"):
+        """
+        Shows a card picked in the card browser, leaving study mode and
+        switching category or clearing the search if that hides the card.
+        """
+        if self.deck_is_loading("Browse Cards"):
+            return
+        if self.deck.is_study_mode:
+            self.toggle_study_mode()
+        if not self.deck.go_to_card(card_id, category):
+            return
+        self.category_var.set(self.deck.current_category)
+        if self.search_var.get() != self.deck.search_query:
+            self.search_var.set(self.deck.search_query)
+            # The search is already cleared; applying it again would move the cursor
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        self.request_redraw()
 
     def center_window(self, window):
         """
@@ -533,7 +1393,298 @@ class FlipWiseApp:
         y = (screen_height // 2) - (height // 2)
         window.geometry(f"{width}x{height}+{x}+{y}")
 
+class CardBrowser:
+    """
+    The card browser window: a CardTable shown in a ttk.Treeview.
+
+    The Treeview holds only as many items as there are rows on screen.
+    Scrolling fills those same items with the next rows of the table
+    instead of inserting the whole deck, so opening and scrolling cost
+    the same for a million cards as for ten; the scrollbar is driven by
+    hand to match.
+    """
+
+    def __init__(self, app):
+        """
+        Args:
+            app (FlipWiseApp): The application whose deck is listed.
+        """
+        self.app = app
+        self.table = CardTable(app.deck)
+        # Table row shown at the top, and the rows that fit on screen
+        self.first = 0
+        self.page_size = 1
+        # Card ID shown by each Treeview item
+        self.item_cards = {}
+        self.selected = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Browse Cards")
+        self.window.geometry("720x480")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Category picker; a combobox filtered by typing scales to more categories than a menu
+        picker_frame = ttk.Frame(self.window)
+        picker_frame.pack(fill = "x", padx = 10, pady = 5)
+        ttk.Label(picker_frame, text = "Category:").pack(side = tk.LEFT)
+        self.category_var = tk.StringVar(self.window, "All")
+        self.picker = ttk.Combobox(picker_frame, textvariable = self.category_var, postcommand = self.filter_categories)
+        self.picker.pack(side = tk.LEFT, expand = True, fill = "x", padx = 5)
+        self.picker.bind("<<ComboboxSelected>>", lambda e: self.show_category())
+        self.picker.bind("<Return>", lambda e: self.show_category())
+        self.count_label = ttk.Label(picker_frame, text = "")
+        self.count_label.pack(side = tk.LEFT)
+
+        table_frame = ttk.Frame(self.window)
+        table_frame.pack(expand = True, fill = "both", padx = 10, pady = 5)
+        self.scrollbar = ttk.Scrollbar(table_frame, orient = tk.VERTICAL, command = self.on_scrollbar)
+        self.scrollbar.pack(side = tk.RIGHT, fill = "y")
+        self.tree = ttk.Treeview(table_frame, columns = COLUMNS, show = "headings", selectmode = "browse")
+        for column in COLUMNS:
+            self.tree.heading(column, command = lambda column = column: self.sort(column))
+            self.tree.column(column, width = 120 if column == "category" else 260, stretch = column != "category")
+        self.tree.pack(side = tk.LEFT, expand = True, fill = "both")
+        self.update_headings()
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<Button-1>", self.on_click)
+        self.tree.bind("<Return>", lambda e: self.open_selected())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        # The Treeview only knows the rows on screen, so keys move through the table here
+        for key, step in (("<Up>", -1), ("<Down>", 1)):
+            self.tree.bind(key, lambda e, step = step: self.move_selection(step))
+        for key, step in (("<Prior>", -1), ("<Next>", 1)):
+            self.tree.bind(key, lambda e, step = step: self.move_selection(step * self.page_size))
+        self.tree.bind("<Home>", lambda e: self.move_selection(-len(self.table)))
+        self.tree.bind("<End>", lambda e: self.move_selection(len(self.table)))
+
+        # Start at the card on display
+        card_id = app.deck.current_card()
+        if card_id is not None and not app.deck.is_study_mode:
+            position = self.table.position(card_id)
+            if position is not None:
+                self.selected = card_id
+                self.first = position
+        self.refresh()
+        self.tree.focus_set()
+
+    def close(self):
+        """
+        Closes the window.
+        """
+        self.app.browser = None
+        self.window.destroy()
+
+    def filter_categories(self):
+        """
+        Lists the categories containing the text typed in the picker when
+        it opens; the full list if the text is a category or "All".
+        """
+        categories = self.app.deck.category_index.categories()
+        text = self.category_var.get().casefold()
+        if text != "all" and text not in map(str.casefold, categories):
+            categories = [category for category in categories if text in category.casefold()]
+        self.picker["values"] = ["All"] + categories[:PICKER_CATEGORIES]
+
+    def show_category(self):
+        """
+        Lists the category picked or typed in the picker.
+        """
+        category = self.category_var.get()
+        if category != "All" and category not in self.app.deck.category_index.categories():
+            return
+        self.window.config(cursor = "watch")
+        self.window.update_idletasks()
+        self.table.set_category(category)
+        self.window.config(cursor = "")
+        self.first = 0
+        self.refresh()
+
+    @timed("sort_cards")
+    def sort(self, column):
+        """
+        Sorts by a column: ascending on the first click on its heading,
+        descending on the second and back to deck order on the third.
+        """
+        table = self.table
+        if table.sort_column != column:
+            order = (column, False)
+        elif not table.descending:
+            order = (column, True)
+        else:
+            order = (None, False)
+        self.window.config(cursor = "watch")
+        self.window.update_idletasks()
+        table.sort(*order)
+        self.window.config(cursor = "")
+        self.update_headings()
+        # Keep the selected card in view
+        position = table.position(self.selected) if self.selected is not None else None
+        self.first = position - self.page_size // 2 if position is not None else 0
+        self.refresh()
+
+    def update_headings(self):
+        """
+        Marks the sort column and direction in the column headings.
+        """
+        for column in COLUMNS:
+            text = column.capitalize()
+            if column == self.table.sort_column:
+                text += " \u25bc" if self.table.descending else " \u25b2"
+            self.tree.heading(column, text = text)
+
+    def on_resize(self, event):
+        """
+        Fits the number of rows to the height of the Treeview.
+        """
+        row_height = int(self.app.style.lookup("Treeview", "rowheight") or BROWSER_ROW_HEIGHT)
+        # One row's worth of height goes to the headings
+        page_size = max(1, event.height // row_height - 1)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.refresh()
+
+    def on_scrollbar(self, action, amount, unit = None):
+        """
+        Scrolls as asked by the scrollbar: ("moveto", fraction) or
+        ("scroll", count, "units" or "pages").
+        """
+        if action == "moveto":
+            self.first = int(float(amount) * len(self.table))
+            self.refresh()
+        else:
+            self.scroll(int(amount), unit)
+
+    def scroll(self, count, unit):
+        """
+        Scrolls by count rows or pages.
+        """
+        self.first += count * (self.page_size if unit == "pages" else 1)
+        self.refresh()
+        return "break"
+
+    def refresh(self):
+        """
+        Fills the Treeview items with the rows from first on. Items are
+        added or removed only when the window is resized.
+        """
+        if not self.window.winfo_exists():
+            return
+        if self.table.deck is not self.app.deck:
+            # Another deck of the workspace is on display
+            self.table = CardTable(self.app.deck)
+            self.category_var.set("All")
+            self.first = 0
+            self.selected = None
+            self.update_headings()
+        elif self.table.category != "All" and self.table.category not in self.app.deck.category_index.categories():
+            self.category_var.set("All")
+            self.table.set_category("All")
+
+        total = len(self.table)
+        self.first = max(0, min(self.first, total - self.page_size))
+        rows = self.table.rows(self.first, self.page_size)
+
+        items = self.tree.get_children()
+        for item in items[len(rows):]:
+            self.tree.delete(item)
+        for _number in range(len(items), len(rows)):
+            self.tree.insert("", "end")
+        self.item_cards = {}
+        selected = ()
+        for item, (card_id, front, back, category) in zip(self.tree.get_children(), rows):
+            # Treeview rows are one line high
+            self.tree.item(item, values = (front.replace("\n", " "), back.replace("\n", " "), category))
+            self.item_cards[item] = card_id
+            if card_id == self.selected:
+                selected = (item,)
+        self.tree.selection_set(selected)
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.page_size) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_label.config(text = f"{total} cards")
+
+    def on_click(self, event):
+        """
+        Shows the clicked card in the main window.
+        """
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return
+        item = self.tree.identify_row(event.y)
+        if item in self.item_cards:
+            self.selected = self.item_cards[item]
+            self.open_selected()
+
+    def move_selection(self, step):
+        """
+        Selects the card step rows away and scrolls it into view.
+        """
+        total = len(self.table)
+        if not total:
+            return "break"
+        position = self.table.position(self.selected) if self.selected is not None else None
+        if position is None:
+            # Nothing selected yet: Up and Down pick the top row on screen
+            position = self.first
+            step = 0 if abs(step) == 1 else step
+        position = max(0, min(position + step, total - 1))
+        self.selected = self.table.cards()[position]
+        if position < self.first:
+            self.first = position
+        elif position >= self.first + self.page_size:
+            self.first = position - self.page_size + 1
+        self.refresh()
+        return "break"
+
+    def open_selected(self):
+        """
+        Shows the selected card in the main window.
+        """
+        if self.selected is not None:
+            self.app.go_to_card(self.selected, self.table.category)
+        return "break"
+
+def shortcut(action):
+    """
+    Returns a key binding that runs action, unless the key was typed into a
+    text field (an entry, combobox or text box), where it is just text.
+    """
+    def handler(event):
+        if isinstance(event.widget, TEXT_WIDGETS):
+            return
+        action()
+    return handler
+
+def submenus(menu):
+    """
+    Yields a menu and every menu that cascades from it.
+    """
+    yield menu
+    end = menu.index("end")
+    for position in range(0 if end is None else end + 1):
+        if menu.type(position) == "cascade":
+            yield from submenus(menu.nametowidget(menu.entrycget(position, "menu")))
+
+def format_delay(seconds):
+    """
+    Formats a duration in seconds for display, e.g. "5 minutes".
+    """
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = round(seconds / size)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return "less than a minute"
+
 if __name__ == "__main__":
+    perf.recorder.enabled = os.environ.get("FLIPWISE_PERF") == "1"
     root = tk.Tk()
     app = FlipWiseApp(root)
+    if os.environ.get("FLIPWISE_CACHE_MB"):
+        app.workspace.budget = int(os.environ["FLIPWISE_CACHE_MB"]) * 2**20
+    if len(sys.argv) > 1:
+        app.open_deck(sys.argv[1])
     root.mainloop()
@@ -0,0 +1,72 @@
+"""
+Tests of the card browser's table.
+"""
+import pytest
+
+from synthetic import generate_cards
+
+from flipwise.browser import CardTable
+from flipwise.deckdb import SqliteCardStore
+from flipwise.engine import Deck
+
+
+@pytest.fixture(params = ["memory", "flipwise"])
+def deck(request, tmp_path):
+    if request.param == "memory":
+        deck = Deck()
+        for card in generate_cards(500):
+            deck.add(card["front"], card["back"], card["category"])
+    else:
+        path = str(tmp_path / "deck.flipwise")
+        store = SqliteCardStore(path, create = True)
+        store.extend(generate_cards(500))
+        store.close()
+        deck = Deck.load(path)
+    yield deck
+    deck.close()
+
+
+def expected_rows(deck, column):
+    store = deck.flashcards
+    text = store.front if column == "front" else store.back
+    order = sorted(deck.category_index.cards("All"), key = lambda card_id: text(card_id).casefold())
+    return [(card_id, store.front(card_id), store.back(card_id), store.category(card_id)) for card_id in order]
+
+
+@pytest.mark.parametrize("column", ["front", "back"])
+def test_sorted_table_after_clear(deck, column):
+    table = CardTable(deck)
+    table.sort(column)
+    assert table.rows(0, 1000) == expected_rows(deck, column)
+
+    deck.clear()
+    assert len(table) == 0
+    assert table.rows(0, 10) == []
+
+    # The cleared store hands out the old IDs again
+    deck.add("zz new", "b", "New")
+    deck.add("aa new", "b", "New")
+    assert table.rows(0, 10) == expected_rows(deck, column)
+
+
+def test_sorted_table_after_undone_clear(deck):
+    table = CardTable(deck)
+    table.sort("front", descending = True)
+    # Deleted cards are not brought back, so the others get new IDs
+    for card_id in list(deck.category_index.cards("All")[::3]):
+        deck.delete(card_id)
+    deck.clear()
+    assert len(table) == 0
+    deck.undo()
+    assert table.rows(0, 1000) == expected_rows(deck, "front")[::-1]
+    assert table.position(table.cards()[250]) == 250
+
+
+def test_sorted_table_after_clear_and_as_many_adds(deck):
+    table = CardTable(deck)
+    table.sort("back")
+    count = len(table)
+    deck.clear()
+    for number in range(count):
+        deck.add(f"front {number}", f"back {count - number:05}", "Refilled")
+    assert table.rows(0, 1000) == expected_rows(deck, "back")
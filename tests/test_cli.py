@@ -0,0 +1,53 @@
+"""
+Tests of the command line tools.
+"""
+import os
+
+from flipwise import cli, history, journal, writer
+from flipwise.engine import Deck
+
+
+def test_missing_deck_is_an_error(tmp_path, capsys):
+    missing = str(tmp_path / "missing.flipwise")
+    assert cli.main(["convert", missing, str(tmp_path / "out.json")]) == 1
+    assert cli.main(["stats", missing]) == 1
+    assert "missing.flipwise" in capsys.readouterr().err
+    # Nothing is created in place of the missing deck
+    assert os.listdir(tmp_path) == []
+
+
+def test_inspecting_leaves_the_journal_alone(tmp_path):
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, [{"front": "a", "back": "b", "category": "General"}])
+    deck = Deck.load(path, autosave = True)
+    deck.add("c", "d", "General")
+    deck.close()
+    # Changed outside FlipWise: the journal no longer applies to the file
+    writer.write_deck(path, [{"front": "e", "back": "f", "category": "General"}] * 2)
+    with open(journal.journal_path(path), "rb") as file:
+        records = file.read()
+
+    assert cli.main(["stats", path]) == 0
+    assert cli.main(["convert", path, str(tmp_path / "copy.csv")]) == 0
+    with open(journal.journal_path(path), "rb") as file:
+        assert file.read() == records
+    assert not os.path.exists(journal.journal_path(path) + ".stale")
+
+
+def test_stats_leaves_the_history_alone(tmp_path, capsys):
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, [{"front": "a", "back": "b", "category": "General"}] * 2)
+    deck = Deck.load(path, autosave = True)
+    deck.next_card()
+    deck.close()
+    log_path = history.history_path(path)
+    # Cut short by a crash
+    with open(log_path, "ab") as file:
+        file.write(history.BLOCK_HEADER.pack(5, 0, 0))
+    with open(log_path, "rb") as file:
+        contents = file.read()
+
+    assert cli.main(["stats", path]) == 0
+    assert "General" in capsys.readouterr().out
+    with open(log_path, "rb") as file:
+        assert file.read() == contents
@@ -0,0 +1,89 @@
+"""
+Tests of the review history log.
+"""
+import random
+
+import pytest
+
+from flipwise import history
+from flipwise.history import FLIP, GRADED, NEXT, CategoryStats, ReviewLog
+from flipwise.scheduler import AGAIN, GOOD
+
+
+def recount(log):
+    """
+    Adds up the statistics from the logged events themselves.
+    """
+    columns = log.columns()
+    sums = {}
+    for number, kind, seconds in zip(columns["category"], columns["kind"], columns["response"]):
+        history.count_event(sums.setdefault(log.categories[number], [0, 0.0, 0, 0.0, 0, 0]), kind, seconds)
+    return sums
+
+
+def assert_stats(stats, expected):
+    assert sorted(stats) == sorted(expected)
+    for category, row in expected.items():
+        assert stats[category][0::2] == tuple(row[0::2])
+        assert stats[category][1] == pytest.approx(row[1])
+        assert stats[category][3] == pytest.approx(row[3])
+
+
+@pytest.fixture(params = [True, False], ids = ["numpy", "no numpy"])
+def numpy_choice(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(history, "_numpy_module", None)
+    elif history._numpy() is None:
+        pytest.skip("numpy is not installed")
+
+
+def test_stats_of_whole_and_partial_blocks(tmp_path, numpy_choice):
+    path = str(tmp_path / "deck.json.history")
+    rng = random.Random(1)
+    log = ReviewLog(path)
+    for number in range(history.FLUSH_EVENTS * 2 + 100):
+        kind = rng.choice([FLIP, NEXT, GRADED + AGAIN, GRADED + GOOD])
+        log.record(number, kind, rng.random() * 10, f"Category {rng.randrange(20)}", now = number)
+    # Two whole blocks on disk, the rest buffered
+    assert_stats(log.stats(), recount(log))
+    log.close()
+
+    reopened = ReviewLog(path)
+    assert len(reopened) == history.FLUSH_EVENTS * 2 + 100
+    assert_stats(reopened.stats(), recount(reopened))
+    reopened.close()
+
+
+def test_more_than_65536_categories(tmp_path, numpy_choice):
+    path = str(tmp_path / "deck.json.history")
+    log = ReviewLog(path)
+    for number in range(70000):
+        log.record(number, NEXT, 1.0, f"Category {number}", now = number)
+    log.close()
+
+    reopened = ReviewLog(path)
+    stats = reopened.stats()
+    assert len(stats) == 70000
+    assert stats["Category 69999"] == CategoryStats(1, 1.0, 0, 0.0, 0, 0)
+    assert reopened.columns()["category"][-1] == 69999
+    reopened.close()
+
+
+
+def test_read_only_log_leaves_a_torn_block(tmp_path):
+    path = str(tmp_path / "deck.json.history")
+    log = ReviewLog(path)
+    log.record(1, NEXT, 1.0, "General", now = 1.0)
+    log.close()
+    with open(path, "ab") as file:
+        file.write(history.BLOCK_HEADER.pack(5, 0, 0))
+    with open(path, "rb") as file:
+        contents = file.read()
+
+    reader = ReviewLog(path, read_only = True)
+    assert reader.stats() == {"General": CategoryStats(1, 1.0, 0, 0.0, 0, 0)}
+    with pytest.raises(ValueError):
+        reader.record(2, NEXT, 1.0, "General")
+    reader.close()
+    with open(path, "rb") as file:
+        assert file.read() == contents
@@ -0,0 +1,105 @@
+"""
+Tests of the edit journal of JSON decks when a compaction fails.
+"""
+import os
+
+import pytest
+
+from flipwise import journal, writer
+from flipwise.engine import Deck
+
+
+def generate_cards(count):
+    return [{"front": f"Question {number}", "back": f"Answer {number}", "category": f"Category {number % 7}"}
+            for number in range(count)]
+
+
+def contents(deck):
+    store = deck.flashcards
+    return sorted((store.front(card_id), store.back(card_id), store.category(card_id)) for card_id in store)
+
+
+def edit_some(deck, start, count, text):
+    cards = deck.category_index.cards("All")
+    for card_id in list(cards[start:start + count]):
+        deck.edit(card_id, deck.flashcards.front(card_id), text, deck.flashcards.category(card_id))
+
+
+@pytest.fixture
+def deck(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "COMPACT_AFTER", 30)
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, generate_cards(2000))
+    deck = Deck.load(path, autosave = True)
+    yield deck
+    deck.close()
+
+
+def fail_writes(monkeypatch):
+    def write_temp(file_path, cards, compact = False):
+        raise OSError("disk full")
+    monkeypatch.setattr(writer, "write_temp", write_temp)
+
+
+@pytest.mark.parametrize("clear", [False, True])
+def test_failed_compaction_folds_pending_journal_back(deck, monkeypatch, clear):
+    path = deck.deck_path
+    folder = os.path.dirname(path)
+    # Deleted cards make the compacted numbering differ from the deck file's
+    for card_id in list(deck.category_index.cards("All")[:10]):
+        deck.delete(card_id)
+    fail_writes(monkeypatch)
+    edit_some(deck, 0, 25, "before")
+    assert deck.is_compacting()
+    # Edits made while the compaction runs go to the pending journal
+    if clear:
+        deck.add("kept", "a", "Kept")
+        deck.clear()
+        deck.add("new", "a", "New")
+    else:
+        for card_id in list(deck.category_index.cards("All")[100:105]):
+            deck.delete(card_id)
+        deck.add("added", "a", "Added")
+        edit_some(deck, 50, 5, "during")
+    deck.journal.compactor.join()
+
+    done, error = deck.finish_compaction()
+    assert done and isinstance(error, OSError)
+    assert not deck.is_compacting()
+    assert not os.path.exists(journal.pending_path(path))
+    assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+
+    # The journal keeps working, and compacts again once writes succeed
+    monkeypatch.undo()
+    monkeypatch.setattr(journal, "COMPACT_AFTER", 30)
+    deck.add("after", "a", "Added")
+    expected = contents(deck)
+    reloaded = Deck.load(path)
+    assert contents(reloaded) == expected
+    reloaded.close()
+
+    for number in range(40):
+        deck.add(f"again {number}", "a", "Added")
+    assert deck.is_compacting()
+    deck.journal.compactor.join()
+    assert deck.finish_compaction() == (True, None)
+    expected = contents(deck)
+    deck.close()
+    reloaded = Deck.load(path)
+    assert contents(reloaded) == expected
+    reloaded.close()
+
+
+def test_close_after_failed_compaction(deck, monkeypatch):
+    path = deck.deck_path
+    for card_id in list(deck.category_index.cards("All")[:10]):
+        deck.delete(card_id)
+    fail_writes(monkeypatch)
+    edit_some(deck, 0, 25, "before")
+    edit_some(deck, 30, 5, "during")
+    expected = contents(deck)
+    deck.close()
+    assert not os.path.exists(journal.pending_path(path))
+    reloaded = Deck.load(path)
+    assert contents(reloaded) == expected
+    reloaded.close()
@@ -0,0 +1,69 @@
+"""
+Tests of the Tkinter window. Building the window needs a display; the
+other tests do not.
+"""
+import ast
+import inspect
+import os
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("widget_class", [main.ttk.Entry, main.ttk.Combobox, main.tk.Entry, main.tk.Text])
+def test_shortcuts_ignore_typing(widget_class):
+    calls = []
+    handler = main.shortcut(lambda: calls.append(1))
+
+    class Event:
+        pass
+
+    # Widgets are not created: that needs a display, and only their class matters
+    typing = Event()
+    typing.widget = object.__new__(widget_class)
+    handler(typing)
+    assert calls == []
+
+    elsewhere = Event()
+    elsewhere.widget = object.__new__(main.ttk.Label)
+    handler(elsewhere)
+    assert calls == [1]
+
+
+def self_attributes(cls):
+    """
+    Returns the names used as self.<name> in the methods of a class, and
+    the ones assigned.
+    """
+    tree = ast.parse(inspect.getsource(cls))
+    used, assigned = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+            (assigned if isinstance(node.ctx, ast.Store) else used).add(node.attr)
+    return used, assigned
+
+
+@pytest.mark.parametrize("cls", [main.FlipWiseApp, main.CardBrowser])
+def test_every_self_attribute_resolves(cls):
+    used, assigned = self_attributes(cls)
+    missing = sorted(name for name in used - assigned if not hasattr(cls, name))
+    assert missing == []
+
+
+@pytest.mark.skipif(not os.environ.get("DISPLAY") and os.name != "nt", reason = "needs a display")
+def test_window_builds():
+    root = main.tk.Tk()
+    try:
+        app = main.FlipWiseApp(root)
+        menus = list(main.submenus(app.menu_bar))
+        for menu in menus:
+            for position in range(menu.index("end") + 1):
+                if menu.type(position) == "command":
+                    assert menu.entrycget(position, "command")
+        app.toggle_dark_mode()
+        for menu in menus:
+            assert menu.cget("bg") == app.dark_theme["bg"]
+        root.update()
+    finally:
+        root.destroy()
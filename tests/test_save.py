@@ -0,0 +1,72 @@
+"""
+Tests of saving JSON decks in the background while the journal compacts.
+"""
+import os
+import time
+
+import pytest
+
+from synthetic import generate_cards
+
+from flipwise import journal, writer
+from flipwise.engine import Deck
+
+
+@pytest.fixture
+def deck_path(tmp_path, monkeypatch):
+    # Compact after a few edits so a compaction runs during the save
+    monkeypatch.setattr(journal, "COMPACT_AFTER", 30)
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, generate_cards(20000))
+    return path
+
+
+def wait_saved(deck):
+    while True:
+        done, error = deck.finish_saving()
+        if done:
+            assert error is None
+            return
+        time.sleep(0.01)
+
+
+def contents(deck):
+    store = deck.flashcards
+    return sorted((store.front(card_id), store.back(card_id), store.category(card_id)) for card_id in store)
+
+
+def edit_cards(deck, count, text):
+    for number, card_id in zip(range(count), deck.category_index.cards("All")):
+        deck.edit(card_id, deck.flashcards.front(card_id), f"{text} {number}", deck.flashcards.category(card_id))
+
+
+@pytest.mark.parametrize("same_path", [True, False])
+def test_save_during_compaction(deck_path, same_path):
+    deck = Deck.load(deck_path, autosave = True)
+    edit_cards(deck, 40, "before")
+    assert deck.is_compacting()
+    target = deck_path if same_path else os.path.join(os.path.dirname(deck_path), "other.json")
+    assert deck.start_saving(target)
+    # Edits made while the save runs reach the journal of the saved file
+    edit_cards(deck, 40, "during")
+    wait_saved(deck)
+    edit_cards(deck, 5, "after")
+    expected = contents(deck)
+    deck.close()
+
+    reloaded = Deck.load(target)
+    assert contents(reloaded) == expected
+    reloaded.close()
+    assert not [name for name in os.listdir(os.path.dirname(deck_path)) if name.endswith(".tmp")]
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    path = str(tmp_path / "deck.json")
+
+    def failing():
+        yield {"front": "q", "back": "a", "category": "General"}
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        writer.write_deck(path, failing())
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,50 @@
+"""
+Tests of searched views, which are copies that edits must keep up to date.
+"""
+from flipwise.engine import Deck
+
+
+def fruit_deck():
+    deck = Deck()
+    for front in ("apple", "apricot", "banana", "cherry"):
+        deck.add(front, "fruit", "Fruit")
+    return deck
+
+
+def test_edit_moves_card_in_and_out_of_search():
+    deck = fruit_deck()
+    deck.set_search("apple")
+    assert list(deck.filtered_cards) == [0]
+
+    deck.edit(2, "apple pie", "fruit", "Fruit")
+    assert list(deck.filtered_cards) == [0, 2]
+    assert deck.current_card() == 0
+
+    deck.edit(0, "pear", "fruit", "Fruit")
+    assert list(deck.filtered_cards) == [2]
+    deck.edit(0, "apple", "fruit", "Fruit")
+    assert list(deck.filtered_cards) == [0, 2]
+    assert deck.current_card() == 2
+
+
+def test_edit_into_shuffled_search_keeps_card_on_display():
+    deck = fruit_deck()
+    deck.set_search("ap")
+    deck.toggle_shuffle_mode(seed = 1)
+    shown = deck.current_card()
+    deck.edit(3, "apple tart", "fruit", "Fruit")
+    assert sorted(deck.filtered_cards) == [0, 1, 3]
+    assert deck.current_card() == shown
+
+
+def test_undo_of_edit_brings_card_back_into_search():
+    deck = fruit_deck()
+    deck.set_search("apple")
+    deck.edit(0, "pear", "fruit", "Fruit")
+    assert list(deck.filtered_cards) == []
+
+    deck.undo()
+    assert list(deck.filtered_cards) == [0]
+    assert deck.current_card() == 0
+    deck.redo()
+    assert list(deck.filtered_cards) == []
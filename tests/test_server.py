@@ -0,0 +1,82 @@
+"""
+Tests of the HTTP/JSON deck server, over real connections on a free port.
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+from synthetic import generate_cards
+
+from flipwise import journal, writer
+from flipwise.engine import Deck
+from flipwise.server import DeckServer
+
+
+async def request(host, port, method, path, payload = None):
+    reader, stream = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    stream.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+    data = json.loads(await reader.readexactly(length))
+    stream.close()
+    return int(head.split(b" ", 2)[1]), data
+
+
+def run_server(deck, client):
+    async def run():
+        server = DeckServer(deck)
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            return await client(host, port)
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def deck_path(tmp_path):
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, generate_cards(200))
+    return path
+
+
+def test_add_without_category_uses_default(deck_path):
+    deck = Deck.load(deck_path, autosave = True)
+
+    async def client(host, port):
+        results = []
+        for payload in ({"front": "q1", "back": "a1"}, {"front": "q2", "back": "a2", "category": " "}):
+            results.append(await request(host, port, "POST", "/cards", payload))
+        results.append(await request(host, port, "POST", "/cards", {"front": "q3", "back": "a3", "category": 3}))
+        return results
+
+    (status1, card1), (status2, card2), (status3, _error) = run_server(deck, client)
+    deck.close()
+    assert (status1, card1["category"]) == (200, "General")
+    assert (status2, card2["category"]) == (200, "General")
+    assert status3 == 400
+
+
+def test_save_during_compaction(deck_path, monkeypatch):
+    monkeypatch.setattr(journal, "COMPACT_AFTER", 30)
+    writer.write_deck(deck_path, generate_cards(20000))
+    deck = Deck.load(deck_path, autosave = True)
+
+    async def client(host, port):
+        for number in range(60):
+            status, _card = await request(host, port, "POST", "/cards", {"front": f"q{number}", "back": "a", "category": "Load"})
+            assert status == 200
+        status, saved = await request(host, port, "POST", "/save")
+        assert status == 200
+        return saved
+
+    saved = run_server(deck, client)
+    assert saved["saved"] == 20060
+    deck.close()
+    reloaded = Deck.load(deck_path)
+    assert len(reloaded.flashcards) == 20060
+    assert reloaded.category_index.count("Load") == 60
+    reloaded.close()
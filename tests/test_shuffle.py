@@ -0,0 +1,33 @@
+"""
+Tests of the seeded shuffle of a view.
+"""
+from array import array
+
+from flipwise.shuffle import Permutation, ShuffledView
+
+
+def assert_permutation(view):
+    shuffled = list(view)
+    assert sorted(shuffled) == list(view.cards)
+    for position, card_id in enumerate(shuffled):
+        assert view.index(card_id) == position
+
+
+def test_shrinking_view_shrinks_domain():
+    cards = array("I", range(20000))
+    view = ShuffledView(cards, seed = 7)
+    assert_permutation(view)
+    # Deletes shrink the live list underneath the view
+    del cards[100:]
+    assert_permutation(view)
+    permutation = view._permutation
+    assert 1 << (2 * permutation._half) <= 4 * len(cards)
+
+
+def test_domain_stays_within_four_times_size():
+    permutation = Permutation(1, seed = 1)
+    for size in list(range(1, 3000, 7)) + list(range(3000, 0, -11)):
+        permutation.resize(size)
+        domain = 1 << (2 * permutation._half)
+        assert size <= domain < 4 * max(size, 1) + 4
+        assert sorted(permutation[position] for position in range(size)) == list(range(size))
@@ -0,0 +1,70 @@
+"""
+Tests of undo and redo of card edits.
+"""
+import random
+
+from flipwise.engine import Deck
+
+
+class Menu:
+    """
+    Follows the categories the way the window's category dropdown does.
+    """
+
+    def __init__(self, deck):
+        self.deck = deck
+        self.entries = ["All"] + list(deck.category_index.categories())
+
+    def follow(self, reverted):
+        if reverted.rebuilt:
+            self.entries = ["All"] + list(self.deck.category_index.categories())
+            return
+        for category, position in reverted.emptied:
+            assert self.entries.pop(position + 1) == category
+        for category in reverted.created:
+            self.entries.insert(self.deck.category_index.position(category) + 1, category)
+
+
+def test_reverted_categories_follow_index():
+    rng = random.Random(3)
+    deck = Deck()
+    menu = Menu(deck)
+    for step in range(2000):
+        cards = deck.category_index.cards("All")
+        roll = rng.random()
+        if roll < 0.3 or not cards:
+            card_id, created = deck.add(f"q{step}", "a", f"C{rng.randrange(8)}")
+            if created:
+                category = deck.flashcards.category(card_id)
+                menu.entries.insert(deck.category_index.position(category) + 1, category)
+        elif roll < 0.45:
+            card_id = cards[rng.randrange(len(cards))]
+            category, position, emptied = deck.delete(card_id)
+            if emptied:
+                menu.entries.pop(position + 1)
+        elif roll < 0.6:
+            card_id = cards[rng.randrange(len(cards))]
+            old_category, old_position, emptied, created = deck.edit(card_id, "q", "a", f"C{rng.randrange(8)}")
+            if emptied:
+                menu.entries.pop(old_position + 1)
+            if created:
+                menu.entries.insert(deck.category_index.position(deck.flashcards.category(card_id)) + 1,
+                                    deck.flashcards.category(card_id))
+        elif roll < 0.62:
+            deck.clear()
+            menu.entries = ["All"]
+        elif roll < 0.85:
+            reverted = deck.undo()
+            if reverted is not None:
+                menu.follow(reverted)
+        else:
+            reverted = deck.redo()
+            if reverted is not None:
+                menu.follow(reverted)
+        assert menu.entries == ["All"] + list(deck.category_index.categories()), step
+
+
+def test_nothing_to_undo():
+    deck = Deck()
+    assert deck.undo() is None
+    assert deck.redo() is None
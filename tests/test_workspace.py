@@ -0,0 +1,57 @@
+"""
+Tests of reading decks ahead in a workspace.
+"""
+import os
+
+from flipwise import journal, writer
+from flipwise.engine import Deck
+from flipwise.workspace import Workspace
+
+
+def snapshot(folder):
+    files = {}
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), "rb") as file:
+            files[name] = file.read()
+    return files
+
+
+def stale_deck(tmp_path):
+    path = str(tmp_path / "deck.json")
+    writer.write_deck(path, [{"front": "a", "back": "b", "category": "General"}])
+    deck = Deck.load(path, autosave = True)
+    deck.add("c", "d", "General")
+    deck.close()
+    # Changed outside FlipWise: the journal no longer applies to the file
+    writer.write_deck(path, [{"front": "e", "back": "f", "category": "General"}] * 2)
+    return path
+
+
+def test_prefetch_writes_nothing(tmp_path):
+    path = stale_deck(tmp_path)
+    before = snapshot(tmp_path)
+    workspace = Workspace()
+    workspace.prefetch(workspace.add(path))
+    workspace._loads[path].join()
+    # A deck read ahead and dropped leaves its files as they were
+    assert snapshot(tmp_path) == before
+    workspace.close()
+    assert snapshot(tmp_path) == before
+
+
+def test_journal_starts_when_the_deck_is_taken(tmp_path):
+    path = stale_deck(tmp_path)
+    workspace = Workspace()
+    path = workspace.add(path)
+    workspace.prefetch(path)
+    workspace._loads[path].join()
+    deck = workspace.take(path)
+    assert len(deck.flashcards) == 2
+    assert deck.search_index is not None
+    assert os.path.exists(journal.journal_path(path) + ".stale")
+    deck.add("g", "h", "General")
+    workspace.close()
+
+    reloaded = Deck.load(path)
+    assert len(reloaded.flashcards) == 3
+    reloaded.close()